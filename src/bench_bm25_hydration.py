@@ -0,0 +1,39 @@
+import json
+import time
+import search_bm25
+from bench_queries import load_bench_queries
+
+K_VALUES = [10, 100, 1000]
+REPEAT = 3
+
+def per_hit_query(searcher, query, recall):
+    # the previous hydration: one searcher.doc() round trip per hit
+    hits = searcher.search(search_bm25.light_normalize(query), k=recall)
+
+    return [search_bm25.display_of(searcher.doc(hit.docid).raw()) for hit in hits]
+
+def time_queries(fn, queries):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for query in queries:
+            fn(query)
+
+    return (time.perf_counter() - start) / (REPEAT * len(queries)) * 1000
+
+if __name__ == "__main__":
+    searcher = search_bm25.get_searcher()
+    queries = load_bench_queries()
+
+    # warm up Lucene and the JVM
+    for query in queries:
+        search_bm25.search(query, 100, searcher)
+
+    report = {}
+    for k in K_VALUES:
+        report[k] = {"per-hit doc": time_queries(lambda q: per_hit_query(searcher, q, k), queries)}
+        for fields in search_bm25.FIELDS:
+            report[k][fields] = time_queries(lambda q: search_bm25.search(q, k, searcher, fields), queries)
+
+        print(f"k={k:5d} | " + " | ".join(f"{name} {ms:8.2f} ms" for name, ms in report[k].items()))
+
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import search_faiss
+from evaluate import query_metrics
+from bench_queries import load_eval_specs
+from bench_utils import percentiles_ms
+
+REPORT_PATH = "../results/bench/cascade.json"
+K = 10
+CASCADE_NS = [50, 100, 200, 500]
+BRUTE_CHUNK = 50_000 # memmap rows scored per matmul in the Qwen3 brute-force baseline
+
+def qwen_brute_force(qwen, query, k):
+    query_emb = search_faiss.embed_qwen_queries(qwen, [search_faiss.light_normalize(query)])[0]
+    embeddings = qwen["embeddings"]
+
+    best_scores = np.empty(0, dtype=np.float32)
+    best_rows = np.empty(0, dtype=np.int64)
+    for start in range(0, embeddings.shape[0], BRUTE_CHUNK):
+        scores = np.asarray(embeddings[start:start + BRUTE_CHUNK]) @ query_emb
+        best_scores = np.concatenate([best_scores, scores])
+        best_rows = np.concatenate([best_rows, np.arange(start, start + len(scores))])
+        if len(best_scores) > k:
+            top = np.argpartition(-best_scores, k - 1)[:k]
+            best_scores, best_rows = best_scores[top], best_rows[top]
+
+    order = np.argsort(-best_scores, kind="stable")
+    return [{"id": int(qwen["ids"][row]), "score": float(score)}
+            for row, score in zip(best_rows[order], best_scores[order])]
+
+def run_mode(search_fn, specs, k):
+    latencies = []
+    runs = {}
+    for spec in specs:
+        t0 = time.perf_counter()
+        hits = search_fn(spec["query"])
+        latencies.append(time.perf_counter() - t0)
+        runs[spec["qid"]] = [h["id"] for h in hits[:k]]
+
+    return runs, percentiles_ms(latencies, (50, 99))
+
+def quality(runs, specs, reference, k):
+    metrics = []
+    overlap = []
+    for spec in specs:
+        ranked = runs[spec["qid"]]
+        relevant = set(spec.get("relevant_ids", []))
+        if relevant:
+            metrics.append(query_metrics(ranked, relevant, k))
+        if reference is not None and reference[spec["qid"]]:
+            overlap.append(len(set(ranked) & set(reference[spec["qid"]])) / len(reference[spec["qid"]]))
+
+    row = {name: float(np.mean([m[name] for m in metrics])) for name in metrics[0]} if metrics else {}
+    row["n_judged"] = len(metrics)
+    if overlap:
+        row[f"overlap@{k}_vs_qwen"] = float(np.mean(overlap))
+
+    return row
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=K)
+    parser.add_argument("--n", nargs="+", type=int, default=CASCADE_NS, help="MiniLM candidates re-scored per query")
+    args = parser.parse_args()
+
+    specs = load_eval_specs()
+    searcher, metadata = search_faiss.get_searcher()
+    qwen = search_faiss.load_qwen()
+
+    # warm up both models
+    search_faiss.search("warm up", args.k, searcher, metadata, cascade_n=max(args.n))
+    qwen_brute_force(qwen, "warm up", args.k)
+
+    covered = qwen["embeddings"].shape[0]
+    print(f"Qwen3 vectors: {covered} of {searcher.ntotal} indexed recipes ({covered / max(searcher.ntotal, 1):.1%})")
+
+    modes = {"minilm": lambda q: search_faiss.search(q, args.k, searcher, metadata)}
+    for n in args.n:
+        modes[f"cascade n={n}"] = lambda q, n=n: search_faiss.search(q, args.k, searcher, metadata, cascade_n=n)
+    modes["qwen brute force"] = lambda q: qwen_brute_force(qwen, q, args.k)
+
+    timed = {name: run_mode(fn, specs, args.k) for name, fn in modes.items()}
+    reference = timed["qwen brute force"][0]
+
+    report = {"k": args.k, "qwen_rows": covered, "index_ntotal": int(searcher.ntotal), "modes": {}}
+    print(f"{'mode':18s} | {'p50':>8s} | {'p99':>8s} | {'ndcg':>6s} | {'recall':>6s} | {'overlap vs qwen':>15s}")
+    for name, (runs, latency) in timed.items():
+        row = {**latency, **quality(runs, specs, reference, args.k)}
+        report["modes"][name] = row
+        print(f"{name:18s} | {row['p50']:6.2f}ms | {row['p99']:6.2f}ms | {row.get('ndcg', 0.0):6.3f} | "
+              f"{row.get('recall', 0.0):6.3f} | {row.get(f'overlap@{args.k}_vs_qwen', 0.0):15.3f}")
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("Report saved to", REPORT_PATH)
@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import subprocess
+import corpus_store
+from bench_utils import peak_rss_mb, current_rss_mb
+
+REPORT_PATH = "../results/bench/corpus_load.json"
+FORMATS = ["jsonl", "arrow"]
+
+def load_frame(eval_builder):
+    return len(corpus_store.load_clean_frame(eval_builder.INPUT_PATH))
+
+def load_embed_input(embed_recipes):
+    return sum(len(chunk) for chunk in embed_recipes.get_input_data(embed_recipes.FILE_PATH, embed_recipes.CHUNK_SIZE))
+
+def load_bm25_corpus(create_bm25_corpus):
+    with open(os.devnull, "w") as fout:
+        if corpus_store.is_fresh(create_bm25_corpus.INPUT_PATH):
+            create_bm25_corpus.write_from_corpus(fout)
+        else:
+            create_bm25_corpus.write_from_jsonl(fout)
+
+def load_filters(recipe_filters):
+    return recipe_filters.RecipeFilters.build().n_rows
+
+def load_metadata(search_faiss):
+    import metadata_store
+    metadata_store.is_fresh = lambda *args, **kwargs: False # measure the JSONL / corpus paths, not the side-store
+
+    return len(search_faiss.load_metadata(search_faiss.METADATA_PATH))
+
+# what sample.py / eval_builder.py, embed_recipes.py, create_bm25_corpus.py,
+# recipe_filters.py and search_faiss.load_metadata read before doing any work
+CONSUMERS = {
+    "dataframe (sample, eval_builder)": ("eval_builder", load_frame),
+    "embed_recipes input": ("embed_recipes", load_embed_input),
+    "create_bm25_corpus": ("create_bm25_corpus", load_bm25_corpus),
+    "recipe_filters build": ("recipe_filters", load_filters),
+    "search_faiss metadata": ("search_faiss", load_metadata),
+}
+
+def run_child(consumer, fmt):
+    if fmt == "jsonl":
+        corpus_store.is_fresh = lambda *args, **kwargs: False
+
+    # the consumer's own imports (torch for embed_recipes) are not counted
+    module_name, load_fn = CONSUMERS[consumer]
+    module = importlib.import_module(module_name)
+
+    rss_before = current_rss_mb()
+    t0 = time.perf_counter()
+    rows = load_fn(module)
+    load_s = time.perf_counter() - t0
+    peak = peak_rss_mb()
+
+    print(json.dumps({"load_s": load_s, "peak_rss_mb": peak, "peak_over_baseline_mb": peak - rss_before,
+                      "rows": rows}))
+
+def spawn(consumer, fmt):
+    # one fresh process per measurement, so peak RSS is that consumer's alone
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", consumer, "--format", fmt],
+                         capture_output=True, text=True, check=True).stdout
+
+    return json.loads(out.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--child", choices=list(CONSUMERS), help=argparse.SUPPRESS)
+    parser.add_argument("--format", choices=FORMATS, default="arrow", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.format)
+    else:
+        if not os.path.exists(corpus_store.CORPUS_PATH):
+            print("No columnar corpus at", corpus_store.CORPUS_PATH, "- run python preprocess.py first")
+
+        report = {}
+        print(f"{'consumer':32s} | {'jsonl load':>10s} | {'arrow load':>10s} | {'jsonl peak':>10s} | {'arrow peak':>10s}")
+        for consumer in CONSUMERS:
+            row = {fmt: spawn(consumer, fmt) for fmt in FORMATS}
+            report[consumer] = row
+            print(f"{consumer:32s} | {row['jsonl']['load_s']:9.2f}s | {row['arrow']['load_s']:9.2f}s | "
+                  f"{row['jsonl']['peak_over_baseline_mb']:7.0f} MB | {row['arrow']['peak_over_baseline_mb']:7.0f} MB")
+
+        os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+        with open(REPORT_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+
+        print("Report saved to", REPORT_PATH)
@@ -0,0 +1,48 @@
+import time
+import shutil
+import argparse
+import tempfile
+import torch
+import embed_recipes
+from bench_embed_scaling import fresh_store, limited_chunks
+
+N_RECIPES = 10_000
+
+def time_schedule(model, device, schedule, n_recipes, chunk_size):
+    tmp_dir = tempfile.mkdtemp(prefix="embed_bench_")
+    try:
+        store = fresh_store(tmp_dir)
+        token_stats = {}
+
+        start = time.perf_counter()
+        embedded, _ = embed_recipes.run_serial(store, limited_chunks(n_recipes, chunk_size), model, device,
+                                               schedule, token_stats)
+
+        return embedded, time.perf_counter() - start, token_stats
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=N_RECIPES)
+    parser.add_argument("--chunk-size", type=int, default=embed_recipes.CHUNK_SIZE, help="bucketing window")
+    parser.add_argument("--schedules", nargs="+", default=embed_recipes.SCHEDULES, choices=embed_recipes.SCHEDULES)
+    args = parser.parse_args()
+
+    device = "mps" if torch.backends.mps.is_available() else "cpu"
+    model = embed_recipes.SentenceTransformer(embed_recipes.MODEL_NAME, device=device)
+    model.eval()
+
+    # warm up so the first schedule does not pay for lazy initialisation
+    embed_recipes.encode_texts(model, ["warm up"] * embed_recipes.BATCH_SIZE, device, show_progress_bar=False)
+
+    print(f"recipes: {args.n}, window: {args.chunk_size}, batch size: {embed_recipes.BATCH_SIZE}, device: {device}")
+
+    base = None
+    for schedule in args.schedules:
+        embedded, elapsed, token_stats = time_schedule(model, device, schedule, args.n, args.chunk_size)
+        base = base or elapsed
+
+        ratio = token_stats["padded"] / token_stats["real"]
+        print(f"{schedule:>7s} | {elapsed:8.1f}s | {embedded / elapsed:8.1f} recipes/s | "
+              f"padded/real tokens {ratio:5.3f} | time vs {args.schedules[0]} {elapsed / base:5.2f}x")
@@ -0,0 +1,60 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import embed_recipes
+from itertools import islice
+
+N_RECIPES = 20_000
+WORKER_COUNTS = [0, 1, 2, 4, 8] # 0 = serial in-process encode
+CHUNK_SIZE = 1000
+
+def limited_chunks(n_recipes, chunk_size):
+    return islice(embed_recipes.get_input_data(embed_recipes.FILE_PATH, chunk_size), -(-n_recipes // chunk_size))
+
+def fresh_store(tmp_dir):
+    return embed_recipes.EmbeddingStore(
+        embd_path=os.path.join(tmp_dir, "emb.data"),
+        id_path=os.path.join(tmp_dir, "ids.txt"),
+        hash_path=os.path.join(tmp_dir, "emb.hash"),
+        manifest_path=os.path.join(tmp_dir, "manifest.json"),
+    )
+
+def time_run(workers, threads_per_worker, n_recipes, chunk_size):
+    tmp_dir = tempfile.mkdtemp(prefix="embed_bench_")
+    try:
+        store = fresh_store(tmp_dir)
+        chunks = limited_chunks(n_recipes, chunk_size)
+
+        start = time.perf_counter()
+        if workers == 0:
+            model = embed_recipes.SentenceTransformer(embed_recipes.MODEL_NAME, device="cpu")
+            model.eval()
+            embedded, _ = embed_recipes.run_serial(store, chunks, model, "cpu")
+        else:
+            embedded, _ = embed_recipes.run_pipelined(store, chunks, workers, threads_per_worker)
+
+        # includes model loading in every worker: that is what a real run pays too
+        return embedded, time.perf_counter() - start
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=N_RECIPES)
+    parser.add_argument("--workers", type=int, nargs="+", default=WORKER_COUNTS)
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    print(f"recipes: {args.n}, chunk size: {args.chunk_size}, physical cores: {embed_recipes.physical_cores()}")
+
+    base = None
+    for workers in args.workers:
+        embedded, elapsed = time_run(workers, args.threads_per_worker, args.n, args.chunk_size)
+        rate = embedded / elapsed
+        base = base or rate
+
+        label = "serial" if workers == 0 else f"{workers} x {args.threads_per_worker}t"
+        print(f"{label:>10s} | {elapsed:8.1f}s | {rate:8.1f} recipes/s | speedup {rate / base:5.2f}x")
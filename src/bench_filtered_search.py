@@ -0,0 +1,73 @@
+import time
+import numpy as np
+import search_faiss
+from eval_builder import query_specs
+from recipe_filters import FILTER_KEYS
+from bench_utils import percentiles_ms
+
+K = 5
+REPEAT = 20
+TAG_DF_TARGETS = [50, 500, 5_000, 50_000, 150_000] # selectivity ladder of single-tag filters
+
+def tag_ladder(recipe_filters):
+    tags = recipe_filters.tags.tokens
+    dfs = np.array([recipe_filters.tags.df(tag) for tag in tags])
+
+    ladder = []
+    for target in TAG_DF_TARGETS:
+        tag = tags[int(np.argmin(np.abs(dfs - target)))]
+        ladder.append((f"tag {tag}", "healthy quick meal", {"must_tags": [tag]}))
+
+    return ladder
+
+def spec_filters():
+    cases = []
+    for spec in query_specs:
+        filters = {key: spec[key] for key in FILTER_KEYS if spec.get(key)}
+        if filters:
+            cases.append((f"qid {spec['qid']}", spec["query"], filters))
+
+    return cases
+
+def time_search(query, filters, searcher, metadata):
+    latencies = []
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        hits = search_faiss.search(query, K, searcher, metadata, filters=filters)
+        latencies.append(time.perf_counter() - t0)
+
+    return hits, percentiles_ms(latencies, (50, 99))
+
+def post_filter_count(query, filters, searcher, metadata):
+    # what filtering an unfiltered top-k afterwards would have kept
+    candidates = search_faiss.compile_filters(filters)
+    allowed = set(candidates[0].tolist()) if candidates is not None else None
+    hits = search_faiss.search(query, K, searcher, metadata)
+
+    return len(hits) if allowed is None else sum(1 for h in hits if h["id"] in allowed)
+
+if __name__ == "__main__":
+    searcher, metadata = search_faiss.get_searcher()
+    recipe_filters = search_faiss.get_filters()
+    exact_max = search_faiss.FILTER_EXACT_MAX
+
+    # warm up the model, the index and the filter bitmaps
+    search_faiss.search("warm up", K, searcher, metadata, filters={"must_tags": ["easy"]})
+
+    print(f"{'filter':34s} | {'matches':>7s} | {'post-filter kept':>16s} | {'auto p50':>9s} | {'selector p50':>12s} | {'exact p50':>9s}")
+    for label, query, filters in tag_ladder(recipe_filters) + spec_filters():
+        candidates = search_faiss.compile_filters(filters)
+        n_matches = len(candidates[0]) if candidates is not None else recipe_filters.n_rows
+        kept = post_filter_count(query, filters, searcher, metadata)
+
+        _, auto = time_search(query, filters, searcher, metadata)
+
+        # force each route to see where the crossover sits on this machine
+        search_faiss.FILTER_EXACT_MAX = -1
+        _, selector = time_search(query, filters, searcher, metadata)
+        search_faiss.FILTER_EXACT_MAX = 10**9
+        _, exact = time_search(query, filters, searcher, metadata)
+        search_faiss.FILTER_EXACT_MAX = exact_max
+
+        print(f"{label[:34]:34s} | {n_matches:7d} | {kept:>13d}/{K} | {auto['p50']:7.2f}ms | "
+              f"{selector['p50']:10.2f}ms | {exact['p50']:7.2f}ms")
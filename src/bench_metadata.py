@@ -0,0 +1,68 @@
+import json
+import subprocess
+import sys
+import time
+import numpy as np
+from bench_utils import current_rss_mb, peak_rss_mb, percentiles_ms
+
+METADATA_PATH = "../data/processed/recipes_display.jsonl"
+K = 10
+N_LOOKUPS = 2000
+
+# Each mode runs in a fresh interpreter so RSS and startup are not shared.
+def measure(mode):
+    import metadata_store
+
+    base_rss = current_rss_mb()
+    start = time.perf_counter()
+
+    if mode == "dict":
+        metadata = {}
+        with open(METADATA_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                obj = json.loads(line)
+                metadata[int(obj["id"])] = obj
+        ids = np.fromiter(metadata.keys(), dtype=np.int64)
+    else:
+        metadata = metadata_store.open_store(METADATA_PATH)
+        ids = metadata.ids
+
+    startup_s = time.perf_counter() - start
+    loaded_rss = current_rss_mb()
+
+    rng = np.random.default_rng(0)
+    latencies = []
+    for _ in range(N_LOOKUPS):
+        hit_ids = rng.choice(ids, size=K)
+        t0 = time.perf_counter()
+        for rid in hit_ids:
+            metadata.get(int(rid))
+        latencies.append(time.perf_counter() - t0)
+
+    return {
+        "mode": mode,
+        "records": int(len(ids)),
+        "startup_s": startup_s,
+        "rss_delta_mb": loaded_rss - base_rss,
+        "peak_rss_mb": peak_rss_mb(),
+        "hydrate_k": K,
+        "hydrate_latency_ms": percentiles_ms(latencies),
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(json.dumps(measure(sys.argv[1])))
+        sys.exit(0)
+
+    import metadata_store
+    if not metadata_store.is_fresh(METADATA_PATH):
+        print("Building metadata store...")
+        metadata_store.build_store(METADATA_PATH)
+
+    for mode in ["dict", "store"]:
+        out = subprocess.run([sys.executable, __file__, mode], capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        lat = r["hydrate_latency_ms"]
+        print(f"{r['mode']:5s} | records {r['records']} | startup {r['startup_s']:.3f}s "
+              f"| RSS +{r['rss_delta_mb']:.1f} MB (peak {r['peak_rss_mb']:.1f} MB) "
+              f"| hydrate k={K} p50 {lat['p50']:.3f} ms p99 {lat['p99']:.3f} ms")
@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import time
+import argparse
+import pandas as pd
+import text_normalize as tn
+from data_process import split_list_items
+from bench_queries import load_bench_queries
+
+RAW_PATH = "../data/raw/RAW_recipes.csv"
+REPORT_PATH = "../results/bench/normalize.json"
+TEXT_COLUMNS = ["name", "description", "tags", "ingredients", "steps"]
+REPEAT = 3
+MAX_SHOWN = 10 # mismatches printed per check
+
+# strings the regex versions treat in ways that are easy to get wrong:
+# non-ASCII letters and digits, Unicode whitespace, case mappings that change length
+EDGE_CASES = ["Crème Brûlée & Co's", "İstanbul", "K", "ﬁne ß", "ΣΑΣ ΟΔΟΣ", "a b c",
+              "٣ eggs", "2 cups flour, 1/2 tsp salt", "\x1cfoo\x1f", "x'y\"z-w", "a\x00b", "", " ", None, 3.5]
+
+def load_inputs(raw_path, limit=None):
+    # every string the ingestion path normalizes: names, descriptions and each
+    # tag / ingredient item, plus the steps as long free text and the bench queries
+    df = pd.read_csv(raw_path, usecols=TEXT_COLUMNS, nrows=limit)
+    inputs = {
+        "name": df["name"].tolist(),
+        "description": df["description"].tolist(),
+        "tag items": [item for tags in df["tags"] for item in split_list_items(tags)],
+        "ingredient items": [item for items in df["ingredients"] for item in split_list_items(items)],
+        "steps": df["steps"].tolist(),
+        "queries": load_bench_queries(),
+        "edge cases": EDGE_CASES,
+    }
+
+    return inputs
+
+def mismatches(values, expected, got):
+    return [(v, e, g) for v, e, g in zip(values, expected, got) if e != g]
+
+def check_parity(inputs):
+    checks = {
+        "light_normalize": (tn.light_normalize_ref, lambda vs: [tn.light_normalize(v) for v in vs]),
+        "light_normalize_many": (tn.light_normalize_ref, tn.light_normalize_many),
+        "normalize_ingredients": (tn.normalize_ingredients_ref, lambda vs: [tn.normalize_ingredients(v) for v in vs]),
+        "normalize_ingredients_many": (tn.normalize_ingredients_ref, tn.normalize_ingredients_many),
+    }
+
+    report = {}
+    for check, (ref_fn, fast_fn) in checks.items():
+        n_checked = 0
+        bad = []
+        for values in inputs.values():
+            got = fast_fn(values)
+            if len(got) != len(values):
+                bad.append((f"{len(values)} values", f"{len(values)} results", f"{len(got)} results"))
+                continue
+            bad += mismatches(values, [ref_fn(v) for v in values], got)
+            n_checked += len(values)
+
+        report[check] = {"checked": n_checked, "mismatches": len(bad)}
+        print(f"{check:28s} | {n_checked:9d} strings | {len(bad)} mismatches")
+        for value, expected, got in bad[:MAX_SHOWN]:
+            print(f"    {value!r}: expected {expected!r}, got {got!r}")
+
+    return report
+
+def throughput(fn, values, repeat):
+    # best of repeat runs, so a stray GC pause or context switch doesn't count
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(values)
+        best = min(best, time.perf_counter() - t0)
+
+    n_chars = sum(len(v) for v in values if isinstance(v, str))
+    return {"strings_per_s": len(values) / best, "mb_per_s": n_chars / best / 1e6, "s": best}
+
+def bench(inputs, repeat):
+    variants = {
+        "regex (before)": lambda vs: [tn.light_normalize_ref(v) for v in vs],
+        "translate": lambda vs: [tn.light_normalize(v) for v in vs],
+        "translate batch": tn.light_normalize_many,
+    }
+
+    report = {}
+    print(f"{'input':18s} | {'variant':16s} | {'strings/s':>11s} | {'MB/s':>7s} | {'speedup':>7s}")
+    for name, values in inputs.items():
+        if name == "edge cases":
+            continue
+
+        rows = {variant: throughput(fn, values, repeat) for variant, fn in variants.items()}
+        base = rows["regex (before)"]["s"]
+        for variant, row in rows.items():
+            row["speedup"] = base / row["s"]
+            print(f"{name:18s} | {variant:16s} | {row['strings_per_s']:11,.0f} | {row['mb_per_s']:7.1f} | "
+                  f"{row['speedup']:6.1f}x")
+        report[name] = rows
+
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--raw", default=RAW_PATH)
+    parser.add_argument("--limit", type=int, default=None, help="only the first N recipes")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--parity-only", action="store_true")
+    args = parser.parse_args()
+
+    inputs = load_inputs(args.raw, args.limit)
+    report = {"raw_path": args.raw, "limit": args.limit, "parity": check_parity(inputs)}
+    parity_ok = all(check["mismatches"] == 0 for check in report["parity"].values())
+
+    if not args.parity_only:
+        report["throughput"] = bench(inputs, args.repeat)
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("Report saved to", REPORT_PATH)
+    if not parity_ok:
+        print("Parity check FAILED: the fast normalizer differs from the regex version")
+        sys.exit(1)
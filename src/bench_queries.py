@@ -0,0 +1,33 @@
+import json
+
+EVAL_QUERIES_PATH = "../data/eval/queries.json"
+
+# Query lists used in demo/demo.ipynb and results/results.ipynb
+DEMO_QUERIES = ["baked salmon with lemon", "texas sheet cake", "low fat chicken",
+                "molasses ginger cookies", "broccoli cheddar soup"]
+
+RESULTS_QUERIES = ["aubergine pasta bake with tomato & cheese",
+                   "courgette pasta bake with tomato and cheese",
+                   "healthy high-protein breakfast with no eggs or dairy",
+                   "kid-friendly dinner with hidden vegetables",
+                   "cozy fall dinner for a rainy night, preferably baked and cheesy",
+                   "pantry-only cheap dinner using only shelf-stable ingredients",
+                   "easy comforting dinner when sick, mild & soothing",
+                   "high-protein vegan dinner that feels like comfort food",
+                   "crispy savory snack w/out frying, kid-friendly & healthy",
+                   "quick vegetarian dinner, not too heavy",
+                   "dinner for someone who hates vegetables but needs healthier food",
+                   "High-protein vegetarian comfort food using lentils instead of meat",
+                   "Low-calorie comfort food that tastes rich but actually uses lean ingredients",
+                   "High-protein dinner that isn’t meat but still feels hearty like meat",
+                   "Healthy dinner that feels creamy or cheesy but actually uses no cream and no cheese"]
+
+def load_eval_specs(path=EVAL_QUERIES_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_bench_queries(path=EVAL_QUERIES_PATH, repeat=1):
+    queries = [spec["query"] for spec in load_eval_specs(path)]
+    queries += DEMO_QUERIES + RESULTS_QUERIES
+
+    return queries * repeat
@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import importlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from bench_queries import load_bench_queries
+from bench_utils import peak_rss_mb, percentiles_ms
+
+OUT_DIR = "../results/bench"
+ENGINES = ["bm25", "faiss"]
+K_VALUES = [5, 10, 50, 100]
+REPEAT = 5
+THREADS = 4
+THRESHOLD = 0.10 # relative change that counts as a regression
+
+def bm25_runner(module):
+    searcher = module.get_searcher()
+    return lambda q, k: module.search(q, recall=k, searcher=searcher)
+
+def faiss_runner(module):
+    module.EMB_CACHE_SIZE = 0 # measure real encodes, not embedding cache hits
+    searcher, metadata = module.get_searcher()
+    return lambda q, k: module.search(q, recall=k, searcher=searcher, metadata=metadata)
+
+def hybrid_runner(module):
+    module.search_faiss.EMB_CACHE_SIZE = 0
+    searchers = module.get_searcher()
+    return lambda q, k: module.search(q, recall=k, searchers=searchers)
+
+# engine -> (module, function returning a search callable bound to loaded searchers)
+RUNNERS = {
+    "bm25": ("search_bm25", bm25_runner),
+    "faiss": ("search_faiss", faiss_runner),
+    "hybrid": ("search_hybrid", hybrid_runner),
+}
+
+def run_engine(engine, k_values, repeat, threads):
+    module_name, make_runner = RUNNERS[engine]
+
+    t0 = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    run = make_runner(module)
+    cold_start_s = time.perf_counter() - t0
+
+    queries = load_bench_queries()
+    t0 = time.perf_counter()
+    run(queries[0], k_values[0])
+    first_query_s = time.perf_counter() - t0
+
+    stream = queries * repeat
+    per_k = {}
+    for k in k_values:
+        latencies = []
+        start = time.perf_counter()
+        for q in stream:
+            t = time.perf_counter()
+            run(q, k)
+            latencies.append(time.perf_counter() - t)
+        single_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda q: run(q, k), stream))
+        multi_s = time.perf_counter() - start
+
+        per_k[str(k)] = {
+            **percentiles_ms(latencies, (50, 95, 99)),
+            "qps_1t": len(stream) / single_s,
+            f"qps_{threads}t": len(stream) / multi_s,
+        }
+
+    return {
+        "import_s": import_s,
+        "cold_start_s": cold_start_s,
+        "first_query_s": first_query_s,
+        "n_queries": len(stream),
+        "threads": threads,
+        "k": per_k,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+# Lower is better for latencies and startup, higher is better for QPS.
+def find_regressions(baseline, current, threshold=THRESHOLD):
+    regressions = []
+
+    def check(path, old, new, higher_is_better):
+        if old is None or new is None or old == 0:
+            return
+        change = (new - old) / old
+        if (higher_is_better and change < -threshold) or (not higher_is_better and change > threshold):
+            regressions.append({"metric": path, "baseline": old, "current": new, "change": change})
+
+    for engine, cur in current["engines"].items():
+        old = baseline.get("engines", {}).get(engine)
+        if old is None:
+            continue
+
+        check(f"{engine}.cold_start_s", old.get("cold_start_s"), cur.get("cold_start_s"), False)
+        check(f"{engine}.peak_rss_mb", old.get("peak_rss_mb"), cur.get("peak_rss_mb"), False)
+
+        for k, stats in cur["k"].items():
+            old_stats = old.get("k", {}).get(k)
+            if old_stats is None:
+                continue
+            for metric, value in stats.items():
+                check(f"{engine}.k{k}.{metric}", old_stats.get(metric), value, metric.startswith("qps"))
+
+    return regressions
+
+def print_report(report):
+    for engine, r in report["engines"].items():
+        print(f"[{engine}] cold start {r['cold_start_s']:.2f}s | first query {r['first_query_s'] * 1000:.1f} ms "
+              f"| peak RSS {r['peak_rss_mb']:.0f} MB")
+        for k, s in r["k"].items():
+            multi = [key for key in s if key.startswith("qps_") and key != "qps_1t"][0]
+            print(f"  k={k:>4s} | p50 {s['p50']:7.2f} ms | p95 {s['p95']:7.2f} ms | p99 {s['p99']:7.2f} ms "
+                  f"| {s['qps_1t']:7.1f} q/s (1t) | {s[multi]:7.1f} q/s ({multi[4:]})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engines", nargs="+", default=ENGINES, choices=sorted(RUNNERS))
+    parser.add_argument("--k", nargs="+", type=int, default=K_VALUES)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--threads", type=int, default=THREADS)
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--baseline", default=None, help="earlier bench JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # child process: one engine, so cold start and peak RSS are not shared
+        print(json.dumps(run_engine(args.worker, args.k, args.repeat, args.threads)))
+        sys.exit(0)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "engines": {},
+    }
+
+    for engine in args.engines:
+        cmd = [sys.executable, __file__, "--worker", engine, "--repeat", str(args.repeat),
+               "--threads", str(args.threads), "--k"] + [str(k) for k in args.k]
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        report["engines"][engine] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print_report(report)
+
+    out_path = args.out or os.path.join(OUT_DIR, f"bench_{report['commit']}_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print("Benchmark report saved to", out_path)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        regressions = find_regressions(baseline, report, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} ({r['change']:+.1%})")
+
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
@@ -0,0 +1,43 @@
+import time
+import search_faiss
+from bench_queries import load_bench_queries
+
+REPEAT = 50 # 40 distinct queries x 50 = 2000 queries per run
+K = 10
+
+def time_loop(queries, searcher, metadata, k):
+    start = time.perf_counter()
+    results = [search_faiss.search(q, recall=k, searcher=searcher, metadata=metadata) for q in queries]
+
+    return time.perf_counter() - start, results
+
+def time_batched(queries, searcher, metadata, k):
+    start = time.perf_counter()
+    results = search_faiss.search_many(queries, recall=k, searcher=searcher, metadata=metadata)
+
+    return time.perf_counter() - start, results
+
+def top_ids_agreement(results_a, results_b):
+    same = 0
+    for a, b in zip(results_a, results_b):
+        if [r["id"] for r in a] == [r["id"] for r in b]:
+            same += 1
+
+    return same / max(len(results_a), 1)
+
+if __name__ == "__main__":
+    queries = load_bench_queries(repeat=REPEAT)
+    searcher, metadata = search_faiss.get_searcher()
+
+    # warm up the model and the index before timing
+    search_faiss.search_many(queries[:32], recall=K, searcher=searcher, metadata=metadata)
+
+    loop_s, loop_results = time_loop(queries, searcher, metadata, K)
+    batch_s, batch_results = time_batched(queries, searcher, metadata, K)
+
+    n = len(queries)
+    print(f"queries: {n}, k: {K}")
+    print(f"search() loop : {loop_s:8.3f}s | {n / loop_s:8.1f} q/s")
+    print(f"search_many() : {batch_s:8.3f}s | {n / batch_s:8.1f} q/s")
+    print(f"speedup       : {loop_s / batch_s:8.2f}x")
+    print(f"identical top-{K} id lists: {top_ids_agreement(loop_results, batch_results):.1%}")
@@ -0,0 +1,91 @@
+import time
+START = time.perf_counter()
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import numpy as np
+
+REPORT_PATH = "../results/bench/startup.json"
+QUERY = "healthy quick meal"
+K = 5
+REPEAT = 3
+EMB_CACHE_DIR = "../data/cache/startup_bench" # primed by one throwaway run of the "warm+cache" mode
+
+# eager:        read the whole index into RAM, model from the hub cache, load everything before serving
+# lazy:         mmap'd index and local model snapshot, each loaded by the first query that needs it
+# warm:         as lazy, with search_faiss.warm_up() loading both in the background from the start
+# warm+cache:   as warm, with a persisted query-embedding cache, so a repeated first query needs no model
+MODES = ["eager", "lazy", "warm", "warm+cache"]
+
+def run_child(mode):
+    t_import = time.perf_counter()
+    import search_faiss
+    import_s = time.perf_counter() - t_import
+
+    if mode == "eager":
+        search_faiss.INDEX_MMAP = False
+        search_faiss.MODEL_SNAPSHOT_DIR = None
+        search_faiss.get_searcher()
+        search_faiss.get_model()
+    if mode == "warm+cache":
+        search_faiss.EMB_CACHE_DIR = EMB_CACHE_DIR
+    if mode in ("warm", "warm+cache"):
+        search_faiss.warm_up()
+    ready_s = time.perf_counter() - START
+
+    search_faiss.search(QUERY, K)
+    first_result_s = time.perf_counter() - START
+
+    t0 = time.perf_counter()
+    search_faiss.search(QUERY + " for two", K)
+    next_query_ms = 1000 * (time.perf_counter() - t0)
+
+    from bench_utils import current_rss_mb
+    print(json.dumps({"import_s": import_s, "ready_s": ready_s, "first_result_s": first_result_s,
+                      "next_query_ms": next_query_ms, "rss_mb": current_rss_mb(),
+                      "model_source": search_faiss.model_source()}))
+
+def spawn(mode):
+    # the wall time includes interpreter start-up, as a fresh worker or CLI would see it
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode],
+                         capture_output=True, text=True, check=True).stdout
+    wall_s = time.perf_counter() - t0
+
+    return {**json.loads(out.strip().splitlines()[-1]), "wall_s": wall_s}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+    else:
+        if "warm+cache" in args.modes:
+            spawn("warm+cache")
+
+        # runs after the first hit a warm OS page cache; that is the common
+        # case for a worker restart, not for the first start after a reboot
+        report = {"query": QUERY, "repeat": args.repeat, "modes": {}}
+        print(f"{'mode':11s} | {'import':>7s} | {'ready':>7s} | {'first result':>12s} | {'wall':>7s} | "
+              f"{'next query':>10s} | {'rss':>8s}")
+        for mode in args.modes:
+            runs = [spawn(mode) for _ in range(args.repeat)]
+            row = {key: float(np.median([r[key] for r in runs])) for key in runs[0] if key != "model_source"}
+            row["model_source"] = runs[0]["model_source"]
+            report["modes"][mode] = row
+
+            print(f"{mode:11s} | {row['import_s']:6.2f}s | {row['ready_s']:6.2f}s | {row['first_result_s']:11.2f}s | "
+                  f"{row['wall_s']:6.2f}s | {row['next_query_ms']:8.1f}ms | {row['rss_mb']:5.0f} MB")
+
+        os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+        with open(REPORT_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+
+        print("Report saved to", REPORT_PATH)
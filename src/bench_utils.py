@@ -0,0 +1,34 @@
+import os
+import resource
+import sys
+import numpy as np
+
+def current_rss_mb():
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss / 2**20
+
+    # Linux fallback without psutil
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak / 2**20
+
+    return peak / 2**10
+
+def percentiles_ms(latencies_s, pcts=(50, 95, 99)):
+    if len(latencies_s) == 0:
+        return {f"p{p}": None for p in pcts}
+
+    values = np.percentile(np.asarray(latencies_s) * 1000.0, pcts)
+    return {f"p{p}": float(v) for p, v in zip(pcts, values)}
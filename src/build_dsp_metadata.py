@@ -1,7 +1,4 @@
-import json
-import os
 import re
-import pandas as pd
 
 def clean_list(lst_str):
     if not isinstance(lst_str, str):
@@ -39,29 +36,21 @@ def min_clean(in_str):
 
     return in_str.strip()
 
-PATH = "../data/raw/RAW_recipes.csv"
-
-df = pd.read_csv(PATH)
+def display_record(name, rid, tags, description, ingredients, steps):
+    return {
+        "id": str(rid),
+        "name": min_clean(name),
+        "description": min_desc_clean(description),
+        "tags": clean_list(tags),
+        "ingredients": clean_list(ingredients),
+        "steps": clean_list(steps)
+    }
 
-df = df[["name", "id", "tags", "description", "ingredients", "steps"]]
+PATH = "../data/raw/RAW_recipes.csv"
+OUT_PATH = "../data/processed/recipes_display.jsonl"
 
-df["name"] = df["name"].map(min_clean)
-df["description"] = df["description"].map(min_desc_clean)
-df["ingredients"] = df["ingredients"].map(clean_list)
-df["steps"] = df["steps"].map(clean_list)
-df["tags"] = df["tags"].map(clean_list)
+if __name__ == "__main__":
+    # streams the CSV in chunks through a process pool; see preprocess.py
+    import preprocess
 
-OUT_PATH = "../data/processed/recipes_display.jsonl"
-os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-
-with open(OUT_PATH, "w") as f:
-    for _, row in df.iterrows():
-        record = {
-            "id": str(row["id"]),
-            "name": row["name"],
-            "description": row["description"],
-            "tags": row["tags"],
-            "ingredients": row["ingredients"],
-            "steps": row["steps"]
-        }
-        f.write(json.dumps(record) + "\n")
+    preprocess.run_pipeline(PATH, clean_path=None, display_path=OUT_PATH)
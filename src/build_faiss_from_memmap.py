@@ -1,36 +1,160 @@
-
 import os
+import json
+import argparse
 import numpy as np
 import faiss
 
 EMBD_PATH = "../data/embeddings/all-MiniLM-L6-v2.data"
 ID_PATH = "../data/embeddings/all-MiniLM-L6-v2.txt"
 OUT_PATH = "../data/embeddings/all-MiniLM-L6-v2.faiss"
+MANIFEST_PATH = "../data/embeddings/all-MiniLM-L6-v2.manifest.json"
 EMB_DIM = 384
 
-def build_faiss_index(embeddings, ids):
-    # Base index: inner product
-    base_index = faiss.IndexFlatIP(EMB_DIM)
+INDEX_SPEC = "flat"
+TRAIN_SIZE = 64_000 # vectors sampled from the memmap to train IVF / PQ
+ADD_CHUNK = 50_000
+SEED = 42
+
+# Index spec: "<kind>[:key=value,...]", e.g. "flat", "hnsw:M=32,efc=200",
+# "ivf:nlist=1024" or "ivfpq:nlist=1024,m=48,nbits=8". fp16, sq8 and pq are
+# exhaustive like flat but store compressed codes: 2 bytes and 1 byte per
+# dimension, or m * nbits / 8 bytes per vector (flat: 4 bytes per dimension).
+SPEC_DEFAULTS = {
+    "flat": {},
+    "fp16": {},
+    "sq8": {},
+    "pq": {"m": 48, "nbits": 8},
+    "hnsw": {"M": 32, "efc": 200},
+    "ivf": {"nlist": 1024},
+    "ivfpq": {"nlist": 1024, "m": 48, "nbits": 8},
+}
+
+def parse_index_spec(spec):
+    kind, _, args = spec.partition(":")
+    kind = kind.strip().lower()
+
+    if kind not in SPEC_DEFAULTS:
+        raise ValueError(f"Unknown index kind '{kind}', expected one of {sorted(SPEC_DEFAULTS)}")
+
+    params = dict(SPEC_DEFAULTS[kind])
+    for item in args.split(","):
+        if not item.strip():
+            continue
+
+        key, _, value = item.partition("=")
+        key = key.strip()
+        if key not in params:
+            raise ValueError(f"Unknown parameter '{key}' for index kind '{kind}'")
+
+        params[key] = int(value)
+
+    return kind, params
+
+def spec_tag(spec):
+    kind, params = parse_index_spec(spec)
+
+    return "-".join([kind] + [f"{key}{value}" for key, value in params.items()])
+
+def index_path_for(spec, out_path=OUT_PATH):
+    kind, _ = parse_index_spec(spec)
+    if kind == "flat":
+        return out_path
+
+    base, ext = os.path.splitext(out_path)
+    return f"{base}.{spec_tag(spec)}{ext}"
+
+def make_base_index(kind, params):
+    if kind == "flat":
+        return faiss.IndexFlatIP(EMB_DIM)
+
+    if kind == "fp16":
+        return faiss.IndexScalarQuantizer(EMB_DIM, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+
+    if kind == "sq8":
+        return faiss.IndexScalarQuantizer(EMB_DIM, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+
+    if kind == "pq":
+        return faiss.IndexPQ(EMB_DIM, params["m"], params["nbits"], faiss.METRIC_INNER_PRODUCT)
+
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(EMB_DIM, params["M"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["efc"]
+        return index
+
+    quantizer = faiss.IndexFlatIP(EMB_DIM)
+    if kind == "ivf":
+        return faiss.IndexIVFFlat(quantizer, EMB_DIM, params["nlist"], faiss.METRIC_INNER_PRODUCT)
+
+    return faiss.IndexIVFPQ(quantizer, EMB_DIM, params["nlist"], params["m"], params["nbits"],
+                            faiss.METRIC_INNER_PRODUCT)
+
+def sample_training_vectors(embeddings, train_size, seed=SEED):
+    n = embeddings.shape[0]
+    if n <= train_size:
+        return np.ascontiguousarray(embeddings[:], dtype="float32")
+
+    # sorted rows keep the memmap reads sequential
+    rows = np.sort(np.random.default_rng(seed).choice(n, size=train_size, replace=False))
+    return np.ascontiguousarray(embeddings[rows], dtype="float32")
+
+def build_faiss_index(embeddings, ids, spec=INDEX_SPEC, train_size=TRAIN_SIZE, keep=None):
+    kind, params = parse_index_spec(spec)
+
+    # Base index: inner product (embeddings are L2-normalized, so this is cosine)
+    base_index = make_base_index(kind, params)
+
+    if not base_index.is_trained:
+        train = sample_training_vectors(embeddings, train_size)
+        print(f"Training {kind} on {len(train)} sampled vectors.....")
+        base_index.train(train)
 
     # Wrap with ID map so FAISS stores your recipe IDs
     index = faiss.IndexIDMap2(base_index)
 
-    # Add all vectors with IDs
-    index.add_with_ids(embeddings, ids)
+    # Add vectors with IDs in chunks so the memmap is never fully copied;
+    # rows outside `keep` (tombstoned recipes) are skipped
+    n = embeddings.shape[0]
+    for start in range(0, n, ADD_CHUNK):
+        end = min(start + ADD_CHUNK, n)
+        chunk = np.ascontiguousarray(embeddings[start:end], dtype="float32")
+        chunk_ids = ids[start:end]
+        if keep is not None:
+            chunk = chunk[keep[start:end]]
+            chunk_ids = chunk_ids[keep[start:end]]
+        index.add_with_ids(chunk, chunk_ids)
 
     return index
 
-if __name__ == "__main__":
-    file_size = os.path.getsize(EMBD_PATH)  # bytes
+def load_manifest(manifest_path=MANIFEST_PATH):
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+def live_mask(ids, manifest):
+    # embed_recipes.py keeps removed recipes in the store as tombstones
+    if manifest is None or not manifest.get("tombstones"):
+        return None
+
+    return ~np.isin(ids, np.array(manifest["tombstones"], dtype="int64"))
+
+def load_embeddings(embd_path=EMBD_PATH, id_path=ID_PATH, manifest_path=MANIFEST_PATH):
+    file_size = os.path.getsize(embd_path)  # bytes
     bytes_per_vec = 4 * EMB_DIM            # float32 = 4 bytes
     N = file_size // bytes_per_vec
 
+    # only rows committed by embed_recipes.py are complete
+    manifest = load_manifest(manifest_path)
+    if manifest is not None:
+        N = min(N, manifest["committed_rows"])
+
     print("Detected N (from memmap):", N)
 
     # loading the embeddings
 
     embeddings = np.memmap(
-        EMBD_PATH,
+        embd_path,
         dtype="float32",
         mode="r",
         shape=(N, EMB_DIM),
@@ -38,7 +162,7 @@ if __name__ == "__main__":
 
     # loading the IDs
 
-    ids = np.loadtxt(ID_PATH, dtype="int64")
+    ids = np.loadtxt(id_path, dtype="int64", ndmin=1)[:N]
 
     print("Embeddings shape:", embeddings.shape)
     print("IDs shape:", ids.shape)
@@ -46,10 +170,25 @@ if __name__ == "__main__":
     # fail if IDs not equal embeddings
     assert embeddings.shape[0] == ids.shape[0], "Mismatch between embeddings and IDs!"
 
-    print("Building Embeddings.....")
-    index = build_faiss_index(embeddings, ids)
+    return embeddings, ids
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--spec", default=INDEX_SPEC, help='e.g. "flat", "fp16", "sq8", "pq:m=48,nbits=8", "hnsw:M=32,efc=200", "ivf:nlist=1024", "ivfpq:nlist=1024,m=48,nbits=8"')
+    parser.add_argument("--train-size", type=int, default=TRAIN_SIZE)
+    parser.add_argument("--out", default=None, help="defaults to a spec-specific path next to the flat index")
+    args = parser.parse_args()
+
+    out_path = args.out or index_path_for(args.spec)
+    embeddings, ids = load_embeddings(EMBD_PATH, ID_PATH)
+    keep = live_mask(ids, load_manifest())
+    if keep is not None:
+        print("Skipping tombstoned rows:", int((~keep).sum()))
+
+    print(f"Building {args.spec} index.....")
+    index = build_faiss_index(embeddings, ids, args.spec, args.train_size, keep)
     print("Index ntotal:", index.ntotal)
-    os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-    faiss.write_index(index, OUT_PATH)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    faiss.write_index(index, out_path)
 
-    print("FAISS index saved.")
+    print("FAISS index saved to", out_path)
@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import search_bm25_sparse
+from bench_queries import load_bench_queries
+from bench_utils import percentiles_ms, current_rss_mb
+
+CLEAN_PATH = "../data/processed/clean_recipes_input.jsonl"
+REPORT_PATH = "../results/bench/bm25_engines.json"
+K = 10
+N_NAME_QUERIES = 500
+BATCH_SIZE = 64
+
+def sample_name_queries(path, n):
+    names = []
+    with open(path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if i % 113 == 0:
+                names.append(json.loads(line)["name"])
+            if len(names) == n:
+                break
+
+    return names
+
+def parity(lucene_runs, sparse_runs, k):
+    # Lucene and the sparse engine should agree on ranks, not just on the set
+    same_top1 = []
+    overlap = []
+    same_order = []
+    score_diff = []
+
+    for lucene, sparse in zip(lucene_runs, sparse_runs):
+        lucene_ids = [r["id"] for r in lucene[:k]]
+        sparse_ids = [r["id"] for r in sparse[:k]]
+        if not lucene_ids:
+            continue
+
+        same_top1.append(bool(sparse_ids) and lucene_ids[0] == sparse_ids[0])
+        overlap.append(len(set(lucene_ids) & set(sparse_ids)) / len(lucene_ids))
+        same_order.append(lucene_ids == sparse_ids)
+
+        sparse_scores = {r["id"]: r["score"] for r in sparse}
+        score_diff += [abs(r["score"] - sparse_scores[r["id"]]) for r in lucene[:k] if r["id"] in sparse_scores]
+
+    return {
+        "queries": len(overlap),
+        "top1_agreement": float(np.mean(same_top1)),
+        f"overlap@{k}": float(np.mean(overlap)),
+        "identical_ranking": float(np.mean(same_order)),
+        "max_score_diff": float(max(score_diff, default=0.0)),
+    }
+
+def time_single(search_fn, queries):
+    latencies = []
+    for query in queries:
+        t0 = time.perf_counter()
+        search_fn(query)
+        latencies.append(time.perf_counter() - t0)
+
+    return percentiles_ms(latencies, (50, 99))
+
+def time_batched(batch_fn, queries, batch_size):
+    t0 = time.perf_counter()
+    for start in range(0, len(queries), batch_size):
+        batch_fn(queries[start:start + batch_size])
+
+    return len(queries) / (time.perf_counter() - t0)
+
+def timed_load(load_fn):
+    rss_before = current_rss_mb()
+    t0 = time.perf_counter()
+    searcher = load_fn()
+
+    return searcher, time.perf_counter() - t0, current_rss_mb() - rss_before
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=K)
+    args = parser.parse_args()
+
+    queries = load_bench_queries() + sample_name_queries(CLEAN_PATH, N_NAME_QUERIES)
+
+    # sparse engine first, so its RSS delta is not hidden behind the JVM's
+    sparse, sparse_load_s, sparse_mb = timed_load(search_bm25_sparse.get_searcher)
+
+    import search_bm25
+    lucene, lucene_load_s, lucene_mb = timed_load(search_bm25.get_searcher)
+
+    lucene_runs = [search_bm25.search(q, args.k, lucene, "ids") for q in queries]
+    sparse_runs = search_bm25_sparse.search_many(queries, args.k, sparse, "ids")
+    report = {"k": args.k, "parity": parity(lucene_runs, sparse_runs, args.k), "engines": {}}
+
+    engines = {
+        "lucene": (lucene_load_s, lucene_mb,
+                   lambda q, fields: search_bm25.search(q, args.k, lucene, fields),
+                   lambda qs: lucene.batch_search([search_bm25.light_normalize(q) for q in qs],
+                                                  [str(i) for i in range(len(qs))], k=args.k, threads=1)),
+        "sparse": (sparse_load_s, sparse_mb,
+                   lambda q, fields: search_bm25_sparse.search(q, args.k, sparse, fields),
+                   lambda qs: search_bm25_sparse.search_many(qs, args.k, sparse, "ids")),
+    }
+
+    for name, (load_s, load_mb, search_fn, batch_fn) in engines.items():
+        row = {"load_s": load_s, "load_rss_mb": load_mb}
+        for fields in ("ids", "full"):
+            row[fields] = time_single(lambda q: search_fn(q, fields), queries)
+        row["batched_qps"] = time_batched(batch_fn, queries, BATCH_SIZE)
+        report["engines"][name] = row
+
+        print(f"{name:7s} | load {load_s:6.2f}s (+{load_mb:.0f} MB) | ids p50 {row['ids']['p50']:.2f} ms "
+              f"p99 {row['ids']['p99']:.2f} ms | full p50 {row['full']['p50']:.2f} ms | batched {row['batched_qps']:.0f} q/s")
+
+    print("parity:", json.dumps(report["parity"]))
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("Report saved to", REPORT_PATH)
@@ -0,0 +1,139 @@
+import os
+import numpy as np
+import pyarrow as pa
+
+CORPUS_PATH = "../data/processed/recipes.arrow"
+
+# One Arrow IPC file (uncompressed, so it can be memory-mapped and sliced
+# without copies) with a row per recipe: the cleaned fields of
+# clean_recipes_input.jsonl next to the display fields of recipes_display.jsonl.
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("name", pa.string()),
+    ("description", pa.string()),
+    ("tags", pa.list_(pa.string())),
+    ("ingredients", pa.list_(pa.string())),
+    ("display_name", pa.string()),
+    ("display_description", pa.string()),
+    ("display_tags", pa.list_(pa.string())),
+    ("display_ingredients", pa.list_(pa.string())),
+    ("steps", pa.list_(pa.string())),
+])
+CLEAN_COLUMNS = ["id", "name", "description", "tags", "ingredients"]
+DISPLAY_COLUMNS = ["id", "display_name", "display_description", "display_tags", "display_ingredients", "steps"]
+DISPLAY_KEYS = ["name", "description", "tags", "ingredients", "steps"] # display record key of each display column
+
+def as_list(value):
+    # clean_list() gives "" instead of a list for a missing CSV field
+    return value if isinstance(value, list) else []
+
+def record_batch(clean_records, display_records):
+    # both lists come from the same CSV rows, in the same order
+    return pa.RecordBatch.from_arrays([
+        pa.array([int(r["id"]) for r in clean_records], pa.int64()),
+        pa.array([r["name"] for r in clean_records], pa.string()),
+        pa.array([r["description"] for r in clean_records], pa.string()),
+        pa.array([as_list(r["tags"]) for r in clean_records], pa.list_(pa.string())),
+        pa.array([as_list(r["ingredients"]) for r in clean_records], pa.list_(pa.string())),
+        pa.array([r["name"] for r in display_records], pa.string()),
+        pa.array([r["description"] for r in display_records], pa.string()),
+        pa.array([as_list(r["tags"]) for r in display_records], pa.list_(pa.string())),
+        pa.array([as_list(r["ingredients"]) for r in display_records], pa.list_(pa.string())),
+        pa.array([as_list(r["steps"]) for r in display_records], pa.list_(pa.string())),
+    ], schema=SCHEMA)
+
+class CorpusWriter:
+    def __init__(self, path=CORPUS_PATH):
+        self.path = path
+        self._sink = pa.OSFile(path + ".tmp", "wb")
+        self._writer = pa.ipc.new_file(self._sink, SCHEMA)
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+        self._sink.close()
+        os.replace(self.path + ".tmp", self.path)
+
+def is_fresh(jsonl_path, path=CORPUS_PATH):
+    # usable in place of jsonl_path: present and written no earlier than it
+    # (data_process.py / build_dsp_metadata.py rewrite one JSONL alone)
+    if not os.path.exists(path):
+        return False
+    if not os.path.exists(jsonl_path):
+        return True
+
+    return os.stat(path).st_mtime_ns >= os.stat(jsonl_path).st_mtime_ns
+
+def open_corpus(columns=None, path=CORPUS_PATH):
+    # memory-mapped: only the pages of the projected columns are ever read
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+
+    return table.select(columns) if columns is not None else table
+
+def iter_records(columns, chunk_size, path=CORPUS_PATH):
+    # zero-copy slices; only the current chunk is turned into Python objects
+    table = open_corpus(columns, path)
+    for start in range(0, table.num_rows, chunk_size):
+        yield table.slice(start, chunk_size).to_pylist()
+
+def to_frame(table):
+    # list columns as Python lists, like pd.read_json gives them
+    import pandas as pd
+
+    return pd.DataFrame({
+        name: column.to_pylist() if pa.types.is_list(column.type) else column.to_numpy()
+        for name, column in zip(table.column_names, table.columns)
+    })
+
+def load_clean_frame(jsonl_path, columns=CLEAN_COLUMNS, path=CORPUS_PATH):
+    import pandas as pd
+
+    if is_fresh(jsonl_path, path):
+        return to_frame(open_corpus(columns, path))
+
+    return pd.read_json(jsonl_path, lines=True)[columns]
+
+# Read-only display metadata backed by the corpus file, with the lookup
+# interface of metadata_store.MetadataStore.
+class CorpusMetadata:
+    def __init__(self, path=CORPUS_PATH):
+        table = open_corpus(DISPLAY_COLUMNS, path)
+        ids = table.column("id").to_numpy()
+
+        self.order = np.argsort(ids, kind="stable")
+        self.ids = ids[self.order]
+        self.table = table
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, rid):
+        return self.row_of(rid) >= 0
+
+    def row_of(self, rid):
+        # the last row of a duplicated id wins, as in metadata_store
+        rid = int(rid)
+        i = int(np.searchsorted(self.ids, rid, side="right")) - 1
+        if i >= 0 and self.ids[i] == rid:
+            return int(self.order[i])
+
+        return -1
+
+    def record(self, row):
+        values = self.table.slice(row, 1).to_pylist()[0]
+        record = {"id": str(values["id"])}
+        for key, column in zip(DISPLAY_KEYS, DISPLAY_COLUMNS[1:]):
+            record[key] = values[column]
+
+        return record
+
+    def get(self, rid, default=None):
+        row = self.row_of(rid)
+
+        return self.record(row) if row >= 0 else default
+
+    def get_many(self, rids):
+        return [self.get(rid) for rid in rids]
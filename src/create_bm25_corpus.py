@@ -1,5 +1,6 @@
 import json
 import os
+import corpus_store
 
 INPUT_PATH = "../data/processed/clean_recipes_input.jsonl"
 INPUT_DISPLAY_PATH = "../data/processed/recipes_display.jsonl"
@@ -36,12 +37,21 @@ def get_contents(obj):
 
     return contents
 
-if __name__ == "__main__":
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+def write_from_corpus(fout, chunk_size=5000):
+    # both record kinds sit on the same row of the columnar corpus, so no
+    # id -> display map has to be built first
+    columns = corpus_store.CLEAN_COLUMNS + corpus_store.DISPLAY_COLUMNS[1:]
+    for chunk in corpus_store.iter_records(columns, chunk_size):
+        for row in chunk:
+            display_obj = {key: row[column] for key, column in
+                           zip(corpus_store.DISPLAY_KEYS, corpus_store.DISPLAY_COLUMNS[1:])}
+            doc = {"id": str(row["id"]), "contents": get_contents(row), "display": display_obj}
+            fout.write(json.dumps(doc) + "\n")
 
+def write_from_jsonl(fout):
     raw_map = get_raw()
 
-    with open(INPUT_PATH, "r") as fin, open(OUTPUT_PATH, "w") as fout:
+    with open(INPUT_PATH, "r") as fin:
         for line in fin:
             line = line.strip()
             json_obj = json.loads(line)
@@ -52,10 +62,21 @@ if __name__ == "__main__":
 
             display_obj = raw_map.get(rid, {})
             
+            # display metadata is nested as an object, so search_bm25 decodes
+            # each stored document with a single json.loads
             doc = {
                 "id": rid,
                 "contents": contents,
-                "raw": json.dumps(display_obj)
+                "display": display_obj
             }
             
             fout.write(json.dumps(doc) + "\n")
+
+if __name__ == "__main__":
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    with open(OUTPUT_PATH, "w") as fout:
+        if corpus_store.is_fresh(INPUT_PATH) and corpus_store.is_fresh(INPUT_DISPLAY_PATH):
+            write_from_corpus(fout)
+        else:
+            write_from_jsonl(fout)
@@ -1,120 +1,62 @@
-import os
-import pandas as pd
-import json
-import re
+from text_normalize import light_normalize, light_normalize_many
 
-MEASUREMENT_WORDS = {
-# units
-"cup", "cups", 
-"teaspoon", "teaspoons", "tsp", "tsps", "tablespoon", "tablespoons", "tbsp", "tbsps",
-"ml", "milliliter", "milliliters",
-"liter", "liters", "litre", "litres", "l",
-"ounce", "ounces", "oz",
-"gram", "grams", "g",
-"kilogram", "kilograms", "kg",
-"pound", "pounds", "lb", "lbs",
-
-# counts / packaging
-"pinch", "pinches",
-"dash", "dashes",
-"slice","slices",
-"clove","cloves",
-"can","cans",
-"jar","jars",
-"packet", "packets",
-"package", "packages",
-"stick", "sticks",
-"bunch", "bunches",
-}
-
-def light_normalize(input_str):
-    if not isinstance(input_str, str):
-        return ""
-
-    input_str = input_str.lower()
-    
-    input_str = input_str.replace("&", " and ")
-    input_str = input_str.replace("+", " and ")
-    input_str = input_str.replace("/", " and ")
-    input_str = input_str.replace("'", "")
-
-    input_str = re.sub(r'[^a-z0-9\s\-]', ' ', input_str)
-    input_str = re.sub(r'\s+', ' ', input_str).strip()
-
-    return input_str
-
-def clean_and_get_tags(tags):
-    if not isinstance(tags, str):
+def split_list_items(list_str):
+    # "['a', 'b']" -> ["a", " b"]; the raw CSV list fields, not yet normalized
+    if not isinstance(list_str, str):
         return []
 
-    tags = tags.replace("[", "")
-    tags = tags.replace("]", "")
-    tags = tags.replace("'", "")
-    tags = tags.replace("\"", "")
+    for ch in "[]'\"":
+        list_str = list_str.replace(ch, "")
 
-    tags = tags.split(",")
+    return list_str.split(",")
 
-    tags = list(map(light_normalize, tags))
+def clean_and_get_tags(tags):
+    tags = list(map(light_normalize, split_list_items(tags)))
     tags = [item for item in tags if item]
     
     return tags
 
-def normalize_ingredients(input_str):
-    if not isinstance(input_str, str):
-        return ""
-
-    input_str = input_str.lower()
-    
-    input_str = input_str.replace("&", " and ")
-    input_str = input_str.replace("+", " and ")
-
-    input_str = re.sub(r'\d+', ' ', input_str)
-    input_str = re.sub(r'[^a-z\s\-]', ' ', input_str)
-    input_str = re.sub(r'\s+', ' ', input_str).strip()
-
-    tokens = input_str.split()
-
-    tokens = [t for t in tokens if t not in MEASUREMENT_WORDS]
-
-    return " ".join(tokens) 
-
 def clean_and_get_ingredients(ingredients):
-    if not isinstance(ingredients, str):
-        return []
-
-    ingredients = ingredients.replace("[", "")
-    ingredients = ingredients.replace("]", "")
-    ingredients = ingredients.replace("'", "")
-    ingredients = ingredients.replace("\"", "")
-
-    ingredients = ingredients.split(",")
-
-    ingredients = list(map(light_normalize, ingredients))
+    ingredients = list(map(light_normalize, split_list_items(ingredients)))
     ingredients = [item for item in ingredients if item]
     
     return ingredients
 
-PATH = "../data/raw/RAW_recipes.csv"
-
-df = pd.read_csv(PATH)
-
-df = df[["name", "id", "tags", "description", "ingredients"]]
-
-df["name"] = df["name"].map(light_normalize)
-df["tags"] = df["tags"].map(clean_and_get_tags)
-df["description"] = df["description"].map(light_normalize)
-df["ingredients"] = df["ingredients"].map(clean_and_get_ingredients)
+def clean_record(name, rid, tags, description, ingredients):
+    return {
+        "id": str(rid),
+        "name": light_normalize(name),
+        "description": light_normalize(description),
+        "tags": clean_and_get_tags(tags),
+        "ingredients": clean_and_get_ingredients(ingredients),
+    }
+
+def clean_records(names, rids, tags, descriptions, ingredients):
+    # clean_record over whole columns: every text field and list item of the
+    # chunk goes through one light_normalize_many call
+    tag_items = [split_list_items(t) for t in tags]
+    ingredient_items = [split_list_items(i) for i in ingredients]
+
+    flat = list(names) + list(descriptions)
+    flat += [item for items in tag_items for item in items]
+    flat += [item for items in ingredient_items for item in items]
+    normalized = iter(light_normalize_many(flat))
+
+    clean_names = [next(normalized) for _ in names]
+    clean_descriptions = [next(normalized) for _ in descriptions]
+    clean_tags = [[t for t in (next(normalized) for _ in items) if t] for items in tag_items]
+    clean_ingredients = [[t for t in (next(normalized) for _ in items) if t] for items in ingredient_items]
+
+    return [
+        {"id": str(rid), "name": name, "description": description, "tags": t, "ingredients": i}
+        for rid, name, description, t, i in zip(rids, clean_names, clean_descriptions, clean_tags, clean_ingredients)
+    ]
 
+PATH = "../data/raw/RAW_recipes.csv"
 OUT_PATH = "../data/processed/clean_recipes_input.jsonl"
-os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
 
-with open(OUT_PATH, "w") as f:
-    for _, row in df.iterrows():
-        record = {
-            "id": str(row["id"]),
-            "name": row["name"],
-            "description": row["description"],
-            "tags": row["tags"],
-            "ingredients": row["ingredients"],
-        }
-        f.write(json.dumps(record) + "\n")
+if __name__ == "__main__":
+    # streams the CSV in chunks through a process pool; see preprocess.py
+    import preprocess
+
+    preprocess.run_pipeline(PATH, clean_path=OUT_PATH, display_path=None)
@@ -1,20 +1,43 @@
 import os
+import time
+import queue
+import argparse
+import hashlib
+import threading
+import multiprocessing
+from collections import deque
 from sentence_transformers import SentenceTransformer
 import torch
 import numpy as np
 import textwrap
 import json
+import corpus_store
 
 FILE_PATH = "../data/processed/clean_recipes_input.jsonl"
 EMBD_PATH = "../data/embeddings/all-MiniLM-L6-v2.data"
 ID_PATH = "../data/embeddings/all-MiniLM-L6-v2.txt"
+HASH_PATH = "../data/embeddings/all-MiniLM-L6-v2.hash"
+MANIFEST_PATH = "../data/embeddings/all-MiniLM-L6-v2.manifest.json"
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
 BATCH_SIZE = 128
-CHUNK_SIZE = 5000
+CHUNK_SIZE = 5000 # also the window inside which recipes are bucketed by length
+# "tokens": sort each chunk by token length and encode similar-length batches;
+# "chars": one encode() call per chunk (SentenceTransformers sorts by characters);
+# "file": batches in file order, padded to their longest member
+SCHEDULE = "tokens"
+SCHEDULES = ["tokens", "chars", "file"]
 EMB_DIM = 384
-N_RECIPES = 231_637
+HASH_BYTES = 16
 
 def get_input_data(file_path, chunk_size):
+    if corpus_store.is_fresh(file_path):
+        for chunk in corpus_store.iter_records(corpus_store.CLEAN_COLUMNS, chunk_size):
+            for json_object in chunk:
+                json_object["id"] = str(json_object["id"]) # as written in the JSONL
+            yield chunk
+        return
+
     chunk = []
 
     with open(file_path, 'r', encoding='utf-8') as f:
@@ -35,7 +58,7 @@ def get_input_data(file_path, chunk_size):
 
 def get_embed_input_str(json_object):
     name = json_object["name"]
-    description = json_object["description"] 
+    description = json_object["description"]
     ingredients = ", ".join(json_object["ingredients"])
     tags = ", ".join(json_object["tags"])
 
@@ -44,7 +67,7 @@ def get_embed_input_str(json_object):
     description: {description}
     ingredients: {ingredients}
     tags: {tags}
-    """ 
+    """
 
     return textwrap.dedent(emb_str).strip()
 
@@ -58,50 +81,468 @@ def ensure_parent_dir(path):
     if directory:
         os.makedirs(directory, exist_ok=True)
 
-if __name__ == "__main__":
-    device = "mps" if torch.backends.mps.is_available() else "cpu"    
-
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2", device=device)
-    model.eval()
-
-    ensure_parent_dir(EMBD_PATH)
-    ensure_parent_dir(ID_PATH)
-
-    emb_mem = np.memmap(
-        EMBD_PATH,
-        dtype="float32",
-        mode="w+",
-        shape=(N_RECIPES, EMB_DIM),
-    )
-
-    id_out = open(ID_PATH, "w", encoding="utf-8")
-
-    offset = 0
-    for json_objects in get_input_data(FILE_PATH, CHUNK_SIZE):
-        id_list = [get_id(json_object) for json_object in json_objects]
-        embed_input_str = [get_embed_input_str(json_object) for json_object in json_objects]
-
-        with torch.no_grad():
-            document_embeddings_chunk = model.encode(
-                embed_input_str,
-                batch_size=BATCH_SIZE,
-                convert_to_tensor=True,
-                device=device,
-                normalize_embeddings=True,
-                show_progress_bar=True,
-            )
-    
-        document_embeddings_chunk_np = document_embeddings_chunk.cpu().numpy()
-        n = len(document_embeddings_chunk_np)
-        emb_mem[offset:offset+n, :] = document_embeddings_chunk_np
+def content_hash(embed_str, model_name=MODEL_NAME):
+    return hashlib.blake2b((model_name + "\0" + embed_str).encode("utf-8"), digest_size=HASH_BYTES).digest()
+
+def new_manifest():
+    return {"model": MODEL_NAME, "dim": EMB_DIM, "dtype": "float32", "committed_rows": 0, "tombstones": []}
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return new_manifest()
+
+    with open(path, "r") as f:
+        manifest = json.load(f)
+
+    if manifest.get("model") != MODEL_NAME or manifest.get("dim") != EMB_DIM:
+        print("Manifest was built with a different model, starting from scratch")
+        return new_manifest()
+
+    return manifest
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(path + ".tmp", path)
+
+def legacy_rows(embd_path, id_path, row_bytes):
+    # rows of a store written before manifests existed: as many as both the
+    # memmap and the id file hold
+    if not os.path.exists(embd_path) or not os.path.exists(id_path):
+        return 0
+
+    with open(id_path, "r", encoding="utf-8") as f:
+        n_ids = sum(1 for _ in f)
+
+    return min(n_ids, os.path.getsize(embd_path) // row_bytes)
+
+def legacy_hashes(ids, input_path):
+    # digests of the current input for the adopted rows; a row whose recipe is
+    # not in the input gets an all-zero digest, which never matches
+    wanted = set(ids)
+    digests = {}
+    for json_objects in get_input_data(input_path, CHUNK_SIZE):
+        for json_object in json_objects:
+            rid = str(get_id(json_object))
+            if rid in wanted:
+                digests[rid] = content_hash(get_embed_input_str(json_object))
+
+    return [digests.get(rid, bytes(HASH_BYTES)) for rid in ids]
+
+def save_table(table, path):
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, table)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(path + ".tmp", path)
+
+def merge_rows(table, new_rows):
+    # inserts (id, row) pairs into a table sorted by id
+    added = np.array(sorted((int(rid), row) for rid, row in new_rows.items()), dtype=np.int64).reshape(-1, 2)
+    at = np.searchsorted(table[:, 0], added[:, 0])
+
+    return np.insert(np.asarray(table), at, added, axis=0)
+
+# Row-aligned store: row i of the memmap, line i of the id file and the i-th
+# digest in the hash file describe the same recipe. Only the first
+# committed_rows rows recorded in the manifest are trusted; anything a crashed
+# run wrote past that point is rolled back when the store is opened.
+# A table of (id, row) pairs sorted by id (<name>.rows.npy) finds the rows of
+# given recipes without reading the id file, so opening the store and planning
+# a delta cost time in proportion to the delta, not to the store.
+# A store without a manifest (built before manifests existed) is adopted as
+# is; only rebuild=True discards existing rows.
+class EmbeddingStore:
+    def __init__(self, embd_path=EMBD_PATH, id_path=ID_PATH, hash_path=HASH_PATH,
+                 manifest_path=MANIFEST_PATH, dim=EMB_DIM, input_path=FILE_PATH, rebuild=False):
+        self.embd_path = embd_path
+        self.id_path = id_path
+        self.hash_path = hash_path
+        self.manifest_path = manifest_path
+        self.table_path = os.path.splitext(id_path)[0] + ".rows.npy"
+        self.dim = dim
+        self.row_bytes = 4 * dim
+
+        for path in (embd_path, id_path, hash_path, manifest_path):
+            ensure_parent_dir(path)
+
+        if rebuild:
+            self.manifest = new_manifest()
+        elif not os.path.exists(manifest_path) and legacy_rows(embd_path, id_path, self.row_bytes):
+            self.adopt_legacy(input_path)
+        else:
+            self.manifest = load_manifest(manifest_path)
+        n = self.manifest["committed_rows"]
+
+        for path, row_size in ((embd_path, self.row_bytes), (hash_path, HASH_BYTES)):
+            with open(path, "a+b") as f:
+                f.truncate(n * row_size)
+        with open(id_path, "a+b") as f:
+            f.truncate(self.id_bytes(n))
+
+        self.n_rows = n
+        self.next_row = n
+        self._table = None
+        self._new_rows = {} # id -> row for rows assigned since the last commit
+        # plan() and write() may run on different threads in pipelined mode
+        self._lock = threading.Lock()
+
+    def id_bytes(self, n):
+        # the manifest records the committed length of the id file; manifests
+        # written before it did fall back to counting the first n lines
+        if "id_bytes" in self.manifest:
+            return self.manifest["id_bytes"]
+        if not os.path.exists(self.id_path):
+            return 0
+
+        with open(self.id_path, "rb") as f:
+            return sum(len(line) for _, line in zip(range(n), f))
+
+    def read_ids(self, n):
+        if not os.path.exists(self.id_path):
+            return []
+
+        with open(self.id_path, "r", encoding="utf-8") as f:
+            return [line.strip() for _, line in zip(range(n), f)]
+
+    def adopt_legacy(self, input_path):
+        n = legacy_rows(self.embd_path, self.id_path, self.row_bytes)
+        ids = self.read_ids(n)
+
+        hashes = legacy_hashes(ids, input_path)
+        with open(self.hash_path, "wb") as f:
+            f.write(b"".join(hashes))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.manifest = new_manifest()
+        self.manifest["committed_rows"] = n
+        save_manifest(self.manifest, self.manifest_path)
+
+        unknown = sum(1 for digest in hashes if digest == bytes(HASH_BYTES))
+        print(f"Adopted {n} rows from a store without a manifest ({unknown} not in {input_path}, kept as is)")
+
+    def table(self):
+        # rebuilt from the id file when it is missing or out of step with the
+        # manifest (stores written before it existed, a crash before commit)
+        if self._table is None:
+            n = self.manifest["committed_rows"]
+            if os.path.exists(self.table_path) and self.manifest.get("table_rows") == n:
+                table = np.load(self.table_path, mmap_mode="r")
+                if table.shape == (n, 2):
+                    self._table = table
+                    return table
+
+            ids = np.array([int(rid) for rid in self.read_ids(n)], dtype=np.int64)
+            order = np.argsort(ids, kind="stable")
+            self._table = np.stack([ids[order], order.astype(np.int64)], axis=1).reshape(-1, 2)
+            save_table(self._table, self.table_path)
+
+        return self._table
+
+    # row of each recipe id, -1 where the store has none
+    def rows(self, rids):
+        rids = [str(rid) for rid in rids]
+        table = self.table()
+        keys = np.array([int(rid) for rid in rids], dtype=np.int64)
+        rows = np.full(len(keys), -1, dtype=np.int64)
+
+        if len(table) and len(keys):
+            at = np.minimum(np.searchsorted(table[:, 0], keys), len(table) - 1)
+            found = table[at, 0] == keys
+            rows[found] = table[at[found], 1]
+
+        for i, rid in enumerate(rids):
+            rows[i] = self._new_rows.get(rid, rows[i])
+
+        return rows
+
+    def row(self, rid):
+        row = int(self.rows([rid])[0])
+
+        return row if row >= 0 else None
+
+    def stored_hashes(self, rows):
+        rows = [row for row in rows if 0 <= row < self.n_rows]
+        if not rows:
+            return {}
+
+        hashes = np.memmap(self.hash_path, dtype=np.uint8, mode="r", shape=(self.n_rows, HASH_BYTES))
+        return {row: hashes[row].tobytes() for row in rows}
+
+    # Returns (row, id, digest, text) for every recipe that is new or whose
+    # embedding input changed; new recipes get the next free rows. Plans must
+    # be written in the order they were made.
+    def plan(self, json_objects):
+        plan = {}
+
+        with self._lock:
+            rids = [str(get_id(json_object)) for json_object in json_objects]
+            rows = self.rows(rids).tolist()
+            stored = self.stored_hashes(rows)
+
+            for json_object, rid, row in zip(json_objects, rids, rows):
+                text = get_embed_input_str(json_object)
+                digest = content_hash(text)
+
+                row = self._new_rows.get(rid, row)
+                if row < 0:
+                    row = self.next_row
+                    self.next_row += 1
+                    self._new_rows[rid] = row
+                elif stored.get(row) == digest:
+                    continue
+
+                # a recipe repeated within the chunk keeps its last version
+                plan[row] = (row, rid, digest, text)
+
+        return [plan[row] for row in sorted(plan)]
+
+    def write(self, plan, embeddings):
+        appended = [(row, rid) for row, rid, _, _ in plan if row >= self.n_rows]
+        total = self.n_rows + len(appended)
+
+        with open(self.embd_path, "r+b") as f:
+            f.truncate(total * self.row_bytes)
+
+        emb_mem = np.memmap(self.embd_path, dtype="float32", mode="r+", shape=(total, self.dim))
+        emb_mem[np.array([p[0] for p in plan])] = embeddings
         emb_mem.flush()
-    
-        for recipe_id in id_list:
-            id_out.write(str(recipe_id) + "\n")
+        del emb_mem
+
+        # vectors first, then digests: a digest never describes a vector that was not written
+        with open(self.hash_path, "r+b") as f:
+            for row, _, digest, _ in plan:
+                f.seek(row * HASH_BYTES)
+                f.write(digest)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with open(self.id_path, "a", encoding="utf-8") as f:
+            for _, rid in appended:
+                f.write(rid + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock:
+            self.n_rows = total
+
+    def commit(self):
+        # the table is written before the manifest that vouches for it
+        with self._lock:
+            written = {rid: row for rid, row in self._new_rows.items() if row < self.n_rows}
+            n = self.n_rows
+        if written:
+            self._table = merge_rows(self.table(), written)
+            save_table(self._table, self.table_path)
+            with self._lock:
+                for rid in written:
+                    del self._new_rows[rid]
+
+        self.manifest["committed_rows"] = n
+        self.manifest["table_rows"] = len(self.table())
+        self.manifest["id_bytes"] = os.path.getsize(self.id_path)
+        save_manifest(self.manifest, self.manifest_path)
+
+    # rows whose recipe no longer appears in the input stay in the store but
+    # are listed as tombstones, which build_faiss_from_memmap.py skips
+    def set_tombstones(self, seen_ids):
+        self.manifest["tombstones"] = [rid for rid in self.read_ids(self.n_rows) if rid not in seen_ids]
+
+        return self.manifest["tombstones"]
+
+def encode_texts(model, texts, device, batch_size=BATCH_SIZE, show_progress_bar=True):
+    with torch.no_grad():
+        embeddings = model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_tensor=True,
+            device=device,
+            normalize_embeddings=True,
+            show_progress_bar=show_progress_bar,
+        )
+
+    return embeddings.cpu().numpy()
+
+def token_lengths(model, texts):
+    encoded = model.tokenizer(texts, truncation=True, max_length=model.max_seq_length,
+                              return_attention_mask=False, return_token_type_ids=False)
+
+    return np.fromiter((len(ids) for ids in encoded["input_ids"]), dtype=np.int64, count=len(texts))
+
+def schedule_batches(texts, lengths, batch_size, schedule):
+    if schedule == "tokens":
+        order = np.argsort(-lengths, kind="stable")
+    elif schedule == "chars":
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+    else:
+        order = np.arange(len(texts))
 
-        offset += n
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+# Encodes texts batch by batch in the given schedule and scatters each batch
+# back to its input position, so the output lines up with the plan rows.
+# token_stats (optional) accumulates real vs padded token counts.
+def encode_scheduled(model, texts, device, schedule=SCHEDULE, batch_size=BATCH_SIZE, token_stats=None):
+    lengths = token_lengths(model, texts)
+    batches = schedule_batches(texts, lengths, batch_size, schedule)
+
+    if token_stats is not None:
+        token_stats["real"] = token_stats.get("real", 0) + int(lengths.sum())
+        token_stats["padded"] = token_stats.get("padded", 0) + sum(len(b) * int(lengths[b].max()) for b in batches)
+
+    if schedule == "chars":
+        return encode_texts(model, texts, device, batch_size, show_progress_bar=False)
+
+    embeddings = np.empty((len(texts), EMB_DIM), dtype="float32")
+    for batch in batches:
+        embeddings[batch] = encode_texts(model, [texts[i] for i in batch], device, len(batch), show_progress_bar=False)
+
+    return embeddings
+
+def run_serial(store, chunks, model, device, schedule=SCHEDULE, token_stats=None):
+    seen = set()
+    embedded = 0
+
+    for json_objects in chunks:
+        seen.update(str(get_id(json_object)) for json_object in json_objects)
+
+        plan = store.plan(json_objects)
+        if not plan:
+            continue
+
+        document_embeddings_chunk_np = encode_scheduled(model, [p[3] for p in plan], device, schedule,
+                                                        token_stats=token_stats)
+        store.write(plan, document_embeddings_chunk_np)
+        store.commit()
+
+        embedded += len(plan)
         if torch.backends.mps.is_available():
             torch.mps.empty_cache()
 
-    id_out.close()
-    print("Done, total valid recipes:", offset)
+    return embedded, seen
+
+_WORKER_MODEL = None
+_WORKER_SCHEDULE = SCHEDULE
+
+def _init_encoder(threads, schedule=SCHEDULE):
+    global _WORKER_MODEL, _WORKER_SCHEDULE
+    torch.set_num_threads(threads)
+
+    _WORKER_MODEL = SentenceTransformer(MODEL_NAME, device="cpu")
+    _WORKER_MODEL.eval()
+    _WORKER_SCHEDULE = schedule
+
+def _encode_unit(texts):
+    token_stats = {}
+    embeddings = encode_scheduled(_WORKER_MODEL, texts, "cpu", _WORKER_SCHEDULE, token_stats=token_stats)
+
+    return embeddings, token_stats
+
+def physical_cores():
+    try:
+        import psutil
+        return psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    except ImportError:
+        return os.cpu_count() or 1
+
+# Pipelined CPU mode: the reader (pool task thread) parses and plans chunks,
+# a pool of encoder processes -- each with its own model and torch thread
+# budget -- embeds them, and a writer thread writes, flushes and commits in
+# input order. At most 2 x workers chunks are in flight.
+def run_pipelined(store, chunks, workers, threads_per_worker=1, schedule=SCHEDULE, token_stats=None):
+    slots = threading.BoundedSemaphore(2 * workers)
+    plans = deque()
+    seen = set()
+    to_write = queue.Queue(maxsize=workers)
+    writer_errors = []
+    stats = {"embedded": 0}
+
+    def units():
+        for json_objects in chunks:
+            seen.update(str(get_id(json_object)) for json_object in json_objects)
+
+            plan = store.plan(json_objects)
+            if not plan:
+                continue
+
+            slots.acquire()
+            plans.append(plan)
+            yield [p[3] for p in plan]
+
+    def writer():
+        while True:
+            item = to_write.get()
+            if item is None:
+                return
+
+            plan, embeddings = item
+            try:
+                if not writer_errors:
+                    store.write(plan, embeddings)
+                    store.commit()
+                    stats["embedded"] += len(plan)
+            except Exception as e:
+                writer_errors.append(e)
+            finally:
+                slots.release()
+
+    writer_thread = threading.Thread(target=writer, name="embed-writer", daemon=True)
+    writer_thread.start()
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_encoder, initargs=(threads_per_worker, schedule)) as pool:
+        for embeddings, unit_stats in pool.imap(_encode_unit, units()):
+            to_write.put((plans.popleft(), embeddings))
+            if token_stats is not None:
+                for key, value in unit_stats.items():
+                    token_stats[key] = token_stats.get(key, 0) + value
+
+    to_write.put(None)
+    writer_thread.join()
+
+    if writer_errors:
+        raise writer_errors[0]
+
+    return stats["embedded"], seen
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true", help="discard all stored rows and re-embed everything")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="encoder processes for the pipelined CPU mode (0 = serial; -1 = one per physical core)")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--schedule", default=SCHEDULE, choices=SCHEDULES, help="how texts are grouped into batches")
+    args = parser.parse_args()
+
+    store = EmbeddingStore(rebuild=args.rebuild)
+    print("Committed rows from previous runs:", store.n_rows)
+
+    chunks = get_input_data(FILE_PATH, CHUNK_SIZE)
+    token_stats = {}
+    start = time.perf_counter()
+
+    if args.workers != 0:
+        workers = args.workers if args.workers > 0 else max(1, physical_cores() // args.threads_per_worker)
+        print(f"Pipelined mode: {workers} encoder processes x {args.threads_per_worker} threads")
+        embedded, seen = run_pipelined(store, chunks, workers, args.threads_per_worker, args.schedule, token_stats)
+    else:
+        device = "mps" if torch.backends.mps.is_available() else "cpu"
+
+        model = SentenceTransformer(MODEL_NAME, device=device)
+        model.eval()
+
+        embedded, seen = run_serial(store, chunks, model, device, args.schedule, token_stats)
+
+    elapsed = time.perf_counter() - start
+    tombstones = store.set_tombstones(seen)
+    store.commit()
+
+    print("Done, total rows:", store.n_rows, "| embedded this run:", embedded, "| tombstoned:", len(tombstones))
+    print(f"Throughput: {embedded / elapsed:.1f} recipes/s over {elapsed:.1f}s")
+    if token_stats:
+        print(f"Padded-token ratio ({args.schedule}): {token_stats['padded'] / token_stats['real']:.3f}")
@@ -0,0 +1,206 @@
+import os
+import re
+import json
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+CACHE_CAPACITY = 4096
+DISK_CAPACITY = 1_000_000
+
+def model_slug(model_name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+# Persistent tier, one pair of files per model: an append-only float32 block
+# and a JSONL key file mapping each query text to its row. Vectors are written
+# before their key, so an interrupted append leaves at most a trailing row (or
+# partial key line) that is truncated away on the next open. Intended for a
+# single writer process.
+class DiskTier:
+    def __init__(self, cache_dir, model_name, dim, capacity=DISK_CAPACITY):
+        os.makedirs(cache_dir, exist_ok=True)
+        slug = model_slug(model_name)
+        self.vec_path = os.path.join(cache_dir, slug + ".f32")
+        self.key_path = os.path.join(cache_dir, slug + ".keys.jsonl")
+        self.model_name = model_name
+        self.dim = dim
+        self.capacity = capacity
+        self.row_bytes = 4 * dim
+
+        self.rows = {}
+        good_bytes = 0
+        if os.path.exists(self.key_path):
+            with open(self.key_path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    self.rows[entry["text"]] = entry["row"]
+                    good_bytes += len(line)
+
+        n_rows = max(self.rows.values()) + 1 if self.rows else 0
+        with open(self.key_path, "ab") as f:
+            f.truncate(good_bytes)
+        with open(self.vec_path, "ab") as f:
+            f.truncate(n_rows * self.row_bytes)
+
+        self.n_rows = n_rows
+        self._mem = None
+        self._mapped_rows = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _block(self):
+        if self._mem is None or self._mapped_rows < self.n_rows:
+            self._mem = np.memmap(self.vec_path, dtype="float32", mode="r", shape=(self.n_rows, self.dim))
+            self._mapped_rows = self.n_rows
+
+        return self._mem
+
+    def get(self, text):
+        row = self.rows.get(text)
+        if row is None:
+            return None
+
+        return np.array(self._block()[row])
+
+    def put(self, text, vec):
+        if text in self.rows or len(self.rows) >= self.capacity:
+            return
+
+        row = self.n_rows
+        with open(self.vec_path, "ab") as f:
+            f.write(np.ascontiguousarray(vec, dtype="float32").tobytes())
+
+        with open(self.key_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"text": text, "row": row}) + "\n")
+
+        self.rows[text] = row
+        self.n_rows += 1
+
+class EmbeddingCache:
+    def __init__(self, model_name, dim, capacity=CACHE_CAPACITY, persist_dir=None):
+        self.model_name = model_name
+        self.dim = dim
+        self.capacity = capacity
+        self.disk = DiskTier(persist_dir, model_name, dim) if persist_dir else None
+
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.mem_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.encoded = 0
+        self.encode_s = 0.0
+
+    def _remember(self, key, vec):
+        if self.capacity <= 0:
+            return
+
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    def lookup(self, text):
+        key = (self.model_name, text)
+
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self.mem_hits += 1
+                return vec
+
+            if self.disk is not None:
+                vec = self.disk.get(text)
+                if vec is not None:
+                    self._remember(key, vec)
+                    self.disk_hits += 1
+                    return vec
+
+            self.misses += 1
+            return None
+
+    def store(self, text, vec):
+        vec = np.array(vec, dtype="float32")
+
+        with self._lock:
+            self._remember((self.model_name, text), vec)
+            if self.disk is not None:
+                self.disk.put(text, vec)
+
+    def get_or_encode(self, texts, encode_fn):
+        out = np.empty((len(texts), self.dim), dtype="float32")
+        missing = {}
+
+        for i, text in enumerate(texts):
+            vec = self.lookup(text)
+            if vec is None:
+                missing.setdefault(text, []).append(i)
+            else:
+                out[i] = vec
+
+        if missing:
+            miss_texts = list(missing)
+            start = time.perf_counter()
+            embs = encode_fn(miss_texts)
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self.encode_s += elapsed
+                self.encoded += len(miss_texts)
+
+            for text, emb in zip(miss_texts, embs):
+                self.store(text, emb)
+                out[missing[text]] = emb
+
+        return out
+
+    def stats(self):
+        with self._lock:
+            hits = self.mem_hits + self.disk_hits
+            lookups = hits + self.misses
+            avg_encode_s = self.encode_s / self.encoded if self.encoded else 0.0
+
+            return {
+                "model": self.model_name,
+                "lookups": lookups,
+                "mem_hits": self.mem_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "mem_entries": len(self._lru),
+                "disk_entries": len(self.disk) if self.disk is not None else 0,
+                "encode_s": self.encode_s,
+                "avg_encode_ms": avg_encode_s * 1000.0,
+                # estimate: every hit would otherwise have cost one average encode
+                "encode_s_saved": hits * avg_encode_s,
+            }
+
+if __name__ == "__main__":
+    # Replay a head-skewed (Zipf) stream of the eval and notebook queries
+    import search_faiss
+    from bench_queries import load_bench_queries
+
+    queries = load_bench_queries()
+    rng = np.random.default_rng(0)
+    stream = [queries[(r - 1) % len(queries)] for r in rng.zipf(1.3, size=5000)]
+
+    searcher, metadata = search_faiss.get_searcher()
+    start = time.perf_counter()
+    for q in stream:
+        search_faiss.search(q, searcher=searcher, metadata=metadata)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(stream)} queries in {elapsed:.2f}s")
+    print(json.dumps(search_faiss.get_embedding_cache().stats(), indent=2))
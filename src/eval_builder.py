@@ -1,6 +1,8 @@
-import pandas as pd
 import json
 import os
+import time
+import recipe_bitmaps
+import corpus_store
 
 INPUT_PATH = "../data/processed/clean_recipes_input.jsonl"
 EVAL_DIR = "../data/eval"
@@ -228,55 +230,67 @@ query_specs = [
     }
 ]
 
-def auto_relevant_ids(df, spec, max_n=50):
+def build_label_index(df):
+    # built once per run: a tag -> row bitmap index and one joined ingredient
+    # string per row, shared by every query spec
+    tag_bits = recipe_bitmaps.TokenBitmaps.build(df["tags"])
+    ing_texts = [" ".join(ings).lower() if isinstance(ings, list) else "" for ings in df["ingredients"]]
+    ing_index = recipe_bitmaps.SubstringIndex(ing_texts)
+
+    return tag_bits, ing_index
+
+def auto_relevant_ids(df, spec, max_n=50, label_index=None):
     must_tags       = set(spec.get("must_tags", []))
     any_tags        = set(spec.get("any_tags", []))
     must_not_tags   = set(spec.get("must_not_tags", []))
     must_ings       = [s.lower() for s in spec.get("must_ingredients", [])]
     must_not_ings   = [s.lower() for s in spec.get("must_not_ingredients", [])]
 
-    def match(row):
-        tags = set(row["tags"]) if isinstance(row["tags"], list) else set()
-        ing_text = " ".join(row["ingredients"]).lower() if isinstance(row["ingredients"], list) else ""
+    if label_index is None:
+        label_index = build_label_index(df)
+    tag_bits, ing_index = label_index
 
-        # must_tags: all must be present
-        if must_tags and not must_tags.issubset(tags):
-            return False
+    bits = recipe_bitmaps.full(len(df))
 
-        # any_tags: at least one must match (if non-empty)
-        if any_tags and not (tags & any_tags):
-            return False
+    # must_tags: all must be present
+    if must_tags:
+        bits &= tag_bits.all_of(must_tags)
 
-        # must_not_tags: none allowed
-        if must_not_tags and (tags & must_not_tags):
-            return False
+    # any_tags: at least one must match (if non-empty)
+    if any_tags:
+        bits &= tag_bits.any_of(any_tags)
 
-        # must_ingredients: all substrings must appear
-        for kw in must_ings:
-            if kw and kw not in ing_text:
-                return False
+    # must_not_tags: none allowed
+    if must_not_tags:
+        bits &= ~tag_bits.any_of(must_not_tags)
 
-        # must_not_ingredients: none may appear
-        for kw in must_not_ings:
-            if kw and kw in ing_text:
-                return False
+    # must_ingredients: all substrings must appear
+    for kw in must_ings:
+        if kw:
+            bits &= ing_index.bitmap(kw)
 
-        return True
+    # must_not_ingredients: none may appear
+    for kw in must_not_ings:
+        if kw:
+            bits &= ~ing_index.bitmap(kw)
 
-    mask = df.apply(match, axis=1)
+    mask = recipe_bitmaps.to_mask(bits, len(df))
     # return df.loc[mask, "id"].head(max_n).tolist()
     return df.loc[mask, "id"].tolist()
 
+if __name__ == "__main__":
+    df = corpus_store.load_clean_frame(INPUT_PATH)
 
-df = pd.read_json(INPUT_PATH, lines=True)
-
-for spec in query_specs:
-    spec["relevant_ids"] = auto_relevant_ids(df, spec, max_n=50)
+    start = time.perf_counter()
+    label_index = build_label_index(df)
+    for spec in query_specs:
+        spec["relevant_ids"] = auto_relevant_ids(df, spec, max_n=50, label_index=label_index)
+    print(f"Labelled {len(query_specs)} specs in {time.perf_counter() - start:.2f}s")
 
-for spec in query_specs:
-    print(spec["qid"], spec["type"], "=>", len(spec["relevant_ids"]), "matches")
+    for spec in query_specs:
+        print(spec["qid"], spec["type"], "=>", len(spec["relevant_ids"]), "matches")
 
-os.makedirs(EVAL_DIR, exist_ok=True)
+    os.makedirs(EVAL_DIR, exist_ok=True)
 
-with open(EVAL_DIR + "/queries.json", "w") as f:
-    json.dump(query_specs, f, indent=2)
+    with open(EVAL_DIR + "/queries.json", "w") as f:
+        json.dump(query_specs, f, indent=2)
@@ -0,0 +1,218 @@
+import os
+import json
+import math
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from bench_queries import EVAL_QUERIES_PATH, load_eval_specs
+
+RUN_DIR = "../results/runs"
+ENGINES = ["bm25", "faiss"]
+K_VALUES = [5, 10, 50, 100]
+WORKERS = 8
+
+def file_signature(path):
+    # (path, size, mtime) of a file, or of every file under a directory
+    if os.path.isdir(path):
+        sigs = []
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                sigs += file_signature(os.path.join(root, name))
+        return sigs
+
+    if not os.path.exists(path):
+        return [[path, None, None]]
+
+    st = os.stat(path)
+    return [[path, st.st_size, st.st_mtime_ns]]
+
+def index_files(engine):
+    import search_bm25
+    import search_faiss
+
+    files = {
+        "bm25": [search_bm25.INDEX_PATH],
+        "faiss": [search_faiss.served_index_path(), search_faiss.METADATA_PATH],
+    }
+    files["hybrid"] = files["bm25"] + files["faiss"]
+
+    return files[engine]
+
+def search_settings(engine):
+    # knobs that change an engine's results without touching its files
+    import search_bm25
+    import search_faiss
+    import search_hybrid
+
+    settings = {
+        "bm25": {"k1": search_bm25.BM25_K1, "b": search_bm25.BM25_B},
+        "faiss": {"model": search_faiss.MODEL_NAME, "index_spec": search_faiss.INDEX_SPEC,
+                  "nprobe": search_faiss.NPROBE, "ef_search": search_faiss.EF_SEARCH},
+    }
+    settings["hybrid"] = {"bm25": settings["bm25"], "faiss": settings["faiss"], "fusion": search_hybrid.FUSION,
+                          "rrf_k": search_hybrid.RRF_K, "weights": search_hybrid.WEIGHTS, "depth": search_hybrid.DEPTH}
+
+    return settings[engine]
+
+def fingerprint(engine, depth, queries_path):
+    with open(queries_path, "rb") as f:
+        queries_sha1 = hashlib.sha1(f.read()).hexdigest()
+
+    index = []
+    for path in index_files(engine):
+        index += file_signature(path)
+
+    return {"engine": engine, "depth": depth, "queries_sha1": queries_sha1, "index": index,
+            "settings": search_settings(engine)}
+
+def run_bm25(specs, depth, workers):
+    import search_bm25
+
+    searcher = search_bm25.get_searcher()
+    qids = [str(spec["qid"]) for spec in specs]
+    queries = [search_bm25.light_normalize(spec["query"]) for spec in specs]
+
+    # Lucene-side multi-threaded batch search; ids and scores only
+    hits = searcher.batch_search(queries, qids, k=depth, threads=workers)
+
+    return {qid: [(int(h.docid), float(h.score)) for h in hits.get(qid, [])] for qid in qids}
+
+def run_faiss(specs, depth, workers):
+    import search_faiss
+
+    # FAISS-side OpenMP threads for the batched index scan
+    search_faiss.get_faiss().omp_set_num_threads(workers)
+    searcher, metadata = search_faiss.get_searcher()
+    results = search_faiss.search_many([spec["query"] for spec in specs], recall=depth,
+                                       searcher=searcher, metadata=metadata)
+
+    return {str(spec["qid"]): [(r["id"], r["score"]) for r in res] for spec, res in zip(specs, results)}
+
+def run_hybrid(specs, depth, workers):
+    import search_hybrid
+
+    searchers = search_hybrid.get_searcher()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda spec: search_hybrid.search(spec["query"], recall=depth, searchers=searchers), specs))
+
+    return {str(spec["qid"]): [(r["id"], r["score"]) for r in res] for spec, res in zip(specs, results)}
+
+RUNNERS = {"bm25": run_bm25, "faiss": run_faiss, "hybrid": run_hybrid}
+
+def write_run(path, run, tag):
+    with open(path, "w") as f:
+        for qid, hits in run.items():
+            for rank, (docid, score) in enumerate(hits, start=1):
+                f.write(f"{qid} Q0 {docid} {rank} {score:.6f} {tag}\n")
+
+def read_run(path):
+    run = {}
+    with open(path, "r") as f:
+        for line in f:
+            qid, _, docid, _, score, _ = line.split()
+            run.setdefault(qid, []).append((int(docid), float(score)))
+
+    return run
+
+def write_qrels(path, specs):
+    with open(path, "w") as f:
+        for spec in specs:
+            for rid in spec.get("relevant_ids", []):
+                f.write(f"{spec['qid']} 0 {rid} 1\n")
+
+def get_run(engine, specs, depth, workers, queries_path, force=False):
+    run_path = os.path.join(RUN_DIR, f"{engine}.d{depth}.trec")
+    meta_path = run_path + ".meta.json"
+    fp = fingerprint(engine, depth, queries_path)
+
+    if not force and os.path.exists(run_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f) == fp:
+                print(f"[{engine}] reusing cached run {run_path}")
+                return read_run(run_path)
+
+    print(f"[{engine}] running {len(specs)} queries at depth {depth}")
+    run = RUNNERS[engine](specs, depth, workers)
+
+    os.makedirs(RUN_DIR, exist_ok=True)
+    write_run(run_path, run, engine)
+    with open(meta_path, "w") as f:
+        json.dump(fp, f, indent=2)
+
+    return run
+
+def query_metrics(ranked_ids, relevant, k):
+    top = ranked_ids[:k]
+    hits = [1 if rid in relevant else 0 for rid in top]
+
+    dcg = sum(h / math.log2(i + 2) for i, h in enumerate(hits))
+    idcg = sum(1 / math.log2(i + 2) for i in range(min(len(relevant), k)))
+    first = next((i for i, h in enumerate(hits) if h), None)
+
+    return {
+        "recall": sum(hits) / len(relevant),
+        "precision": sum(hits) / k,
+        "ndcg": dcg / idcg if idcg > 0 else 0.0,
+        "mrr": 1 / (first + 1) if first is not None else 0.0,
+    }
+
+def evaluate_run(run, specs, k_values):
+    per_query = {}
+    grouped = {}
+
+    for spec in specs:
+        relevant = set(spec.get("relevant_ids", []))
+        if not relevant:
+            # nothing to score against; skipped rather than counted as zero
+            continue
+
+        ranked_ids = [rid for rid, _ in run.get(str(spec["qid"]), [])]
+        for k in k_values:
+            m = query_metrics(ranked_ids, relevant, k)
+            per_query.setdefault(str(spec["qid"]), {})[str(k)] = m
+            for group in (spec.get("type", "all"), "all"):
+                grouped.setdefault(group, {}).setdefault(str(k), []).append(m)
+
+    summary = {}
+    for group, by_k in grouped.items():
+        for k, rows in by_k.items():
+            summary.setdefault(group, {})[k] = {
+                name: sum(r[name] for r in rows) / len(rows) for name in rows[0]
+            }
+            summary[group][k]["n_queries"] = len(rows)
+
+    return per_query, summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engines", nargs="+", default=ENGINES, choices=sorted(RUNNERS))
+    parser.add_argument("--k", nargs="+", type=int, default=K_VALUES)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--queries", default=EVAL_QUERIES_PATH)
+    parser.add_argument("--force", action="store_true", help="ignore cached run files")
+    args = parser.parse_args()
+
+    specs = load_eval_specs(args.queries)
+    depth = max(args.k)
+
+    os.makedirs(RUN_DIR, exist_ok=True)
+    write_qrels(os.path.join(RUN_DIR, "qrels.txt"), specs)
+
+    report = {}
+    for engine in args.engines:
+        run = get_run(engine, specs, depth, args.workers, args.queries, args.force)
+        per_query, summary = evaluate_run(run, specs, args.k)
+        report[engine] = {"summary": summary, "per_query": per_query}
+
+        for group in sorted(summary):
+            for k in map(str, args.k):
+                m = summary[group][k]
+                print(f"{engine:6s} {group:8s} k={k:>4s} | R {m['recall']:.4f} | P {m['precision']:.4f} "
+                      f"| nDCG {m['ndcg']:.4f} | MRR {m['mrr']:.4f} | n={m['n_queries']}")
+        print()
+
+    out_path = os.path.join(RUN_DIR, "metrics.json")
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("Metrics saved to", out_path)
@@ -0,0 +1,18 @@
+import os
+import metadata_store
+
+# Cheap change detection for the files the searchers serve from; shared by the
+# searchers' hot-swap checks and result_cache's index versions.
+def file_version(path):
+    # update_index.py replaces files with os.replace, so a new version is a new inode
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def metadata_version(metadata_path):
+    _, table_path = metadata_store.store_paths(metadata_path)
+
+    return file_version(table_path if metadata_store.is_fresh(metadata_path) else metadata_path)
@@ -0,0 +1,193 @@
+import re
+
+# Python approximation of the analyzer Anserini indexes "contents" with
+# (DefaultEnglishAnalyzer: StandardTokenizer, lowercasing, Lucene's English
+# stop set, Porter stemming). Corpus and queries are light_normalize'd before
+# they get here, so splitting on [a-z0-9]+ matches StandardTokenizer's output.
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+ENGLISH_STOP_WORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "if", "in", "into", "is", "it",
+    "no", "not", "of", "on", "or", "such", "that", "the", "their", "then", "there", "these",
+    "they", "this", "to", "was", "will", "with",
+])
+
+_STEM_CACHE = {}
+
+# Porter stemmer, following Martin Porter's reference C implementation that
+# Lucene's PorterStemmer is ported from (including its "bli" -> "ble" and
+# "logi" -> "log" departures, and leaving words of one or two letters alone).
+class _Porter:
+    STEP2 = {
+        "a": [("ational", "ate"), ("tional", "tion")],
+        "c": [("enci", "ence"), ("anci", "ance")],
+        "e": [("izer", "ize")],
+        "l": [("bli", "ble"), ("alli", "al"), ("entli", "ent"), ("eli", "e"), ("ousli", "ous")],
+        "o": [("ization", "ize"), ("ation", "ate"), ("ator", "ate")],
+        "s": [("alism", "al"), ("iveness", "ive"), ("fulness", "ful"), ("ousness", "ous")],
+        "t": [("aliti", "al"), ("iviti", "ive"), ("biliti", "ble")],
+        "g": [("logi", "log")],
+    }
+    STEP3 = {
+        "e": [("icate", "ic"), ("ative", ""), ("alize", "al")],
+        "i": [("iciti", "ic")],
+        "l": [("ical", "ic"), ("ful", "")],
+        "s": [("ness", "")],
+    }
+    STEP4 = {
+        "a": ["al"], "c": ["ance", "ence"], "e": ["er"], "i": ["ic"], "l": ["able", "ible"],
+        "n": ["ant", "ement", "ment", "ent"], "o": ["ion", "ou"], "s": ["ism"], "t": ["ate", "iti"],
+        "u": ["ous"], "v": ["ive"], "z": ["ize"],
+    }
+
+    def __init__(self, word):
+        self.b = list(word)
+        self.k = len(word) - 1
+        self.j = 0
+
+    def cons(self, i):
+        ch = self.b[i]
+        if ch in "aeiou":
+            return False
+        if ch == "y":
+            return i == 0 or not self.cons(i - 1)
+        return True
+
+    def m(self):
+        # number of consonant-vowel sequences in b[0..j]
+        n = 0
+        i = 0
+        j = self.j
+        while True:
+            if i > j:
+                return n
+            if not self.cons(i):
+                break
+            i += 1
+        i += 1
+        while True:
+            while True:
+                if i > j:
+                    return n
+                if self.cons(i):
+                    break
+                i += 1
+            i += 1
+            n += 1
+            while True:
+                if i > j:
+                    return n
+                if not self.cons(i):
+                    break
+                i += 1
+            i += 1
+
+    def vowel_in_stem(self):
+        return any(not self.cons(i) for i in range(self.j + 1))
+
+    def double_c(self, j):
+        return j >= 1 and self.b[j] == self.b[j - 1] and self.cons(j)
+
+    def cvc(self, i):
+        if i < 2 or not self.cons(i) or self.cons(i - 1) or not self.cons(i - 2):
+            return False
+        return self.b[i] not in "wxy"
+
+    def ends(self, s):
+        n = len(s)
+        if n > self.k + 1 or "".join(self.b[self.k - n + 1:self.k + 1]) != s:
+            return False
+        self.j = self.k - n
+        return True
+
+    def set_to(self, s):
+        self.b[self.j + 1:self.k + 1] = list(s)
+        self.k = self.j + len(s)
+
+    def r(self, s):
+        if self.m() > 0:
+            self.set_to(s)
+
+    def step1ab(self):
+        if self.b[self.k] == "s":
+            if self.ends("sses"):
+                self.k -= 2
+            elif self.ends("ies"):
+                self.set_to("i")
+            elif self.b[self.k - 1] != "s":
+                self.k -= 1
+
+        if self.ends("eed"):
+            if self.m() > 0:
+                self.k -= 1
+        elif (self.ends("ed") or self.ends("ing")) and self.vowel_in_stem():
+            self.k = self.j
+            if self.ends("at"):
+                self.set_to("ate")
+            elif self.ends("bl"):
+                self.set_to("ble")
+            elif self.ends("iz"):
+                self.set_to("ize")
+            elif self.double_c(self.k):
+                self.k -= 1
+                if self.b[self.k] in "lsz":
+                    self.k += 1
+            else:
+                self.j = self.k
+                if self.m() == 1 and self.cvc(self.k):
+                    self.set_to("e")
+
+    def step1c(self):
+        if self.ends("y") and self.vowel_in_stem():
+            self.b[self.k] = "i"
+
+    def replace_first(self, table, key):
+        for suffix, repl in table.get(key, []):
+            if self.ends(suffix):
+                self.r(repl)
+                return
+
+    def step4(self):
+        for suffix in self.STEP4.get(self.b[self.k - 1], []):
+            if self.ends(suffix):
+                if suffix == "ion" and not (self.j >= 0 and self.b[self.j] in "st"):
+                    continue
+                if self.m() > 1:
+                    self.k = self.j
+                return
+
+    def step5(self):
+        self.j = self.k
+        if self.b[self.k] == "e":
+            a = self.m()
+            if a > 1 or (a == 1 and not self.cvc(self.k - 1)):
+                self.k -= 1
+
+        # m() still measures up to the original end, as in the reference code
+        if self.b[self.k] == "l" and self.double_c(self.k) and self.m() > 1:
+            self.k -= 1
+
+    def stem(self):
+        if self.k <= 1:
+            return "".join(self.b)
+
+        self.step1ab()
+        if self.k > 0:
+            self.step1c()
+            self.replace_first(self.STEP2, self.b[self.k - 1])
+            self.replace_first(self.STEP3, self.b[self.k])
+            self.step4()
+            self.step5()
+
+        return "".join(self.b[:self.k + 1])
+
+def porter_stem(word):
+    stemmed = _STEM_CACHE.get(word)
+    if stemmed is None:
+        stemmed = _Porter(word).stem()
+        _STEM_CACHE[word] = stemmed
+
+    return stemmed
+
+def analyze(text):
+    return [porter_stem(token) for token in TOKEN_RE.findall(text.lower()) if token not in ENGLISH_STOP_WORDS]
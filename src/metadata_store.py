@@ -0,0 +1,162 @@
+import json
+import mmap
+import os
+import numpy as np
+
+METADATA_PATH = "../data/processed/recipes_display.jsonl"
+
+# Side-store layout, built once from the display JSONL:
+#   <name>.bin      concatenated JSON payloads, one per recipe (memory-mapped)
+#   <name>.idx.npy  int64 table of (id, offset, length), sorted by id
+def store_paths(metadata_path=METADATA_PATH):
+    base = metadata_path[:-len(".jsonl")] if metadata_path.endswith(".jsonl") else metadata_path
+
+    return base + ".bin", base + ".idx.npy"
+
+def build_store(metadata_path=METADATA_PATH):
+    store_path, table_path = store_paths(metadata_path)
+    rows = []
+    offset = 0
+
+    with open(metadata_path, "rb") as fin, open(store_path + ".tmp", "wb") as fout:
+        for line in fin:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                json_object = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Error decoding JSON on line: {line[:200]} - {e}")
+                continue
+
+            fout.write(line)
+            rows.append((int(json_object["id"]), offset, len(line)))
+            offset += len(line)
+
+    table = np.array(rows, dtype=np.int64).reshape(-1, 3)
+    table = table[np.argsort(table[:, 0], kind="stable")]
+
+    # a dict keeps the last record for a duplicated id, so do the same here
+    keep = np.append(table[1:, 0] != table[:-1, 0], True) if len(table) else np.zeros(0, dtype=bool)
+    table = table[keep]
+
+    with open(table_path + ".tmp", "wb") as f:
+        np.save(f, table)
+
+    os.replace(store_path + ".tmp", store_path)
+    os.replace(table_path + ".tmp", table_path)
+
+    return len(table)
+
+# Applies upserts ({id: record}) and removals in place: new payloads are
+# appended to the .bin file and the table is rewritten and swapped in with
+# os.replace. Readers that opened the store earlier keep their own mapping
+# and table, which never reference the appended bytes.
+def update_store(upserts, removes=(), metadata_path=METADATA_PATH):
+    store_path, table_path = store_paths(metadata_path)
+    table = np.load(table_path)
+
+    rows = []
+    with open(store_path, "ab") as f:
+        offset = f.tell()
+        for rid, record in upserts.items():
+            line = json.dumps(record).encode("utf-8")
+            f.write(line)
+            rows.append((int(rid), offset, len(line)))
+            offset += len(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+    changed = np.array([int(rid) for rid in list(upserts) + list(removes)], dtype=np.int64)
+    table = table[~np.isin(table[:, 0], changed)]
+    table = np.concatenate([table, np.array(rows, dtype=np.int64).reshape(-1, 3)])
+    table = table[np.argsort(table[:, 0], kind="stable")]
+
+    with open(table_path + ".tmp", "wb") as f:
+        np.save(f, table)
+    os.replace(table_path + ".tmp", table_path)
+
+    return len(table)
+
+def is_fresh(metadata_path=METADATA_PATH):
+    store_path, table_path = store_paths(metadata_path)
+    if not (os.path.exists(store_path) and os.path.exists(table_path)):
+        return False
+
+    if not os.path.exists(metadata_path):
+        return True
+
+    source_mtime = os.path.getmtime(metadata_path)
+    return min(os.path.getmtime(store_path), os.path.getmtime(table_path)) >= source_mtime
+
+class MetadataStore:
+    def __init__(self, store_path, table_path):
+        self.store_path = store_path
+        self.table_path = table_path
+
+        self.table = np.load(table_path, mmap_mode="r")
+        # ids are searched on every lookup, keep a contiguous copy (8 bytes per recipe)
+        self.ids = np.ascontiguousarray(self.table[:, 0])
+
+        self._file = open(store_path, "rb")
+        if os.path.getsize(store_path) > 0:
+            self.payload = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.payload = b""
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, rid):
+        return self.row_of(rid) >= 0
+
+    def row_of(self, rid):
+        rid = int(rid)
+        i = int(np.searchsorted(self.ids, rid))
+        if i < len(self.ids) and self.ids[i] == rid:
+            return i
+
+        return -1
+
+    def get(self, rid, default=None):
+        i = self.row_of(rid)
+        if i < 0:
+            return default
+
+        _, offset, length = self.table[i]
+        return json.loads(self.payload[offset:offset + length])
+
+    def get_many(self, rids):
+        rids = np.asarray(rids, dtype=np.int64)
+        pos = np.searchsorted(self.ids, rids)
+        pos = np.minimum(pos, max(len(self.ids) - 1, 0))
+
+        results = []
+        for rid, i in zip(rids, pos):
+            if len(self.ids) == 0 or self.ids[i] != rid:
+                results.append(None)
+                continue
+
+            _, offset, length = self.table[i]
+            results.append(json.loads(self.payload[offset:offset + length]))
+
+        return results
+
+    def close(self):
+        if isinstance(self.payload, mmap.mmap):
+            self.payload.close()
+        self._file.close()
+
+def open_store(metadata_path=METADATA_PATH):
+    store_path, table_path = store_paths(metadata_path)
+
+    return MetadataStore(store_path, table_path)
+
+if __name__ == "__main__":
+    n = build_store(METADATA_PATH)
+    store_path, table_path = store_paths(METADATA_PATH)
+
+    print("Metadata records:", n)
+    print("Payload:", store_path, os.path.getsize(store_path), "bytes")
+    print("Table:", table_path, os.path.getsize(table_path), "bytes")
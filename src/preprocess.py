@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from data_process import clean_records
+from build_dsp_metadata import display_record
+import corpus_store
+
+RAW_PATH = "../data/raw/RAW_recipes.csv"
+CLEAN_PATH = "../data/processed/clean_recipes_input.jsonl"
+DISPLAY_PATH = "../data/processed/recipes_display.jsonl"
+CORPUS_PATH = corpus_store.CORPUS_PATH # columnar copy of both, written when both are produced
+
+CHUNK_SIZE = 5000
+COLUMNS = ["name", "id", "tags", "description", "ingredients", "steps"]
+# text columns stay str/NaN whatever a single chunk looks like
+TEXT_DTYPES = {"name": str, "tags": str, "description": str, "ingredients": str, "steps": str}
+
+def process_chunk(rows, want_clean, want_display, want_corpus=False):
+    clean = []
+    display_records = []
+
+    if want_clean or want_corpus:
+        names, rids, tags, descriptions, ingredients, _ = zip(*rows)
+        clean = clean_records(names, rids, tags, descriptions, ingredients)
+    if want_display or want_corpus:
+        for name, rid, tags, description, ingredients, steps in rows:
+            display_records.append(display_record(name, rid, tags, description, ingredients, steps))
+
+    clean_text = "".join(json.dumps(r) + "\n" for r in clean) if want_clean else ""
+    display_text = "".join(json.dumps(r) + "\n" for r in display_records) if want_display else ""
+    batch = corpus_store.record_batch(clean, display_records) if want_corpus else None
+
+    return clean_text, display_text, batch, len(rows)
+
+def read_chunks(raw_path, chunk_size):
+    for chunk in pd.read_csv(raw_path, usecols=COLUMNS, dtype=TEXT_DTYPES, chunksize=chunk_size):
+        yield list(zip(*(chunk[c].tolist() for c in COLUMNS)))
+
+# One scan of the CSV feeds both outputs. At most 2 x workers chunks are in
+# flight, so memory stays bounded, and results are written in input order.
+def run_pipeline(raw_path=RAW_PATH, clean_path=CLEAN_PATH, display_path=DISPLAY_PATH,
+                 workers=None, chunk_size=CHUNK_SIZE, corpus_path=CORPUS_PATH):
+    workers = workers or os.cpu_count() or 1
+    corpus_path = corpus_path if clean_path and display_path else None
+    outputs = [path for path in (clean_path, display_path, corpus_path) if path]
+    for path in outputs:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    clean_f = open(clean_path + ".tmp", "w") if clean_path else None
+    display_f = open(display_path + ".tmp", "w") if display_path else None
+    corpus_w = corpus_store.CorpusWriter(corpus_path) if corpus_path else None
+
+    def write(result):
+        clean_text, display_text, batch, n = result
+        if clean_f:
+            clean_f.write(clean_text)
+        if display_f:
+            display_f.write(display_text)
+        if corpus_w:
+            corpus_w.write(batch)
+        return n
+
+    start = time.perf_counter()
+    total = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for rows in read_chunks(raw_path, chunk_size):
+            pending.append(pool.submit(process_chunk, rows, clean_f is not None, display_f is not None,
+                                       corpus_w is not None))
+            if len(pending) >= 2 * workers:
+                total += write(pending.popleft().result())
+
+        while pending:
+            total += write(pending.popleft().result())
+
+    for f in (clean_f, display_f):
+        if f:
+            f.close()
+    for path in (clean_path, display_path):
+        if path:
+            os.replace(path + ".tmp", path)
+    # replaced last, so its mtime is not older than the JSONL it mirrors
+    if corpus_w:
+        corpus_w.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {total} recipes in {elapsed:.1f}s with {workers} workers ({total / elapsed:.0f} recipes/s)")
+    for path in outputs:
+        print("Wrote", path)
+
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    run_pipeline(RAW_PATH, CLEAN_PATH, DISPLAY_PATH, args.workers, args.chunk_size)
@@ -0,0 +1,205 @@
+import re
+import json
+import numpy as np
+
+# Tokens present in at least this many rows keep a dense packed bitmap;
+# rarer tokens are expanded from their posting list on demand.
+DENSE_MIN_DF = 256
+
+# Packed bitmaps: one bit per row, np.packbits order (row 0 is the high bit of
+# byte 0). Bits past n_rows may be set by negation; to_mask ignores them.
+def n_bytes(n_rows):
+    return (n_rows + 7) // 8
+
+def empty(n_rows):
+    return np.zeros(n_bytes(n_rows), dtype=np.uint8)
+
+def full(n_rows):
+    return np.packbits(np.ones(n_rows, dtype=bool))
+
+def from_rows(rows, n_rows):
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[rows] = True
+
+    return np.packbits(mask)
+
+def to_mask(bits, n_rows):
+    return np.unpackbits(bits, count=n_rows).astype(bool)
+
+def to_rows(bits, n_rows):
+    return np.flatnonzero(to_mask(bits, n_rows))
+
+def count(bits, n_rows):
+    return int(np.count_nonzero(to_mask(bits, n_rows)))
+
+class TokenBitmaps:
+    def __init__(self, tokens, indptr, rows, n_rows, dense_min_df=DENSE_MIN_DF):
+        self.tokens = list(tokens)
+        self.vocab = {token: code for code, token in enumerate(self.tokens)}
+        self.indptr = indptr
+        self.rows = rows
+        self.n_rows = n_rows
+        self.dense_min_df = dense_min_df
+
+        df = np.diff(indptr)
+        self._dense = {int(code): self._pack(code) for code in np.flatnonzero(df >= dense_min_df)}
+
+    # rows_of_tokens: one iterable of tokens per row (non-lists count as empty)
+    @classmethod
+    def build(cls, rows_of_tokens, dense_min_df=DENSE_MIN_DF):
+        vocab = {}
+        codes = []
+        rows = []
+        n_rows = 0
+
+        for i, tokens in enumerate(rows_of_tokens):
+            n_rows = i + 1
+            if not isinstance(tokens, (list, tuple, np.ndarray)):
+                continue
+
+            for token in set(tokens):
+                codes.append(vocab.setdefault(token, len(vocab)))
+                rows.append(i)
+
+        codes = np.asarray(codes, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int32)
+        order = np.lexsort((rows, codes))
+        indptr = np.searchsorted(codes[order], np.arange(len(vocab) + 1)).astype(np.int64)
+
+        return cls(list(vocab), indptr, rows[order], n_rows, dense_min_df)
+
+    def _pack(self, code):
+        return from_rows(self.rows[self.indptr[code]:self.indptr[code + 1]], self.n_rows)
+
+    def __contains__(self, token):
+        return token in self.vocab
+
+    def df(self, token):
+        code = self.vocab.get(token)
+
+        return 0 if code is None else int(self.indptr[code + 1] - self.indptr[code])
+
+    def postings(self, token):
+        code = self.vocab.get(token)
+        if code is None:
+            return np.zeros(0, dtype=self.rows.dtype)
+
+        return self.rows[self.indptr[code]:self.indptr[code + 1]]
+
+    def bitmap(self, token):
+        code = self.vocab.get(token)
+        if code is None:
+            return empty(self.n_rows)
+
+        dense = self._dense.get(code)
+        return dense if dense is not None else self._pack(code)
+
+    def all_of(self, tokens):
+        bits = full(self.n_rows)
+        for token in tokens:
+            bits = bits & self.bitmap(token)
+
+        return bits
+
+    def any_of(self, tokens):
+        bits = empty(self.n_rows)
+        for token in tokens:
+            bits = bits | self.bitmap(token)
+
+        return bits
+
+    def extend(self, rows_of_tokens):
+        # a copy with rows appended after the existing ones; tokens not seen
+        # before join the end of the vocabulary
+        vocab = dict(self.vocab)
+        codes = []
+        rows = []
+        n_rows = self.n_rows
+
+        for i, tokens in enumerate(rows_of_tokens, self.n_rows):
+            n_rows = i + 1
+            if not isinstance(tokens, (list, tuple, np.ndarray)):
+                continue
+
+            for token in set(tokens):
+                codes.append(vocab.setdefault(token, len(vocab)))
+                rows.append(i)
+
+        old_codes = np.repeat(np.arange(len(self.tokens), dtype=np.int64), np.diff(self.indptr))
+        codes = np.concatenate([old_codes, np.asarray(codes, dtype=np.int64)])
+        rows = np.concatenate([np.asarray(self.rows, dtype=np.int32), np.asarray(rows, dtype=np.int32)])
+        order = np.lexsort((rows, codes))
+        indptr = np.searchsorted(codes[order], np.arange(len(vocab) + 1)).astype(np.int64)
+
+        return TokenBitmaps(list(vocab), indptr, rows[order], n_rows, self.dense_min_df)
+
+    def tokens_containing(self, needle):
+        return [token for token in self.tokens if needle in token]
+
+    def save(self, prefix):
+        np.save(prefix + ".indptr.npy", self.indptr)
+        np.save(prefix + ".rows.npy", self.rows)
+        with open(prefix + ".vocab.json", "w", encoding="utf-8") as f:
+            json.dump({"n_rows": self.n_rows, "tokens": self.tokens}, f)
+
+    @classmethod
+    def load(cls, prefix, dense_min_df=DENSE_MIN_DF):
+        with open(prefix + ".vocab.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        indptr = np.load(prefix + ".indptr.npy", mmap_mode="r")
+        rows = np.load(prefix + ".rows.npy", mmap_mode="r")
+
+        return cls(meta["tokens"], indptr, rows, meta["n_rows"], dense_min_df)
+
+# Substring membership over one text per row. All rows are joined with "\n"
+# into a single string, so each needle costs one C-level scan plus a
+# searchsorted over the row start offsets; results are memoized per needle.
+class SubstringIndex:
+    def __init__(self, texts):
+        texts = [t if isinstance(t, str) else "" for t in texts]
+        self.n_rows = len(texts)
+        self.text = "\n".join(texts)
+
+        lengths = np.fromiter((len(t) + 1 for t in texts), dtype=np.int64, count=self.n_rows)
+        self.starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        self._memo = {}
+
+    def bitmap(self, needle):
+        bits = self._memo.get(needle)
+        if bits is None:
+            positions = np.fromiter((m.start() for m in re.finditer(re.escape(needle), self.text)), dtype=np.int64)
+            rows = np.searchsorted(self.starts, positions, side="right") - 1
+            bits = from_rows(rows, self.n_rows)
+            self._memo[needle] = bits
+
+        return bits
+
+    def extend(self, texts):
+        # a copy with one more row per text
+        texts = [t if isinstance(t, str) else "" for t in texts]
+        if not texts:
+            return self
+
+        index = SubstringIndex(texts)
+        if self.n_rows:
+            index.starts = np.concatenate((self.starts, index.starts + len(self.text) + 1))
+            index.n_rows += self.n_rows
+            index.text = self.text + "\n" + index.text
+
+        return index
+
+    def save(self, prefix):
+        np.save(prefix + ".starts.npy", self.starts)
+        with open(prefix + ".txt", "w", encoding="utf-8") as f:
+            f.write(self.text)
+
+    @classmethod
+    def load(cls, prefix):
+        index = cls([])
+        index.starts = np.load(prefix + ".starts.npy")
+        index.n_rows = len(index.starts)
+        with open(prefix + ".txt", "r", encoding="utf-8", newline="") as f:
+            index.text = f.read()
+
+        return index
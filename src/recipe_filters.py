@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import numpy as np
+import recipe_bitmaps
+import corpus_store
+from recipe_bitmaps import TokenBitmaps, SubstringIndex
+
+INPUT_PATH = "../data/processed/clean_recipes_input.jsonl"
+EMB_ID_PATH = "../data/embeddings/all-MiniLM-L6-v2.txt"
+FILTER_DIR = "../data/filters"
+DELTA_FILE = "delta.jsonl" # changes update_index.py logged since the last full build
+
+# Filter keys accepted by search_faiss.search(filters=...); the eval query
+# specs in eval_builder.py use the same names. Tags match exactly; an
+# ingredient term is a substring test against the recipe's ingredients joined
+# with spaces, as in eval_builder.auto_relevant_ids ("blueber" ->
+# "blueberries", "cream cheese" -> "light cream cheese", and a term may span
+# two neighbouring ingredients).
+FILTER_KEYS = ["must_tags", "any_tags", "must_not_tags",
+               "must_ingredients", "any_ingredients", "must_not_ingredients"]
+
+def ingredient_text(ingredients):
+    # the text ingredient terms are matched against, as eval_builder.build_label_index builds it
+    return " ".join(ingredients).lower() if isinstance(ingredients, list) else ""
+
+def filter_files(filter_dir=FILTER_DIR):
+    # a full build rewrites ids.npy, a delta only appends to the log
+    return [os.path.join(filter_dir, "ids.npy"), os.path.join(filter_dir, DELTA_FILE)]
+
+def append_delta(records, removes, filter_dir=FILTER_DIR):
+    # records: (id, tags, joined ingredient text, embedding row) per added or
+    # changed recipe. Removes go first, so a recipe removed and re-added in the
+    # same delta stays.
+    lines = [json.dumps({"id": int(rid), "removed": True}) for rid in removes]
+    lines += [json.dumps({"id": int(rid), "tags": list(tags), "ingredients": text, "emb_row": int(row)})
+              for rid, tags, text, row in records]
+
+    path = os.path.join(filter_dir, DELTA_FILE)
+    with open(path, "a+b") as f:
+        # drop a line a crashed run left half written
+        f.seek(0)
+        data = f.read()
+        f.truncate(data.rfind(b"\n") + 1)
+        f.seek(0, os.SEEK_END)
+
+        f.write("".join(line + "\n" for line in lines).encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_delta(filter_dir=FILTER_DIR):
+    # the latest logged state of each recipe: its record, or None if removed
+    path = os.path.join(filter_dir, DELTA_FILE)
+    changes = {}
+    if not os.path.exists(path):
+        return changes
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            record = json.loads(line)
+            changes[record["id"]] = None if record.get("removed") else record
+
+    return changes
+
+# Bitmaps over the recipes sorted by id: row i is the recipe ids[i]. Recipes
+# from the delta log follow the sorted ones, and the rows they replace are
+# cleared from the live bitmap.
+class RecipeFilters:
+    def __init__(self, ids, tags, ingredients, emb_rows, live=None):
+        self.ids = ids
+        self.n_rows = len(ids)
+        self.tags = tags
+        self.ingredients = ingredients
+        # row of each recipe in the embedding memmap, -1 if it has none
+        self.emb_rows = emb_rows
+        # packed bitmap of the rows still current, None when all are
+        self.live = live
+
+    @classmethod
+    def build(cls, input_path=INPUT_PATH, emb_id_path=EMB_ID_PATH):
+        records = []
+        if corpus_store.is_fresh(input_path):
+            table = corpus_store.open_corpus(["id", "tags", "ingredients"])
+            records = list(zip(table.column("id").to_pylist(), table.column("tags").to_pylist(),
+                               table.column("ingredients").to_pylist()))
+        else:
+            with open(input_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        obj = json.loads(line)
+                        records.append((int(obj["id"]), obj.get("tags", []), obj.get("ingredients", [])))
+
+        records = [(rid, tags, ingredient_text(ingredients)) for rid, tags, ingredients in records]
+
+        return cls.from_records(records, np.loadtxt(emb_id_path, dtype=np.int64, ndmin=1))
+
+    # records: (id, tags, joined ingredient text) per recipe
+    @classmethod
+    def from_records(cls, records, emb_ids):
+        records = sorted(records, key=lambda r: r[0])
+        ids = np.array([r[0] for r in records], dtype=np.int64)
+
+        emb_order = np.argsort(emb_ids, kind="stable")
+        pos = np.minimum(np.searchsorted(emb_ids[emb_order], ids), max(len(emb_ids) - 1, 0))
+        found = emb_ids[emb_order][pos] == ids if len(emb_ids) else np.zeros(len(ids), dtype=bool)
+        emb_rows = np.where(found, emb_order[pos], -1).astype(np.int64)
+
+        tags = TokenBitmaps.build(r[1] for r in records)
+        ingredients = SubstringIndex([r[2] for r in records])
+
+        return cls(ids, tags, ingredients, emb_rows)
+
+    def save(self, filter_dir=FILTER_DIR):
+        if self.live is not None:
+            raise ValueError("Filters with logged deltas applied cannot be saved, rebuild them with recipe_filters.py")
+
+        os.makedirs(filter_dir, exist_ok=True)
+        np.save(os.path.join(filter_dir, "emb_rows.npy"), self.emb_rows)
+        self.tags.save(os.path.join(filter_dir, "tags"))
+        self.ingredients.save(os.path.join(filter_dir, "ingredients"))
+        np.save(os.path.join(filter_dir, "ids.npy"), self.ids)
+
+        # the build already holds every logged change
+        if os.path.exists(os.path.join(filter_dir, DELTA_FILE)):
+            os.remove(os.path.join(filter_dir, DELTA_FILE))
+
+    @classmethod
+    def load(cls, filter_dir=FILTER_DIR):
+        ids = np.load(os.path.join(filter_dir, "ids.npy"))
+        emb_rows = np.load(os.path.join(filter_dir, "emb_rows.npy"))
+        tags = TokenBitmaps.load(os.path.join(filter_dir, "tags"))
+        ingredients = SubstringIndex.load(os.path.join(filter_dir, "ingredients"))
+
+        return cls(ids, tags, ingredients, emb_rows).with_changes(read_delta(filter_dir))
+
+    def with_changes(self, changes):
+        # changes: {id: logged record or None}, as read_delta returns them
+        if not changes:
+            return self
+
+        keys = np.array(sorted(changes), dtype=np.int64)
+        at = np.minimum(np.searchsorted(self.ids, keys), max(self.n_rows - 1, 0))
+        dead = at[self.ids[at] == keys] if self.n_rows else at[:0]
+
+        added = [changes[rid] for rid in sorted(changes) if changes[rid] is not None]
+        ids = np.concatenate([self.ids, np.array([r["id"] for r in added], dtype=np.int64)])
+        emb_rows = np.concatenate([self.emb_rows, np.array([r["emb_row"] for r in added], dtype=np.int64)])
+        tags = self.tags.extend(r["tags"] for r in added)
+        ingredients = self.ingredients.extend([r["ingredients"] for r in added])
+
+        live = np.ones(len(ids), dtype=bool)
+        live[dead] = False
+
+        return RecipeFilters(ids, tags, ingredients, emb_rows, np.packbits(live))
+
+    def ingredient_bitmap(self, term):
+        return self.ingredients.bitmap(term)
+
+    # Returns a packed row bitmap, or None when the filters constrain nothing.
+    def compile(self, filters):
+        unknown = set(filters) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown filter keys {sorted(unknown)}, expected some of {FILTER_KEYS}")
+
+        tag = lambda key: [t for t in filters.get(key, []) if t]
+        ing = lambda key: [t.lower().strip() for t in filters.get(key, []) if t and t.strip()]
+        if not any(tag(key) for key in FILTER_KEYS):
+            return None
+
+        bits = recipe_bitmaps.full(self.n_rows) if self.live is None else self.live.copy()
+        if tag("must_tags"):
+            bits &= self.tags.all_of(tag("must_tags"))
+        if tag("any_tags"):
+            bits &= self.tags.any_of(tag("any_tags"))
+        if tag("must_not_tags"):
+            bits &= ~self.tags.any_of(tag("must_not_tags"))
+
+        for term in ing("must_ingredients"):
+            bits &= self.ingredient_bitmap(term)
+        if ing("any_ingredients"):
+            any_bits = recipe_bitmaps.empty(self.n_rows)
+            for term in ing("any_ingredients"):
+                any_bits |= self.ingredient_bitmap(term)
+            bits &= any_bits
+        for term in ing("must_not_ingredients"):
+            bits &= ~self.ingredient_bitmap(term)
+
+        return bits
+
+    def matching_rows(self, bits):
+        return recipe_bitmaps.to_rows(bits, self.n_rows)
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    filters = RecipeFilters.build()
+    filters.save()
+
+    print(f"Built filter bitmaps for {filters.n_rows} recipes in {time.perf_counter() - start:.1f}s")
+    print("Tags:", len(filters.tags.tokens), "| without embedding:", int((filters.emb_rows < 0).sum()))
+    print("Saved to", FILTER_DIR)
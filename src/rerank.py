@@ -0,0 +1,236 @@
+import os
+import json
+import time
+import threading
+import argparse
+from collections import OrderedDict
+import numpy as np
+import torch
+from sentence_transformers import CrossEncoder
+
+MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+MAX_LENGTH = 256 # tokens per query-recipe pair; recipe text past this is cut
+BATCH_SIZE = 16
+BUDGET_MS = 60.0 # cross-encoder time allowed per query
+MIN_PAIRS = 5 # always rerank at least this many candidates, budget or not
+COST_PRIOR_MS = 2.0 # per-pair cost assumed before the first batch is timed
+COST_ALPHA = 0.2 # weight of the newest batch in the per-pair cost EMA
+CACHE_CAPACITY = 50_000 # (query, recipe id) scores kept in memory
+DEPTH = 50 # first-stage candidates handed to the reranker
+ENGINES = ["bm25", "faiss", "hybrid"]
+REPORT_PATH = "../results/bench/rerank.json"
+K_VALUES = [5, 10, 20, 50]
+
+_RERANKER = None
+
+def pair_text(hit):
+    # the same fields the engines return; tags last, they are the least informative
+    parts = [hit.get("name") or "", hit.get("description") or ""]
+    if hit.get("ingredients"):
+        parts.append("ingredients: " + ", ".join(hit["ingredients"]))
+    if hit.get("tags"):
+        parts.append("tags: " + ", ".join(hit["tags"]))
+
+    return ". ".join(p for p in parts if p)
+
+# Scores query-recipe pairs with a cross-encoder on CPU. Each query gets a
+# latency budget: candidates are scored in first-stage order, in batches, and
+# scoring stops once the budget is spent. How many pairs fit is estimated up
+# front from an EMA of the measured per-pair cost. Candidates left unscored
+# keep their first-stage order behind the reranked prefix.
+class Reranker:
+    def __init__(self, model_name=MODEL_NAME, max_length=MAX_LENGTH, batch_size=BATCH_SIZE,
+                 cache_capacity=CACHE_CAPACITY):
+        self.model = CrossEncoder(model_name, device="cpu", max_length=max_length)
+        self.batch_size = batch_size
+        self.cache_capacity = cache_capacity
+        self.pair_cost_ms = COST_PRIOR_MS
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.queries = 0
+        self.pairs_scored = 0
+        self.cache_hits = 0
+        self.truncated = 0
+        self.score_s = 0.0
+
+    def _cached(self, key):
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+
+            return score
+
+    def _remember(self, keys, scores):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_capacity:
+                self._cache.popitem(last=False)
+
+    def score_batch(self, query, hits):
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            scores = self.model.predict([(query, pair_text(h)) for h in hits], batch_size=len(hits),
+                                        convert_to_numpy=True, show_progress_bar=False)
+        elapsed = time.perf_counter() - t0
+
+        with self._lock:
+            cost = 1000.0 * elapsed / len(hits)
+            self.pair_cost_ms = (1 - COST_ALPHA) * self.pair_cost_ms + COST_ALPHA * cost
+            self.pairs_scored += len(hits)
+            self.score_s += elapsed
+
+        return [float(s) for s in np.asarray(scores).reshape(-1)]
+
+    def rerank(self, query, hits, k=None, budget_ms=BUDGET_MS):
+        k = len(hits) if k is None else k
+        query = " ".join(query.split())
+        t0 = time.perf_counter()
+
+        scores = [self._cached((query, h["id"])) for h in hits]
+        pending = [i for i, s in enumerate(scores) if s is None]
+        affordable = max(MIN_PAIRS, int(budget_ms / max(self.pair_cost_ms, 1e-3)))
+        pending = pending[:affordable]
+
+        # score in batches, re-checking the clock between batches
+        done = 0
+        while done < len(pending):
+            if done >= MIN_PAIRS and 1000.0 * (time.perf_counter() - t0) >= budget_ms:
+                break
+
+            batch = pending[done:done + self.batch_size]
+            batch_scores = self.score_batch(query, [hits[i] for i in batch])
+            self._remember([(query, hits[i]["id"]) for i in batch], batch_scores)
+            for i, score in zip(batch, batch_scores):
+                scores[i] = score
+            done += len(batch)
+
+        # rerank the longest first-stage prefix that has a score throughout
+        depth = next((i for i, s in enumerate(scores) if s is None), len(hits))
+        order = sorted(range(depth), key=lambda i: (-scores[i], i)) + list(range(depth, len(hits)))
+
+        with self._lock:
+            self.queries += 1
+            self.truncated += depth < len(hits)
+
+        results = []
+        for rank, i in enumerate(order[:k]):
+            hit = dict(hits[i])
+            hit["rank"] = rank + 1
+            hit["first_stage_score"] = hit.get("score")
+            hit["reranked"] = i < depth
+            if i < depth:
+                hit["score"] = scores[i]
+            results.append(hit)
+
+        return results
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "model": MODEL_NAME,
+                "queries": self.queries,
+                "pairs_scored": self.pairs_scored,
+                "cache_hits": self.cache_hits,
+                "cache_entries": len(self._cache),
+                "truncated_queries": self.truncated,
+                "pair_cost_ms": self.pair_cost_ms,
+                "score_s": self.score_s,
+            }
+
+def get_reranker():
+    global _RERANKER
+    if _RERANKER is None:
+        _RERANKER = Reranker()
+
+    return _RERANKER
+
+def first_stage(engine, query, depth):
+    if engine == "bm25":
+        import search_bm25
+        return search_bm25.search(query, depth)
+    if engine == "faiss":
+        import search_faiss
+        return search_faiss.search(query, depth)
+    if engine == "hybrid":
+        import search_hybrid
+        return search_hybrid.search(query, depth)
+
+    raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+
+def rerank(query, hits, k=None, budget_ms=BUDGET_MS, reranker=None):
+    if reranker is None:
+        reranker = get_reranker()
+
+    return reranker.rerank(query, hits, k, budget_ms)
+
+def search(query, recall=5, engine="hybrid", depth=DEPTH, budget_ms=BUDGET_MS, reranker=None):
+    hits = first_stage(engine, query, max(recall, depth))
+
+    return rerank(query, hits, recall, budget_ms, reranker)
+
+if __name__ == "__main__":
+    from bench_queries import load_bench_queries
+    from bench_utils import percentiles_ms
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engine", default="hybrid", choices=ENGINES)
+    parser.add_argument("--k", nargs="+", type=int, default=K_VALUES, help="candidates reranked per query")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = parser.parse_args()
+
+    queries = load_bench_queries()
+    reranker = get_reranker()
+
+    # warm up the engine and the cross-encoder, then forget the warm-up scores
+    rerank(queries[0], first_stage(args.engine, queries[0], max(args.k)), budget_ms=args.budget_ms)
+    reranker.clear_cache()
+
+    report = {"engine": args.engine, "budget_ms": args.budget_ms, "k": {}}
+    print(f"{'k':>4s} | {'first stage p50':>15s} | {'cold +p50':>9s} | {'cold +p99':>9s} | {'warm +p50':>9s} | "
+          f"{'truncated':>9s}")
+    for k in args.k:
+        hits = {}
+        first = []
+        for q in queries:
+            t0 = time.perf_counter()
+            hits[q] = first_stage(args.engine, q, k)
+            first.append(time.perf_counter() - t0)
+
+        added = {}
+        for label in ("cold", "warm"):
+            if label == "cold":
+                reranker.clear_cache()
+            truncated_before = reranker.truncated
+
+            latencies = []
+            for q in queries:
+                t0 = time.perf_counter()
+                rerank(q, hits[q], k, args.budget_ms, reranker)
+                latencies.append(time.perf_counter() - t0)
+
+            added[label] = {**percentiles_ms(latencies, (50, 99)),
+                            "truncated": (reranker.truncated - truncated_before) / len(queries)}
+
+        row = {"first_stage": percentiles_ms(first, (50, 99)), **added}
+        report["k"][str(k)] = row
+        print(f"{k:4d} | {row['first_stage']['p50']:13.2f}ms | {added['cold']['p50']:7.2f}ms | "
+              f"{added['cold']['p99']:7.2f}ms | {added['warm']['p50']:7.2f}ms | {added['cold']['truncated']:9.1%}")
+
+    report["reranker"] = reranker.stats()
+    print("pair cost EMA: {:.2f} ms".format(reranker.pair_cost_ms))
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("Report saved to", REPORT_PATH)
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import threading
+import argparse
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+from text_normalize import light_normalize
+from file_versions import file_version, metadata_version
+
+CACHE_CAPACITY = 10_000 # result lists kept, across all engines
+TTL_S = 600.0 # None = entries only leave by eviction or invalidation
+VERSION_CHECK_S = 1.0 # each engine's index files are re-stat'ed at most this often
+ENGINES = ["bm25", "bm25_sparse", "faiss", "hybrid"]
+
+_CACHE = None
+
+def engine_files(engine):
+    # the files whose replacement changes an engine's answers; a directory's
+    # own inode / mtime changes when files inside it are added or replaced
+    if engine == "bm25":
+        import search_bm25
+        return [search_bm25.INDEX_PATH]
+    if engine == "bm25_sparse":
+        import search_bm25_sparse
+        return [search_bm25_sparse.INDEX_DIR, os.path.join(search_bm25_sparse.INDEX_DIR, "vocab.json")]
+    if engine == "faiss":
+        # the Arrow corpus can back the metadata, and filtered queries read the filter files
+        import search_faiss
+        import corpus_store
+        import recipe_filters
+        return [search_faiss.served_index_path(), corpus_store.CORPUS_PATH] + \
+            recipe_filters.filter_files(search_faiss.FILTER_DIR)
+    if engine == "hybrid":
+        return engine_files("bm25") + engine_files("faiss")
+
+    raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+
+def engine_version(engine):
+    version = [file_version(path) for path in engine_files(engine)]
+    if engine in ("faiss", "hybrid"):
+        import search_faiss
+        version.append(metadata_version(search_faiss.METADATA_PATH))
+    if engine == "bm25_sparse":
+        import search_bm25_sparse
+        version.append(metadata_version(search_bm25_sparse.METADATA_PATH))
+
+    return tuple(version)
+
+def filters_key(filters):
+    # {"must_tags": ["b", "a"]} and {"must_tags": ["a", "b"], "any_tags": []} are the same filter
+    if not filters:
+        return ()
+
+    return tuple(sorted((key, tuple(sorted(values))) for key, values in filters.items() if values))
+
+def run_search(engine, query, k, filters, options):
+    if filters and engine != "faiss":
+        raise ValueError(f"Filters are only supported by the faiss engine, not '{engine}'")
+
+    if engine == "bm25":
+        import search_bm25
+        return search_bm25.search(query, k, **options)
+    if engine == "bm25_sparse":
+        import search_bm25_sparse
+        return search_bm25_sparse.search(query, k, **options)
+    if engine == "faiss":
+        import search_faiss
+        return search_faiss.search(query, k, filters=filters, **options)
+    if engine == "hybrid":
+        import search_hybrid
+        return search_hybrid.search(query, k, **options)
+
+    raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+
+# Result lists keyed by (engine, light_normalize'd query, k, filters, search
+# options, index version). Bounded LRU with an optional TTL. Concurrent misses
+# on the same key run one search and share its result. When an engine's index
+# files change on disk, its entries are dropped. Cached lists are shared
+# between callers and must be treated as read-only.
+class ResultCache:
+    def __init__(self, capacity=CACHE_CAPACITY, ttl_s=TTL_S, version_check_s=VERSION_CHECK_S):
+        self.capacity = capacity
+        self.ttl_s = ttl_s
+        self.version_check_s = version_check_s
+
+        self._lru = OrderedDict()
+        self._inflight = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.search_s = 0.0
+
+    def version(self, engine):
+        now = time.monotonic()
+        checked_at, version = self._versions.get(engine, (None, None))
+        if checked_at is not None and self.version_check_s is not None and now - checked_at < self.version_check_s:
+            return version
+
+        new_version = engine_version(engine)
+        with self._lock:
+            if checked_at is not None and new_version != version:
+                self._invalidate(engine)
+            self._versions[engine] = (now, new_version)
+
+        return new_version
+
+    def _invalidate(self, engine):
+        stale = [key for key in self._lru if key[0] == engine]
+        for key in stale:
+            del self._lru[key]
+        self.invalidations += len(stale)
+
+    def _lookup(self, key):
+        entry = self._lru.get(key)
+        if entry is None:
+            return None
+
+        expires_at, results = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._lru[key]
+            self.expirations += 1
+            return None
+
+        self._lru.move_to_end(key)
+        return results
+
+    def _store(self, key, results):
+        if self.capacity <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl_s if self.ttl_s is not None else None
+        self._lru[key] = (expires_at, results)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_search(self, engine, query, k, filters=None, **options):
+        key = (engine, light_normalize(query), k, filters_key(filters),
+               json.dumps(options, sort_keys=True), self.version(engine))
+
+        with self._lock:
+            results = self._lookup(key)
+            if results is not None:
+                self.hits += 1
+                return results
+
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                self.misses += 1
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        # an identical search is already running: wait for its result
+        if waiting is not None:
+            return waiting.result()
+
+        try:
+            t0 = time.perf_counter()
+            results = run_search(engine, query, k, filters, options)
+            elapsed = time.perf_counter() - t0
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self.search_s += elapsed
+            self._store(key, results)
+            del self._inflight[key]
+        future.set_result(results)
+
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            avg_search_s = self.search_s / self.misses if self.misses else 0.0
+
+            return {
+                "lookups": lookups,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entries": len(self._lru),
+                "avg_search_ms": avg_search_s * 1000.0,
+                # estimate: every hit would otherwise have cost one average search
+                "search_s_saved": (self.hits + self.coalesced) * avg_search_s,
+            }
+
+def get_cache():
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ResultCache()
+
+    return _CACHE
+
+def search(query, k=5, engine="faiss", filters=None, **options):
+    return get_cache().get_or_search(engine, query, k, filters, **options)
+
+if __name__ == "__main__":
+    # Replay a head-skewed (Zipf) stream of the eval and notebook queries,
+    # once straight through the engine and once through the cache
+    from bench_queries import load_bench_queries
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engine", default="faiss", choices=ENGINES)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--n", type=int, default=5000, help="queries in the replayed stream")
+    args = parser.parse_args()
+
+    queries = load_bench_queries()
+    rng = np.random.default_rng(0)
+    stream = [queries[(r - 1) % len(queries)] for r in rng.zipf(1.3, size=args.n)]
+
+    run_search(args.engine, queries[0], args.k, None, {}) # warm up the engine
+
+    start = time.perf_counter()
+    for q in stream:
+        run_search(args.engine, q, args.k, None, {})
+    uncached_s = time.perf_counter() - start
+
+    cache = get_cache()
+    start = time.perf_counter()
+    for q in stream:
+        search(q, args.k, args.engine)
+    cached_s = time.perf_counter() - start
+
+    print(f"{len(stream)} queries | uncached {uncached_s:.2f}s | cached {cached_s:.2f}s "
+          f"({uncached_s / max(cached_s, 1e-9):.1f}x)")
+    print(json.dumps(cache.stats(), indent=2))
@@ -1,9 +1,9 @@
 import os
-import pandas as pd
+import corpus_store
 
 FILE_PATH = "../data/processed/clean_recipes_input.jsonl" 
 OUTPUT_PATH = "../data/samples/sample_recipes.jsonl"
 
-df = pd.read_json(FILE_PATH, lines=True)
+df = corpus_store.load_clean_frame(FILE_PATH)
 os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
 df.sample(50).to_json(OUTPUT_PATH, orient="records", lines=True)
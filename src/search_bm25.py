@@ -1,84 +1,97 @@
-from pyserini.search.lucene import LuceneSearcher
 import json
-import re
+import threading
+import tracing
+from text_normalize import light_normalize
 
 INDEX_PATH = "../data/bm25/index"
 BM25_K1 = 0.9
 BM25_B = 0.4
 RECALL = 5
+FIELDS = ["full", "name", "ids"] # hit projection: everything, id/score/name, or id/score only
+DOC_THREADS = 4 # Lucene threads used by batch_doc when fetching stored documents
 
 _SEARCHER = None
-
-def light_normalize(input_str):
-    if not isinstance(input_str, str):
-        return ""
-
-    input_str = input_str.lower()
-    
-    input_str = input_str.replace("&", " and ")
-    input_str = input_str.replace("+", " and ")
-    input_str = input_str.replace("/", " and ")
-    input_str = input_str.replace("'", "")
-
-    input_str = re.sub(r'[^a-z0-9\s\-]', ' ', input_str)
-    input_str = re.sub(r'\s+', ' ', input_str).strip()
-
-    return input_str
+_LOAD_LOCK = threading.Lock()
 
 def load_searcher(index_path=INDEX_PATH):
+    # pyserini starts the JVM on import; deferred so importing this module is cheap
+    from pyserini.search.lucene import LuceneSearcher
+
     searcher = LuceneSearcher(index_path)
     searcher.set_bm25(k1=BM25_K1, b=BM25_B)
 
     return searcher
 
-def run_query(searcher, query, recall):
-    norm_query = light_normalize(query)
-    hits = searcher.search(norm_query, k=recall)
-
-    results = []
-
-    for rank, hit in enumerate(hits):
-        lucene_doc = searcher.doc(hit.docid)
-        obj = json.loads(lucene_doc.raw())
-        raw = obj.get("raw", "")
-    
-        name = ""
-        description = ""
-        tags = []
-        ingredients = []
-
-        if raw != "":
-            dsp_json = json.loads(raw)
-            name = dsp_json.get("name", "")
-            tags = dsp_json.get("tags", [])
-            ingredients = dsp_json.get("ingredients", [])
-            description = dsp_json.get("description", "")
-
-        results.append({
-            "rank": rank + 1,
-            "id": int(hit.docid),
-            "score": hit.score,
-            "name": name,
-            "description": description,
-            "tags": tags,
-            "ingredients": ingredients
-        })
-
-    return results
+def display_of(raw_doc):
+    obj = json.loads(raw_doc)
+
+    display = obj.get("display")
+    if display is not None:
+        return display
+
+    # corpora built before create_bm25_corpus.py nested the display object
+    # carry it as a JSON string that has to be decoded a second time
+    raw = obj.get("raw", "")
+    return json.loads(raw) if raw else {}
+
+def fetch_docs(searcher, docids, threads=DOC_THREADS):
+    # one batched JVM call instead of one searcher.doc() round trip per hit
+    if len(docids) > 1 and hasattr(searcher, "batch_doc"):
+        docs = searcher.batch_doc(docids, threads)
+        return [docs.get(docid) for docid in docids]
+
+    return [searcher.doc(docid) for docid in docids]
+
+def hit_result(rank, hit, lucene_doc, fields):
+    dsp_json = display_of(lucene_doc.raw()) if lucene_doc is not None else {}
+
+    result = {
+        "rank": rank + 1,
+        "id": int(hit.docid),
+        "score": hit.score,
+        "name": dsp_json.get("name", ""),
+    }
+
+    if fields == "full":
+        result["description"] = dsp_json.get("description", "")
+        result["tags"] = dsp_json.get("tags", [])
+        result["ingredients"] = dsp_json.get("ingredients", [])
+
+    return result
+
+def run_query(searcher, query, recall, fields="full"):
+    if fields not in FIELDS:
+        raise ValueError(f"Unknown fields '{fields}', expected one of {FIELDS}")
+
+    with tracing.stage("bm25.normalize"):
+        norm_query = light_normalize(query)
+    with tracing.stage("bm25.lucene_search"):
+        hits = searcher.search(norm_query, k=recall)
+
+    if fields == "ids":
+        return [{"rank": rank + 1, "id": int(hit.docid), "score": hit.score} for rank, hit in enumerate(hits)]
+
+    with tracing.stage("bm25.fetch_docs"):
+        docs = fetch_docs(searcher, [hit.docid for hit in hits])
+
+    with tracing.stage("bm25.decode"):
+        return [hit_result(rank, hit, lucene_doc, fields) for rank, (hit, lucene_doc) in enumerate(zip(hits, docs))]
 
 def get_searcher(index_path=INDEX_PATH, force_reload=False):
     global _SEARCHER
-    if _SEARCHER is None or force_reload:
-        searcher = load_searcher(index_path) 
-        _SEARCHER = searcher
-    
+    # one load even when a fast-start warm-up and the first query race for it
+    with _LOAD_LOCK:
+        if _SEARCHER is None or force_reload:
+            searcher = load_searcher(index_path)
+            _SEARCHER = searcher
+
     return _SEARCHER
 
-def search(query, recall=RECALL, searcher=None):
+def search(query, recall=RECALL, searcher=None, fields="full"):
     if searcher is None:
         searcher = get_searcher()
 
-    return run_query(searcher, query, recall)
+    return run_query(searcher, query, recall, fields)
 
 if __name__ == "__main__":
     queries = ["baked salmon with lemon", "texas sheet cake", "low fat chicken",
@@ -0,0 +1,260 @@
+import os
+import json
+import time
+import argparse
+from collections import Counter
+import numpy as np
+import scipy.sparse as sp
+import metadata_store
+from lucene_analyzer import analyze
+from text_normalize import light_normalize
+
+CORPUS_PATH = "../data/bm25/corpus/recipes.jsonl"
+INDEX_DIR = "../data/bm25/sparse"
+METADATA_PATH = "../data/processed/recipes_display.jsonl"
+BM25_K1 = 0.9 # same parameters as the Lucene searcher in search_bm25.py
+BM25_B = 0.4
+RECALL = 5
+FIELDS = ["full", "name", "ids"]
+
+_SEARCHER = None
+
+# Lucene stores each document length as a one-byte norm (SmallFloat.intToByte4)
+# and BM25 scores with the decoded, lossy length. Doing the same keeps the
+# scores equal to Lucene's rather than merely close.
+NUM_FREE_VALUES = 24
+
+def int_to_byte4(length):
+    if length < NUM_FREE_VALUES:
+        return length
+
+    value = length - NUM_FREE_VALUES
+    n_bits = value.bit_length()
+    if n_bits < 4:
+        return NUM_FREE_VALUES + value
+
+    shift = n_bits - 4
+    return NUM_FREE_VALUES + (((value >> shift) & 0x07) | ((shift + 1) << 3))
+
+def byte4_to_int(byte):
+    if byte < NUM_FREE_VALUES:
+        return byte
+
+    value = byte - NUM_FREE_VALUES
+    bits = value & 0x07
+    shift = (value >> 3) - 1
+    return NUM_FREE_VALUES + (bits if shift == -1 else (bits | 0x08) << shift)
+
+def lucene_lengths(lengths):
+    table = {length: byte4_to_int(int_to_byte4(length)) for length in np.unique(lengths).tolist()}
+
+    return np.array([table[length] for length in lengths.tolist()], dtype=np.float32)
+
+def read_corpus(corpus_path):
+    ids = []
+    indptr = [0]
+    term_codes = []
+    tfs = []
+    lengths = []
+    vocab = {}
+
+    with open(corpus_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+
+            obj = json.loads(line)
+            tokens = analyze(obj.get("contents", ""))
+
+            for term, tf in Counter(tokens).items():
+                term_codes.append(vocab.setdefault(term, len(vocab)))
+                tfs.append(tf)
+
+            ids.append(int(obj["id"]))
+            lengths.append(len(tokens))
+            indptr.append(len(term_codes))
+
+    return (np.array(ids, dtype=np.int64), np.array(indptr, dtype=np.int64), np.array(term_codes, dtype=np.int64),
+            np.array(tfs, dtype=np.float32), np.array(lengths, dtype=np.int64), vocab)
+
+def bm25_weights(indptr, term_codes, tfs, lengths, n_terms, k1=BM25_K1, b=BM25_B):
+    n_docs = len(lengths)
+    df = np.bincount(term_codes, minlength=n_terms)
+
+    # Lucene's BM25Similarity: idf = log(1 + (N - df + 0.5) / (df + 0.5)),
+    # tf part = tf / (tf + k1 * (1 - b + b * dl / avgdl)), no (k1 + 1) factor
+    idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+    avgdl = np.float32(lengths.sum() / n_docs)
+    norm = (k1 * ((1 - b) + b * lucene_lengths(lengths) / avgdl)).astype(np.float32)
+
+    doc_of = np.repeat(np.arange(n_docs), np.diff(indptr))
+    weights = idf[term_codes] * tfs / (tfs + norm[doc_of])
+
+    return weights.astype(np.float32), float(avgdl)
+
+def build_index(corpus_path=CORPUS_PATH, index_dir=INDEX_DIR, k1=BM25_K1, b=BM25_B):
+    ids, indptr, term_codes, tfs, lengths, vocab = read_corpus(corpus_path)
+    weights, avgdl = bm25_weights(indptr, term_codes, tfs, lengths, len(vocab), k1, b)
+
+    # term-major CSR (terms x docs): a batch of queries is one sparse product
+    doc_term = sp.csr_matrix((weights, term_codes, indptr), shape=(len(ids), len(vocab)))
+    term_doc = doc_term.T.tocsr()
+    term_doc.sort_indices()
+
+    # one index dtype for both arrays, so scipy can wrap the memmaps without copying
+    index_dtype = np.int32 if term_doc.nnz < 2**31 else np.int64
+
+    os.makedirs(index_dir, exist_ok=True)
+    np.save(os.path.join(index_dir, "indptr.npy"), term_doc.indptr.astype(index_dtype))
+    np.save(os.path.join(index_dir, "indices.npy"), term_doc.indices.astype(index_dtype))
+    np.save(os.path.join(index_dir, "data.npy"), term_doc.data.astype(np.float32))
+    np.save(os.path.join(index_dir, "ids.npy"), ids)
+    with open(os.path.join(index_dir, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump({"k1": k1, "b": b, "n_docs": len(ids), "avgdl": avgdl, "terms": list(vocab)}, f)
+
+    return len(ids), len(vocab), term_doc.nnz
+
+class SparseBM25:
+    def __init__(self, index_dir=INDEX_DIR, metadata=None):
+        with open(os.path.join(index_dir, "vocab.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        self.vocab = {term: code for code, term in enumerate(meta["terms"])}
+        self.ids = np.load(os.path.join(index_dir, "ids.npy"))
+
+        load = lambda name: np.load(os.path.join(index_dir, name), mmap_mode="r")
+        self.matrix = sp.csr_matrix((load("data.npy"), load("indices.npy"), load("indptr.npy")),
+                                    shape=(len(self.vocab), meta["n_docs"]), copy=False)
+        self.metadata = metadata
+
+    def query_matrix(self, queries):
+        rows = []
+        cols = []
+        vals = []
+
+        # a term repeated in the query counts once per occurrence, as with
+        # Anserini's bag-of-words query (term boost = query term frequency)
+        for i, query in enumerate(queries):
+            for term, qtf in Counter(analyze(light_normalize(query))).items():
+                code = self.vocab.get(term)
+                if code is not None:
+                    rows.append(i)
+                    cols.append(code)
+                    vals.append(qtf)
+
+        return sp.csr_matrix((np.array(vals, dtype=np.float32), (rows, cols)), shape=(len(queries), len(self.vocab)))
+
+    def search_rows(self, queries, k):
+        # (nq x terms) @ (terms x docs): only documents sharing a term get a score
+        scores = (self.query_matrix(queries) @ self.matrix).tocsr()
+
+        hits = []
+        for i in range(len(queries)):
+            start, end = scores.indptr[i], scores.indptr[i + 1]
+            data = scores.data[start:end]
+            rows = scores.indices[start:end]
+
+            if len(data) > k:
+                # every document tied with the k-th score stays a candidate,
+                # so which of them make the cut does not depend on the partition
+                kth = np.partition(data, len(data) - k)[len(data) - k]
+                top = np.flatnonzero(data >= kth)
+                data, rows = data[top], rows[top]
+
+            # Lucene breaks score ties by document order
+            order = np.lexsort((rows, -data))[:k]
+            hits.append((rows[order], data[order]))
+
+        return hits
+
+def load_metadata(metadata_path=METADATA_PATH):
+    if not metadata_store.is_fresh(metadata_path):
+        print("Building metadata store for", metadata_path)
+        metadata_store.build_store(metadata_path)
+
+    return metadata_store.open_store(metadata_path)
+
+def load_searcher(index_dir=INDEX_DIR, metadata_path=METADATA_PATH):
+    return SparseBM25(index_dir, load_metadata(metadata_path))
+
+def hydrate_hits(searcher, rows, scores, fields):
+    rids = searcher.ids[rows]
+    if fields == "ids":
+        return [{"rank": rank + 1, "id": int(rid), "score": float(score)}
+                for rank, (rid, score) in enumerate(zip(rids, scores))]
+
+    results = []
+    for rank, (rid, score, dsp_json) in enumerate(zip(rids, scores, searcher.metadata.get_many(rids))):
+        dsp_json = dsp_json or {}
+        result = {
+            "rank": rank + 1,
+            "id": int(rid),
+            "score": float(score),
+            "name": dsp_json.get("name", ""),
+        }
+
+        if fields == "full":
+            result["description"] = dsp_json.get("description", "")
+            result["tags"] = dsp_json.get("tags", [])
+            result["ingredients"] = dsp_json.get("ingredients", [])
+
+        results.append(result)
+
+    return results
+
+def run_queries(searcher, queries, recall, fields="full"):
+    if fields not in FIELDS:
+        raise ValueError(f"Unknown fields '{fields}', expected one of {FIELDS}")
+
+    if len(queries) == 0:
+        return []
+
+    return [hydrate_hits(searcher, rows, scores, fields) for rows, scores in searcher.search_rows(queries, recall)]
+
+def run_query(searcher, query, recall, fields="full"):
+    return run_queries(searcher, [query], recall, fields)[0]
+
+def get_searcher(index_dir=INDEX_DIR, force_reload=False):
+    global _SEARCHER
+    if _SEARCHER is None or force_reload:
+        searcher = load_searcher(index_dir)
+        _SEARCHER = searcher
+
+    return _SEARCHER
+
+def search(query, recall=RECALL, searcher=None, fields="full"):
+    if searcher is None:
+        searcher = get_searcher()
+
+    return run_query(searcher, query, recall, fields)
+
+def search_many(queries, recall=RECALL, searcher=None, fields="full"):
+    if searcher is None:
+        searcher = get_searcher()
+
+    return run_queries(searcher, list(queries), recall, fields)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--build", action="store_true", help="build the sparse index from the BM25 corpus")
+    args = parser.parse_args()
+
+    if args.build:
+        t0 = time.perf_counter()
+        n_docs, n_terms, nnz = build_index()
+        print(f"Indexed {n_docs} documents, {n_terms} terms, {nnz} postings in {time.perf_counter() - t0:.1f}s")
+        print("Sparse BM25 index saved to", INDEX_DIR)
+    else:
+        queries = ["baked salmon with lemon", "texas sheet cake", "low fat chicken",
+                   "molasses ginger cookies", "broccoli cheddar soup"]
+
+        searcher = get_searcher()
+        for query in queries:
+            results = search(query, RECALL, searcher)
+
+            for r in results:
+                print(f"{r['rank']:2d}. {r['score']:.3f} | {r['id']} | {r['name']}")
+
+            print()
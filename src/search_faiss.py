@@ -1,42 +1,79 @@
 
-from sentence_transformers import SentenceTransformer
 import numpy as np
-import faiss
-faiss.omp_set_num_threads(1)
-import torch
+import os
 import json
-import re
+import time
+import threading
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import metadata_store
+import tracing
+from file_versions import file_version, metadata_version
+from text_normalize import light_normalize, light_normalize_many
+from embedding_cache import EmbeddingCache
+from recipe_filters import RecipeFilters, FILTER_DIR, filter_files
 
+# torch, sentence_transformers and faiss take seconds to import, so they are
+# imported inside the functions that use them; importing this module is cheap.
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_SNAPSHOT_DIR = "../data/models/all-MiniLM-L6-v2" # local model + tokenizer copy (python search_faiss.py --save-snapshot)
+EMB_DIM = 384
 INDEX_PATH = "../data/embeddings/all-MiniLM-L6-v2.faiss"
+INDEX_SPEC = "flat" # e.g. "sq8" or "pq:m=48,nbits=8" serves that build_faiss_from_memmap.py variant
+INDEX_MMAP = True # memory-map the index file instead of reading it into RAM (falls back to a full read)
 METADATA_PATH = "../data/processed/recipes_display.jsonl"
 RECALL = 5 # How much to Recall
+QUERY_BATCH_SIZE = 128
+NPROBE = 32 # IVF / IVF-PQ: inverted lists visited per query
+EF_SEARCH = 128 # HNSW: candidate list size during search
+EMB_CACHE_SIZE = 4096 # query embeddings kept in the in-memory LRU
+EMB_CACHE_DIR = None # e.g. "../data/cache/query_embeddings" to persist across restarts
+EMBD_PATH = "../data/embeddings/all-MiniLM-L6-v2.data"
+FILTER_EXACT_MAX = 20_000 # filters matching at most this many recipes are scored exactly over the memmap
+# Cascade: MiniLM top-CASCADE_N candidates re-scored with the Qwen3 vectors.
+# The shipped memmap is 231637 x 384 float32 (MRL-truncated Qwen3 vectors);
+# only the first len(ids) rows are filled, one per line of the id file.
+QWEN_MODEL_NAME = "Qwen/Qwen3-Embedding-0.6B"
+QWEN_DIM = 384
+QWEN_EMBD_PATH = "../data/embeddings/qwen3_recipe_emb.data"
+QWEN_ID_PATH = "../data/embeddings/qwen3_recipe_ids.txt"
+CASCADE_N = 100
+RELOAD_CHECK_S = 1.0 # get_searcher() re-stats the index / metadata files at most this often (None = never)
+RETIRE_GRACE_S = 30.0 # a swapped-out metadata store is closed this long after the swap, when queries on it are done
 
 _SEARCHER = None  
 _METADATA = None
 _MODEL = None
 _DEVICE = None
+_EMB_CACHE = None
+_FILTERS = None
+_QWEN = None
+_EMBEDDINGS = None
+_VERSIONS = {"index": None, "metadata": None, "filters": None}
+_LAST_CHECK = 0.0
+_RETIRED = [] # (swap time, swapped-out metadata store) waiting to be closed
+_RELOAD_LOCK = threading.Lock()
+_MODEL_LOCK = threading.Lock()
+_FAISS = None
+_WARMUP = {}
 
-def light_normalize(input_str):
-    if not isinstance(input_str, str):
-        return ""
-
-    input_str = input_str.lower()
-    
-    input_str = input_str.replace("&", " and ")
-    input_str = input_str.replace("+", " and ")
-    input_str = input_str.replace("/", " and ")
-    input_str = input_str.replace("'", "")
+def get_faiss():
+    global _FAISS
+    if _FAISS is None:
+        import faiss
+        faiss.omp_set_num_threads(1)
+        _FAISS = faiss
 
-    input_str = re.sub(r'[^a-z0-9\s\-]', ' ', input_str)
-    input_str = re.sub(r'\s+', ' ', input_str).strip()
+    return _FAISS
 
-    return input_str
+def embed_queries(queries, device, model, batch_size=QUERY_BATCH_SIZE):
+    import torch
 
-def embed_query(query, device, model):
     with torch.no_grad():
         emb = model.encode(
-            [query],
-            batch_size=1,
+            queries,
+            batch_size=batch_size,
             convert_to_tensor=True,
             device=device,
             normalize_embeddings=True,
@@ -46,21 +83,210 @@ def embed_query(query, device, model):
     emb = emb.cpu().numpy().astype("float32")
     return emb
 
-def load_searcher(index_path):
+def embed_query(query, device, model):
+    return embed_queries([query], device, model, batch_size=1)
+
+def get_embedding_cache():
+    global _EMB_CACHE
+    if _EMB_CACHE is None:
+        _EMB_CACHE = EmbeddingCache(MODEL_NAME, EMB_DIM, EMB_CACHE_SIZE, EMB_CACHE_DIR)
+
+    return _EMB_CACHE
+
+def embed_queries_cached(queries, device, model):
+    # queries are expected to be light_normalize'd already; that text is the cache key
+    cache = get_embedding_cache()
+
+    def encode(texts):
+        # model=None: the model is only loaded (or waited for) on a cache miss
+        if model is None:
+            loaded_model, loaded_device = get_model()
+            return embed_queries(texts, loaded_device, loaded_model)
+
+        return embed_queries(texts, device, model)
+
+    return cache.get_or_encode(queries, encode)
+
+def model_source():
+    # the local snapshot loads without any Hugging Face hub lookups
+    if MODEL_SNAPSHOT_DIR and os.path.isfile(os.path.join(MODEL_SNAPSHOT_DIR, "modules.json")):
+        return MODEL_SNAPSHOT_DIR
+
+    return MODEL_NAME
+
+def load_model():
     global _DEVICE
     global _MODEL
-    _DEVICE = "mps" if torch.backends.mps.is_available() else "cpu"
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    device = "mps" if torch.backends.mps.is_available() else "cpu"
+    model = SentenceTransformer(model_source(), device=device)
+    model.eval()
+
+    _DEVICE = device
+    _MODEL = model
+
+    return _MODEL, _DEVICE
+
+def get_model():
+    if _MODEL is None:
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                load_model()
+
+    return _MODEL, _DEVICE
+
+def save_model_snapshot(snapshot_dir=MODEL_SNAPSHOT_DIR):
+    from sentence_transformers import SentenceTransformer
+
+    # weights as safetensors plus the fast tokenizer's tokenizer.json
+    SentenceTransformer(MODEL_NAME, device="cpu").save(snapshot_dir)
+
+    return snapshot_dir
+
+def served_index_path(spec=None):
+    from build_faiss_from_memmap import index_path_for
+
+    return index_path_for(spec or INDEX_SPEC, INDEX_PATH)
 
-    _MODEL = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2",
-                                 device=_DEVICE)
-    _MODEL.eval()
+def index_code_bytes(index):
+    # bytes per stored vector for the exhaustive kinds (flat / fp16 / sq8 / pq)
+    faiss = get_faiss()
+    base = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    try:
+        return base.sa_code_size()
+    except RuntimeError:
+        return None
 
-    index = faiss.read_index(index_path)
+def load_searcher(index_path):
+    get_model()
+
+    return load_index(index_path)
+
+def load_index(index_path):
+    faiss = get_faiss()
+
+    index = None
+    if INDEX_MMAP:
+        # pages are read on first touch and shared by every process serving the file;
+        # IO_FLAG_MMAP_IFC (newer faiss) extends this to flat / SQ / PQ codes
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        try:
+            index = faiss.read_index(index_path, flags)
+        except RuntimeError as e:
+            print(f"Could not memory-map {index_path} ({e}), reading it into memory")
+
+    if index is None:
+        index = faiss.read_index(index_path)
     print("Loaded FAISS index with ntotal =", index.ntotal)
 
+    code_bytes = index_code_bytes(index)
+    if code_bytes:
+        print(f"Vector storage: {code_bytes} bytes/vector, {code_bytes * index.ntotal / 2**20:.0f} MB")
+
     return index
 
+def make_search_params(index, nprobe=NPROBE, ef_search=EF_SEARCH, sel=None):
+    # Search-time knobs for approximate indexes; the flat index takes none.
+    # sel (an IDSelector) restricts the search to the recipes it accepts.
+    faiss = get_faiss()
+    base = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    selector = {} if sel is None else {"sel": sel}
+
+    if nprobe is not None and faiss.try_extract_index_ivf(base) is not None:
+        params = faiss.SearchParametersIVF(nprobe=nprobe, **selector)
+    elif ef_search is not None and isinstance(base, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(efSearch=ef_search, **selector)
+    elif sel is not None:
+        params = faiss.SearchParameters(sel=sel)
+    else:
+        return None
+
+    if sel is not None:
+        params.referenced_objects = [sel]
+
+    return params
+
+def make_id_selector(ids):
+    # bitmap over the recipe id space: built with numpy in about a
+    # millisecond and an O(1) membership test, however many ids pass
+    mask = np.zeros(int(ids.max()) + 1, dtype=bool)
+    mask[ids] = True
+    bitmap = np.packbits(mask, bitorder="little")
+
+    faiss = get_faiss()
+    sel = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+    sel.referenced_objects = [bitmap] # faiss only keeps a raw pointer
+    return sel
+
+def get_filters():
+    # update_index.py appends each delta to the filter log
+    global _FILTERS
+    version = tuple(file_version(path) for path in filter_files(FILTER_DIR))
+    if version[0] is None:
+        raise ValueError(f"No filter bitmaps in {FILTER_DIR}, run recipe_filters.py before searching with filters")
+    if _FILTERS is None or version != _VERSIONS["filters"]:
+        _FILTERS = RecipeFilters.load(FILTER_DIR)
+        _VERSIONS["filters"] = version
+
+    return _FILTERS
+
+def get_embeddings():
+    # reopened when embed_recipes.py / update_index.py have grown the memmap
+    global _EMBEDDINGS
+    n = os.path.getsize(EMBD_PATH) // (4 * EMB_DIM)
+    if _EMBEDDINGS is None or _EMBEDDINGS.shape[0] != n:
+        _EMBEDDINGS = np.memmap(EMBD_PATH, dtype="float32", mode="r", shape=(n, EMB_DIM))
+
+    return _EMBEDDINGS
+
+def compile_filters(filters):
+    # (ids, embedding rows) of the recipes passing the filters, or None
+    # when the filters constrain nothing
+    recipe_filters = get_filters()
+    bits = recipe_filters.compile(filters)
+    if bits is None:
+        return None
+
+    rows = recipe_filters.matching_rows(bits)
+    emb_rows = recipe_filters.emb_rows[rows]
+    keep = emb_rows >= 0
+
+    return recipe_filters.ids[rows][keep], emb_rows[keep]
+
+def exact_search(query_embs, ids, emb_rows, k):
+    # brute force over the candidates only; rows are read in file order.
+    # Scores are exact float32 inner products whatever index is served, so
+    # with a reduced-precision index (fp16, sq8, pq) they can differ slightly
+    # from the scores the selector route returns for the same recipes.
+    order = np.argsort(emb_rows)
+    ids = ids[order]
+    vectors = np.asarray(get_embeddings()[emb_rows[order]])
+    scores = query_embs @ vectors.T
+
+    k = min(k, len(ids))
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    rank = np.argsort(-top_scores, axis=1, kind="stable")
+
+    return np.take_along_axis(top_scores, rank, axis=1), ids[np.take_along_axis(top, rank, axis=1)]
+
 def load_metadata(metadata_path):
+    # Prefer the memory-mapped side-store (python metadata_store.py); records
+    # are then decoded lazily, only for the hits a query returns.
+    if metadata_store.is_fresh(metadata_path):
+        store = metadata_store.open_store(metadata_path)
+        print("Opened metadata store with", len(store), "records")
+        return store
+
+    # next best: the memory-mapped columnar corpus written by preprocess.py
+    import corpus_store
+    if corpus_store.is_fresh(metadata_path):
+        corpus = corpus_store.CorpusMetadata()
+        print("Opened columnar corpus with", len(corpus), "records")
+        return corpus
+
     recipe_mdata = {}
     with open(metadata_path, 'r', encoding='utf-8') as f:
         for line in f:
@@ -75,13 +301,7 @@ def load_metadata(metadata_path):
 
     return recipe_mdata
 
-def run_query(searcher, metadata, query, device, model, k):
-    query_emb = embed_query(light_normalize(query), device, model)
-    scores, faiss_ids = searcher.search(query_emb, k)
-
-    scores = scores[0]
-    faiss_ids = faiss_ids[0]
-
+def hydrate_hits(metadata, scores, faiss_ids):
     results = []
 
     for score, rid in zip(scores, faiss_ids):
@@ -105,30 +325,253 @@ def run_query(searcher, metadata, query, device, model, k):
 
     return results
 
-def get_searcher(index_path=INDEX_PATH, metadata_path=METADATA_PATH, force_reload=False):
+def stage_prefix(queries):
+    # a block of queries is timed as a whole, under its own names, so the
+    # per-query histograms (faiss.*) never mix in whole-batch latencies
+    return "faiss" if len(queries) == 1 else "faiss.batch"
+
+def run_query(searcher, metadata, query, device, model, k, params=None):
+    with tracing.stage("faiss.normalize"):
+        norm_query = light_normalize(query)
+    with tracing.stage("faiss.embed"):
+        query_emb = embed_queries_cached([norm_query], device, model)
+    with tracing.stage("faiss.index_search"):
+        scores, faiss_ids = searcher.search(query_emb, k, params=params)
+    with tracing.stage("faiss.hydrate"):
+        return hydrate_hits(metadata, scores[0], faiss_ids[0])
+
+def run_queries(searcher, metadata, queries, device, model, k, params=None):
+    if len(queries) == 0:
+        return []
+
+    # One batched encode and one (nq x d) index scan for the whole block
+    prefix = stage_prefix(queries)
+    with tracing.stage(prefix + ".normalize"):
+        norm_queries = light_normalize_many(queries)
+    with tracing.stage(prefix + ".embed"):
+        query_embs = embed_queries_cached(norm_queries, device, model)
+    with tracing.stage(prefix + ".index_search"):
+        scores, faiss_ids = searcher.search(query_embs, k, params=params)
+    with tracing.stage(prefix + ".hydrate"):
+        return [hydrate_hits(metadata, scores[i], faiss_ids[i]) for i in range(len(queries))]
+
+def load_qwen(device=None):
+    global _QWEN
+    if _QWEN is None:
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        device = device or _DEVICE or ("mps" if torch.backends.mps.is_available() else "cpu")
+        model = SentenceTransformer(QWEN_MODEL_NAME, device=device, truncate_dim=QWEN_DIM)
+        model.eval()
+
+        ids = np.loadtxt(QWEN_ID_PATH, dtype=np.int64, ndmin=1)
+        order = np.argsort(ids, kind="stable")
+        n_rows = os.path.getsize(QWEN_EMBD_PATH) // (4 * QWEN_DIM)
+        embeddings = np.memmap(QWEN_EMBD_PATH, dtype="float32", mode="r", shape=(n_rows, QWEN_DIM))
+
+        _QWEN = {"model": model, "device": device, "ids": ids, "ids_sorted": ids[order], "row_of_sorted": order,
+                 "embeddings": embeddings[:min(len(ids), n_rows)]}
+        print("Loaded Qwen3 vectors for", _QWEN["embeddings"].shape[0], "recipes")
+
+    return _QWEN
+
+def qwen_rows(qwen, rids):
+    # memmap row of each recipe id, -1 for recipes without a Qwen3 vector
+    ids_sorted = qwen["ids_sorted"]
+    pos = np.minimum(np.searchsorted(ids_sorted, rids), max(len(ids_sorted) - 1, 0))
+    found = (ids_sorted[pos] == rids) if len(ids_sorted) else np.zeros(len(rids), dtype=bool)
+    rows = np.where(found, qwen["row_of_sorted"][pos], -1)
+
+    return np.where(rows < qwen["embeddings"].shape[0], rows, -1)
+
+def embed_qwen_queries(qwen, queries):
+    import torch
+
+    with torch.no_grad():
+        # Qwen3 embeds queries with its instruction prompt, documents without
+        emb = qwen["model"].encode(queries, prompt_name="query", batch_size=QUERY_BATCH_SIZE,
+                                   normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False)
+
+    return np.asarray(emb, dtype="float32")
+
+def rescore(qwen, query_emb, scores, rids, k):
+    # Candidates are ranked by their Qwen3 vectors, read straight from the
+    # memmap by row. If any candidate has none, MiniLM and Qwen3 scores cannot
+    # be ranked together, and the MiniLM ranking is kept as it is.
+    valid = rids != -1
+    scores, rids = scores[valid], rids[valid]
+    rows = qwen_rows(qwen, rids)
+    if (rows < 0).any():
+        return scores[:k], rids[:k]
+
+    order = np.argsort(rows)
+    vectors = np.asarray(qwen["embeddings"][rows[order]])
+    qwen_scores = np.empty(len(order), dtype=np.float32)
+    qwen_scores[order] = vectors @ query_emb
+
+    rank = np.argsort(-qwen_scores, kind="stable")[:k]
+
+    return qwen_scores[rank], rids[rank]
+
+def run_cascade_queries(searcher, metadata, queries, device, model, k, n=CASCADE_N, params=None):
+    if len(queries) == 0:
+        return []
+
+    qwen = load_qwen(device)
+    prefix = stage_prefix(queries)
+    with tracing.stage(prefix + ".normalize"):
+        norm_queries = light_normalize_many(queries)
+    with tracing.stage(prefix + ".embed"):
+        query_embs = embed_queries_cached(norm_queries, device, model)
+    with tracing.stage(prefix + ".index_search"):
+        scores, faiss_ids = searcher.search(query_embs, max(n, k), params=params)
+
+    with tracing.stage(prefix + ".cascade_embed"):
+        qwen_embs = embed_qwen_queries(qwen, norm_queries)
+    with tracing.stage(prefix + ".cascade_rescore"):
+        top = [rescore(qwen, qwen_embs[i], scores[i], faiss_ids[i], k) for i in range(len(queries))]
+    with tracing.stage(prefix + ".hydrate"):
+        return [hydrate_hits(metadata, top_scores, top_ids) for top_scores, top_ids in top]
+
+def run_exact_queries(metadata, queries, device, model, k, ids, emb_rows):
+    prefix = stage_prefix(queries)
+    with tracing.stage(prefix + ".normalize"):
+        norm_queries = light_normalize_many(queries)
+    with tracing.stage(prefix + ".embed"):
+        query_embs = embed_queries_cached(norm_queries, device, model)
+    with tracing.stage(prefix + ".exact_search"):
+        scores, rids = exact_search(query_embs, ids, emb_rows, k)
+    with tracing.stage(prefix + ".hydrate"):
+        return [hydrate_hits(metadata, scores[i], rids[i]) for i in range(len(queries))]
+
+# A selective filter goes to exact search over its candidates, whose cost
+# shrinks with the candidate count; a broad one is passed to the index as an
+# ID selector, where it costs about as much as an unfiltered search.
+def run_filtered_queries(searcher, metadata, queries, device, model, k, filters, nprobe=NPROBE, ef_search=EF_SEARCH):
+    if len(queries) == 0:
+        return []
+
+    with tracing.stage(stage_prefix(queries) + ".filter"):
+        candidates = compile_filters(filters)
+    if candidates is None:
+        params = make_search_params(searcher, nprobe, ef_search)
+        return run_queries(searcher, metadata, queries, device, model, k, params)
+
+    ids, emb_rows = candidates
+    if len(ids) == 0:
+        return [[] for _ in queries]
+
+    if len(ids) <= FILTER_EXACT_MAX:
+        return run_exact_queries(metadata, queries, device, model, k, ids, emb_rows)
+
+    params = make_search_params(searcher, nprobe, ef_search, make_id_selector(ids))
+    return run_queries(searcher, metadata, queries, device, model, k, params)
+
+def close_retired(now, grace_s=RETIRE_GRACE_S):
+    # the mmap and file handle of a replaced store; only a MetadataStore has them
+    while _RETIRED and now - _RETIRED[0][0] >= grace_s:
+        _, store = _RETIRED.pop(0)
+        store.close()
+
+def get_searcher(index_path=None, metadata_path=METADATA_PATH, force_reload=False):
     global _SEARCHER
     global _METADATA
-    if _SEARCHER is None or force_reload:
-        searcher = load_searcher(index_path)
-        _SEARCHER = searcher
+    global _LAST_CHECK
+    index_path = index_path or served_index_path()
+
+    if _SEARCHER is not None and _METADATA is not None and not force_reload:
+        if RELOAD_CHECK_S is None or time.monotonic() - _LAST_CHECK < RELOAD_CHECK_S:
+            return _SEARCHER, _METADATA
+
+    with _RELOAD_LOCK:
+        _LAST_CHECK = time.monotonic()
 
-    if _METADATA is None or force_reload:
-        metadata = load_metadata(metadata_path)
-        _METADATA = metadata
+        # a changed file is loaded next to the old one and swapped in; queries
+        # already holding the old index or metadata finish on it
+        version = file_version(index_path)
+        if _SEARCHER is None or force_reload:
+            # the model is loaded apart from the index, by get_model() or warm_up()
+            _SEARCHER = load_index(index_path)
+        elif version != _VERSIONS["index"]:
+            print("Index changed on disk, hot-swapping", index_path)
+            _SEARCHER = load_index(index_path)
+        _VERSIONS["index"] = version
+
+        version = metadata_version(metadata_path)
+        if _METADATA is None or force_reload or version != _VERSIONS["metadata"]:
+            old = _METADATA
+            _METADATA = load_metadata(metadata_path)
+            if isinstance(old, metadata_store.MetadataStore):
+                _RETIRED.append((_LAST_CHECK, old))
+        _VERSIONS["metadata"] = version
+        close_retired(_LAST_CHECK)
 
     return _SEARCHER, _METADATA
 
-def search(query, recall=RECALL, searcher=None, metadata=None):
+# Loads the model and the index / metadata in background threads and returns
+# at once. A query blocks only on the component it needs when it arrives:
+# get_searcher() waits on the index load, get_model() on the model, and a
+# query embedding already in the cache needs no model at all.
+def warm_up(index_path=None, metadata_path=METADATA_PATH):
+    if not _WARMUP:
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="faiss-warmup")
+        _WARMUP["model"] = pool.submit(get_model)
+        _WARMUP["searcher"] = pool.submit(get_searcher, index_path, metadata_path)
+        pool.shutdown(wait=False)
+
+    return _WARMUP
+
+def warm_state():
+    return {name: future.done() for name, future in _WARMUP.items()}
+
+# filters: optional dict with any of recipe_filters.FILTER_KEYS, e.g.
+# {"must_tags": ["vegetarian"], "must_not_ingredients": ["cheese"]}
+def search(query, recall=RECALL, searcher=None, metadata=None, nprobe=NPROBE, ef_search=EF_SEARCH, filters=None,
+           cascade_n=None):
     if searcher is None or metadata is None:
         searcher, metadata = get_searcher()
 
-    return run_query(searcher, metadata, query, _DEVICE, _MODEL, recall)
+    if cascade_n:
+        return search_many([query], recall, searcher, metadata, nprobe, ef_search, filters, cascade_n)[0]
+
+    if filters:
+        return run_filtered_queries(searcher, metadata, [query], _DEVICE, _MODEL, recall, filters, nprobe, ef_search)[0]
+
+    params = make_search_params(searcher, nprobe, ef_search)
+    return run_query(searcher, metadata, query, _DEVICE, _MODEL, recall, params)
+
+# cascade_n: re-score the top cascade_n MiniLM candidates with the Qwen3
+# vectors and return the best `recall` of them
+def search_many(queries, recall=RECALL, searcher=None, metadata=None, nprobe=NPROBE, ef_search=EF_SEARCH,
+                filters=None, cascade_n=None):
+    if searcher is None or metadata is None:
+        searcher, metadata = get_searcher()
+
+    if cascade_n:
+        if filters:
+            raise ValueError("cascade_n cannot be combined with filters")
+        params = make_search_params(searcher, nprobe, ef_search)
+        return run_cascade_queries(searcher, metadata, list(queries), _DEVICE, _MODEL, recall, cascade_n, params)
+
+    if filters:
+        return run_filtered_queries(searcher, metadata, list(queries), _DEVICE, _MODEL, recall, filters, nprobe, ef_search)
+
+    params = make_search_params(searcher, nprobe, ef_search)
+    return run_queries(searcher, metadata, list(queries), _DEVICE, _MODEL, recall, params)
 
 if __name__ == "__main__":
-    q = "healthy quick meal"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--save-snapshot", action="store_true", help="save the model and tokenizer to MODEL_SNAPSHOT_DIR")
+    args = parser.parse_args()
 
-    searcher, metadata = get_searcher()
-    hits = search(q, searcher=searcher, metadata=metadata)
+    if args.save_snapshot:
+        print("Model snapshot saved to", save_model_snapshot())
+    else:
+        q = "healthy quick meal"
+
+        searcher, metadata = get_searcher()
+        hits = search(q, searcher=searcher, metadata=metadata)
 
-    for h in hits:
-        print(f"{h['score']:.3f} | {h['id']} | {h['name']}")
+        for h in hits:
+            print(f"{h['score']:.3f} | {h['id']} | {h['name']}")
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+import search_bm25
+import search_faiss
+
+RECALL = 5
+DEPTH = 50 # candidates taken from each engine before fusion
+FUSION = "rrf" # "rrf" or "blend"
+RRF_K = 60
+WEIGHTS = {"bm25": 1.0, "faiss": 1.0}
+MAX_WORKERS = 8
+
+_POOL = None
+
+def get_pool():
+    global _POOL
+    if _POOL is None:
+        _POOL = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="hybrid")
+
+    return _POOL
+
+def get_searcher(force_reload=False):
+    # load both engines side by side; each keeps its own module-level singleton
+    pool = get_pool()
+    bm25_future = pool.submit(search_bm25.get_searcher, force_reload=force_reload)
+    faiss_future = pool.submit(search_faiss.get_searcher, force_reload=force_reload)
+
+    faiss_searcher, faiss_meta = faiss_future.result()
+    return bm25_future.result(), faiss_searcher, faiss_meta
+
+def rrf_scores(ranked_lists, weights, rrf_k=RRF_K):
+    scores = {}
+    for engine, results in ranked_lists.items():
+        weight = weights.get(engine, 1.0)
+        for rank, r in enumerate(results, start=1):
+            scores[r["id"]] = scores.get(r["id"], 0.0) + weight / (rrf_k + rank)
+
+    return scores
+
+def blend_scores(ranked_lists, weights):
+    # min-max normalize each engine's scores so BM25 and cosine are comparable;
+    # a document missing from an engine's list gets nothing from that engine
+    scores = {}
+    for engine, results in ranked_lists.items():
+        if not results:
+            continue
+
+        weight = weights.get(engine, 1.0)
+        values = [r["score"] for r in results]
+        lo, hi = min(values), max(values)
+        span = hi - lo
+
+        for r in results:
+            norm = (r["score"] - lo) / span if span > 0 else 1.0
+            scores[r["id"]] = scores.get(r["id"], 0.0) + weight * norm
+
+    return scores
+
+def fuse(ranked_lists, recall, fusion=FUSION, weights=None, rrf_k=RRF_K):
+    weights = WEIGHTS if weights is None else {**WEIGHTS, **weights}
+
+    if fusion == "rrf":
+        scores = rrf_scores(ranked_lists, weights, rrf_k)
+    elif fusion == "blend":
+        scores = blend_scores(ranked_lists, weights)
+    else:
+        raise ValueError(f"Unknown fusion '{fusion}', expected 'rrf' or 'blend'")
+
+    docs = {}
+    for results in ranked_lists.values():
+        for r in results:
+            docs.setdefault(r["id"], r)
+
+    ordered = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:recall]
+
+    results = []
+    for rank, (rid, score) in enumerate(ordered):
+        doc = docs[rid]
+        results.append({
+            "rank": rank + 1,
+            "id": rid,
+            "score": score,
+            "name": doc.get("name"),
+            "description": doc.get("description"),
+            "tags": doc.get("tags"),
+            "ingredients": doc.get("ingredients")
+        })
+
+    return results
+
+def run_query(bm25_searcher, faiss_searcher, faiss_meta, query, recall, fusion=FUSION, weights=None,
+              bm25_depth=DEPTH, faiss_depth=DEPTH, rrf_k=RRF_K):
+    pool = get_pool()
+
+    # both engines run at the same time, so latency is roughly the slower one
+    bm25_future = pool.submit(search_bm25.search, query, bm25_depth, bm25_searcher)
+    faiss_future = pool.submit(search_faiss.search, query, faiss_depth, faiss_searcher, faiss_meta)
+
+    ranked_lists = {"bm25": bm25_future.result(), "faiss": faiss_future.result()}
+
+    return fuse(ranked_lists, recall, fusion, weights, rrf_k)
+
+def search(query, recall=RECALL, fusion=FUSION, weights=None, depth=DEPTH, bm25_depth=None, faiss_depth=None,
+           rrf_k=RRF_K, searchers=None):
+    if searchers is None:
+        searchers = get_searcher()
+
+    bm25_searcher, faiss_searcher, faiss_meta = searchers
+    bm25_depth = max(recall, depth) if bm25_depth is None else bm25_depth
+    faiss_depth = max(recall, depth) if faiss_depth is None else faiss_depth
+
+    return run_query(bm25_searcher, faiss_searcher, faiss_meta, query, recall, fusion, weights,
+                     bm25_depth, faiss_depth, rrf_k)
+
+if __name__ == "__main__":
+    from bench_queries import load_bench_queries
+
+    search_faiss.EMB_CACHE_SIZE = 0 # time real encodes, not embedding cache hits
+    searchers = get_searcher()
+    bm25_searcher, faiss_searcher, faiss_meta = searchers
+    queries = load_bench_queries()
+
+    # warm up both engines
+    search(queries[0], searchers=searchers)
+
+    timings = {"bm25": 0.0, "faiss": 0.0, "hybrid": 0.0}
+    for q in queries:
+        t0 = time.perf_counter()
+        search_bm25.search(q, DEPTH, bm25_searcher)
+        t1 = time.perf_counter()
+        search_faiss.search(q, DEPTH, faiss_searcher, faiss_meta)
+        t2 = time.perf_counter()
+        search(q, searchers=searchers)
+        t3 = time.perf_counter()
+
+        timings["bm25"] += t1 - t0
+        timings["faiss"] += t2 - t1
+        timings["hybrid"] += t3 - t2
+
+    for name, total in timings.items():
+        print(f"{name:6s} mean latency: {1000 * total / len(queries):.2f} ms")
+    print()
+
+    for r in search("healthy quick meal", searchers=searchers):
+        print(f"{r['rank']:2d}. {r['score']:.4f} | {r['id']} | {r['name']}")
@@ -0,0 +1,265 @@
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web, ClientSession, ClientTimeout
+import search_bm25
+import search_faiss
+import search_hybrid
+import tracing
+from bench_queries import load_bench_queries
+from bench_utils import percentiles_ms
+
+HOST = "127.0.0.1"
+PORT = 8080
+BATCH_WINDOW_MS = 5 # how long the first FAISS request waits for others to join its batch
+MAX_BATCH = 64
+MAX_INFLIGHT = 256 # requests being served at once; more get 503
+REQUEST_TIMEOUT_S = 2.0 # per request; slower ones get 504
+EXECUTOR_WORKERS = 4 # threads for model, FAISS and Lucene calls
+MAX_K = 100
+
+LOADGEN_REQUESTS = 2000
+LOADGEN_CONCURRENCY = 32
+
+def faiss_batch(queries, k):
+    # get_searcher() also picks up an index that update_index.py swapped in
+    searcher, metadata = search_faiss.get_searcher()
+
+    return search_faiss.search_many(queries, recall=k, searcher=searcher, metadata=metadata)
+
+# Coalesces FAISS requests that arrive within BATCH_WINDOW_MS into one
+# search_many call: one batched encode and one (nq x d) index search.
+class FaissBatcher:
+    def __init__(self, executor, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH):
+        self.executor = executor
+        self.window_s = window_ms / 1000
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.stats = {"batches": 0, "queries": 0}
+        self._task = None
+        self._dispatching = set()
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def submit(self, query, k):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((query, k, future))
+
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            if self.queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.window_s)
+
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            # requests that already timed out are dropped before the search
+            batch = [item for item in batch if not item[2].done()]
+            if batch:
+                # dispatched without waiting, so the next batch can form meanwhile
+                task = loop.create_task(self._dispatch(batch))
+                self._dispatching.add(task)
+                task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        k = max(item[1] for item in batch)
+
+        try:
+            results = await loop.run_in_executor(self.executor, faiss_batch, [item[0] for item in batch], k)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats["batches"] += 1
+        self.stats["queries"] += len(batch)
+        for (_, item_k, future), hits in zip(batch, results):
+            if not future.done():
+                future.set_result(hits[:item_k])
+
+async def run_faiss(app, query, k, batched):
+    if batched:
+        return await app["batcher"].submit(query, k)
+
+    loop = asyncio.get_running_loop()
+    return (await loop.run_in_executor(app["executor"], faiss_batch, [query], k))[0]
+
+async def run_bm25(app, query, k):
+    loop = asyncio.get_running_loop()
+
+    return await loop.run_in_executor(app["executor"], search_bm25.search, query, k)
+
+async def run_hybrid(app, query, k, batched):
+    depth = max(k, search_hybrid.DEPTH)
+    bm25_hits, faiss_hits = await asyncio.gather(run_bm25(app, query, depth), run_faiss(app, query, depth, batched))
+
+    return search_hybrid.fuse({"bm25": bm25_hits, "faiss": faiss_hits}, k)
+
+async def handle_search(request):
+    app = request.app
+    engine = request.match_info["engine"]
+    query = request.query.get("q", "").strip()
+    batched = request.query.get("nobatch") not in ("1", "true")
+
+    try:
+        k = min(int(request.query.get("k", search_faiss.RECALL)), MAX_K)
+    except ValueError:
+        return web.json_response({"error": "k must be an integer"}, status=400)
+
+    if k < 1:
+        return web.json_response({"error": "k must be at least 1"}, status=400)
+
+    if not query:
+        return web.json_response({"error": "missing query parameter q"}, status=400)
+
+    # back-pressure: refuse early instead of queueing without bound
+    if app["inflight"] >= MAX_INFLIGHT:
+        return web.json_response({"error": "overloaded"}, status=503, headers={"Retry-After": "1"})
+
+    if engine == "faiss":
+        work = run_faiss(app, query, k, batched)
+    elif engine == "bm25":
+        work = run_bm25(app, query, k)
+    else:
+        work = run_hybrid(app, query, k, batched)
+
+    app["inflight"] += 1
+    start = time.perf_counter()
+    try:
+        # a timed-out executor call still finishes in its thread; only the reply is dropped
+        results = await asyncio.wait_for(work, REQUEST_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        return web.json_response({"error": "timeout"}, status=504)
+    finally:
+        app["inflight"] -= 1
+
+    took_ms = (time.perf_counter() - start) * 1000
+    return web.json_response({"engine": engine, "query": query, "k": k, "took_ms": took_ms, "results": results})
+
+async def handle_stats(request):
+    stats = dict(request.app["batcher"].stats)
+    stats["avg_batch"] = stats["queries"] / stats["batches"] if stats["batches"] else 0.0
+    stats["inflight"] = request.app["inflight"]
+
+    return web.json_response(stats)
+
+async def handle_metrics(request):
+    # per-stage latency histograms; empty unless started with --trace
+    return web.Response(text=tracing.prometheus_text(), content_type="text/plain")
+
+async def handle_health(request):
+    warm = search_faiss.warm_state()
+    for name, future in request.app["warmup"].items():
+        warm[name] = future.done()
+
+    return web.json_response({"status": "ok", "warm": warm})
+
+def report_warmup_failure(future):
+    # BM25 requests retry the load themselves; this only makes the first failure visible
+    if not future.cancelled() and future.exception() is not None:
+        print(f"BM25 warm-up failed: {future.exception()!r}")
+
+async def on_startup(app):
+    # both engines are loaded once, off the event loop
+    loop = asyncio.get_running_loop()
+    if app["fast_start"]:
+        # serve at once; the first requests wait for whatever they need
+        search_faiss.warm_up()
+        app["warmup"]["bm25"] = loop.run_in_executor(app["executor"], search_bm25.get_searcher)
+        app["warmup"]["bm25"].add_done_callback(report_warmup_failure)
+    else:
+        await loop.run_in_executor(app["executor"], search_hybrid.get_searcher)
+
+    app["batcher"].start()
+    print(f"Search service ready on http://{HOST}:{app['port']}")
+
+async def on_cleanup(app):
+    await app["batcher"].stop()
+    app["executor"].shutdown(wait=False)
+
+def make_app(port=PORT, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH, fast_start=False):
+    app = web.Application()
+    app["port"] = port
+    app["fast_start"] = fast_start
+    app["executor"] = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="search")
+    app["batcher"] = FaissBatcher(app["executor"], window_ms, max_batch)
+    app["inflight"] = 0
+    app["warmup"] = {} # fast start: loads still running in the executor
+
+    app.router.add_get(r"/search/{engine:bm25|faiss|hybrid}", handle_search)
+    app.router.add_get("/stats", handle_stats)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+
+    return app
+
+async def load_generator(url, queries, n_requests, concurrency, extra_params):
+    latencies = []
+    statuses = {}
+    next_i = 0
+
+    async def client(session):
+        nonlocal next_i
+        while next_i < n_requests:
+            query = queries[next_i % len(queries)]
+            next_i += 1
+
+            t0 = time.perf_counter()
+            async with session.get(url, params={"q": query, **extra_params}) as resp:
+                await resp.read()
+            latencies.append(time.perf_counter() - t0)
+            statuses[resp.status] = statuses.get(resp.status, 0) + 1
+
+    async with ClientSession(timeout=ClientTimeout(total=60)) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return n_requests / elapsed, percentiles_ms(latencies, (50, 99)), statuses
+
+def run_load_generator(port, engine, n_requests, concurrency, k):
+    url = f"http://{HOST}:{port}/search/{engine}"
+    queries = load_bench_queries()
+
+    print(f"{n_requests} requests to {url}, concurrency {concurrency}, k={k}")
+    for label, params in (("one-at-a-time", {"k": k, "nobatch": "1"}), ("micro-batched", {"k": k})):
+        qps, lat, statuses = asyncio.run(load_generator(url, queries, n_requests, concurrency, params))
+        print(f"{label:14s} | {qps:8.1f} q/s | p50 {lat['p50']:.1f} ms | p99 {lat['p99']:.1f} ms | status {statuses}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--emb-cache-size", type=int, default=search_faiss.EMB_CACHE_SIZE,
+                        help="query embedding cache; use 0 when benchmarking with repeated queries")
+    parser.add_argument("--fast-start", action="store_true",
+                        help="accept requests before the engines have loaded (see search_faiss.warm_up)")
+    parser.add_argument("--trace", action="store_true", help="record per-stage timings, served on /metrics")
+    parser.add_argument("--loadgen", action="store_true", help="drive a running service instead of serving")
+    parser.add_argument("--engine", default="faiss", choices=["faiss", "bm25", "hybrid"])
+    parser.add_argument("--requests", type=int, default=LOADGEN_REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=LOADGEN_CONCURRENCY)
+    parser.add_argument("--k", type=int, default=search_faiss.RECALL)
+    args = parser.parse_args()
+
+    if args.loadgen:
+        run_load_generator(args.port, args.engine, args.requests, args.concurrency, args.k)
+    else:
+        search_faiss.EMB_CACHE_SIZE = args.emb_cache_size
+        tracing.enable(args.trace)
+        web.run_app(make_app(args.port, args.window_ms, args.max_batch, args.fast_start), host=HOST, port=args.port)
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import faiss
+import search_faiss
+import build_faiss_from_memmap as builder
+from bench_queries import load_bench_queries
+from bench_utils import percentiles_ms
+
+CLEAN_PATH = "../data/processed/clean_recipes_input.jsonl"
+REPORT_PATH = "../results/sweeps/faiss_index_sweep.json"
+SWEEP_DIR = "../data/embeddings/sweep" # keeps sweep builds away from the served index
+K = 10
+N_NAME_QUERIES = 1000 # recipe names used as extra queries for stable p99
+
+# (index spec, search knob, values to sweep)
+SWEEP = [
+    ("flat", None, [None]),
+    # reduced-precision / quantized storage, compared against the float32 flat baseline
+    ("fp16", None, [None]),
+    ("sq8", None, [None]),
+    ("pq:m=96,nbits=8", None, [None]),
+    ("pq:m=48,nbits=8", None, [None]),
+    ("hnsw:M=32,efc=200", "ef_search", [16, 32, 64, 128, 256]),
+    ("ivf:nlist=1024", "nprobe", [1, 4, 8, 16, 32, 64]),
+    ("ivfpq:nlist=1024,m=48,nbits=8", "nprobe", [4, 8, 16, 32, 64]),
+]
+
+def sample_name_queries(path, n):
+    names = []
+    with open(path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            # every 97th recipe spreads the sample over the whole file
+            if i % 97 == 0:
+                names.append(json.loads(line)["name"])
+            if len(names) == n:
+                break
+
+    return names
+
+def embed_sweep_queries():
+    model, device = search_faiss.load_model()
+    queries = load_bench_queries() + sample_name_queries(CLEAN_PATH, N_NAME_QUERIES)
+    queries = [search_faiss.light_normalize(q) for q in queries]
+
+    return search_faiss.embed_queries(queries, device, model)
+
+def ground_truth(embeddings, ids, xq, k, keep=None):
+    # exact search over the rows the served build holds: tombstones are skipped
+    exact = faiss.IndexIDMap2(faiss.IndexFlatIP(builder.EMB_DIM))
+    vectors = np.ascontiguousarray(embeddings[:])
+    if keep is not None:
+        vectors, ids = vectors[keep], ids[keep]
+    exact.add_with_ids(vectors, ids)
+    _, gt = exact.search(xq, k)
+
+    return gt
+
+def recall_at_k(found, gt, k):
+    hits = [len(np.intersect1d(f[:k], g[:k])) for f, g in zip(found, gt)]
+
+    return float(np.mean(hits)) / k
+
+def evaluate(index, xq, gt, k, params):
+    # recall from one batched call, latency from one query at a time
+    _, found = index.search(xq, k, params=params)
+
+    latencies = []
+    for i in range(len(xq)):
+        t0 = time.perf_counter()
+        index.search(xq[i:i + 1], k, params=params)
+        latencies.append(time.perf_counter() - t0)
+
+    return recall_at_k(found, gt, k), percentiles_ms(latencies, (50, 99))
+
+def add_baseline_ratios(report, baseline_spec="flat"):
+    base = next((row for row in report if row["spec"] == baseline_spec), None)
+    if base is None:
+        return
+
+    for row in report:
+        row["mb_vs_flat"] = row["index_mb"] / base["index_mb"]
+        row["p50_vs_flat"] = row["p50_ms"] / base["p50_ms"]
+        row["recall_drop"] = base["recall"] - row["recall"]
+
+def sweep_index_path(spec):
+    return os.path.join(SWEEP_DIR, builder.spec_tag(spec) + ".faiss")
+
+def get_index(spec, embeddings, ids, reuse, keep=None):
+    path = sweep_index_path(spec)
+    n_live = len(ids) if keep is None else int(keep.sum())
+    if reuse and os.path.exists(path):
+        index = faiss.read_index(path)
+        # a build from before the last tombstone change no longer matches the served rows
+        if index.ntotal == n_live:
+            return index, 0.0
+        print(f"{path} holds {index.ntotal} vectors, expected {n_live}: rebuilding")
+
+    t0 = time.perf_counter()
+    index = builder.build_faiss_index(embeddings, ids, spec, keep=keep)
+    build_s = time.perf_counter() - t0
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    faiss.write_index(index, path)
+
+    return index, build_s
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=K)
+    parser.add_argument("--reuse", action="store_true", help="load already built indexes instead of rebuilding")
+    parser.add_argument("--specs", nargs="+", default=None, help="only sweep these specs (default: all of SWEEP)")
+    args = parser.parse_args()
+
+    embeddings, ids = builder.load_embeddings()
+    keep = builder.live_mask(ids, builder.load_manifest())
+    xq = embed_sweep_queries()
+    gt = ground_truth(embeddings, ids, xq, args.k, keep)
+    print(f"{len(xq)} queries, ground truth from exact inner-product search")
+
+    report = []
+    for spec, knob, values in SWEEP:
+        if args.specs and spec not in args.specs:
+            continue
+
+        index, build_s = get_index(spec, embeddings, ids, args.reuse, keep)
+        size_mb = os.path.getsize(sweep_index_path(spec)) / 2**20
+        code_bytes = search_faiss.index_code_bytes(index)
+
+        for value in values:
+            knobs = {knob: value} if knob else {}
+            params = search_faiss.make_search_params(index, knobs.get("nprobe"), knobs.get("ef_search"))
+            recall, lat = evaluate(index, xq, gt, args.k, params)
+
+            row = {"spec": spec, **knobs, "recall": recall, "p50_ms": lat["p50"], "p99_ms": lat["p99"],
+                   "build_s": build_s, "index_mb": size_mb, "bytes_per_vector": code_bytes}
+            report.append(row)
+
+            label = f"{spec} {knob}={value}" if knob else spec
+            print(f"{label:42s} | recall@{args.k} {recall:.4f} | p50 {lat['p50']:.3f} ms | p99 {lat['p99']:.3f} ms | {size_mb:.0f} MB")
+
+    add_baseline_ratios(report)
+    storage = [row for row in report if "mb_vs_flat" in row and row["bytes_per_vector"]]
+    if storage:
+        print("\nStorage vs float32 flat:")
+        for row in storage:
+            print(f"{row['spec']:42s} | {row['bytes_per_vector']:5d} B/vec | {row['mb_vs_flat']:.3f}x size "
+                  f"| {row['p50_vs_flat']:.2f}x p50 | recall drop {row['recall_drop']:+.4f}")
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w") as f:
+        json.dump({"k": args.k, "n_queries": len(xq), "results": report}, f, indent=2)
+
+    print("Sweep report saved to", REPORT_PATH)
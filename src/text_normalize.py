@@ -0,0 +1,143 @@
+import re
+
+MEASUREMENT_WORDS = {
+# units
+"cup", "cups", 
+"teaspoon", "teaspoons", "tsp", "tsps", "tablespoon", "tablespoons", "tbsp", "tbsps",
+"ml", "milliliter", "milliliters",
+"liter", "liters", "litre", "litres", "l",
+"ounce", "ounces", "oz",
+"gram", "grams", "g",
+"kilogram", "kilograms", "kg",
+"pound", "pounds", "lb", "lbs",
+
+# counts / packaging
+"pinch", "pinches",
+"dash", "dashes",
+"slice","slices",
+"clove","cloves",
+"can","cans",
+"jar","jars",
+"packet", "packets",
+"package", "packages",
+"stick", "sticks",
+"bunch", "bunches",
+}
+
+# Reference implementations: the regex versions that used to be copied into
+# data_process.py, search_bm25.py, search_bm25_sparse.py and search_faiss.py.
+# The fast paths below must match them byte for byte; bench_normalize.py
+# checks that over the whole corpus.
+def light_normalize_ref(input_str):
+    if not isinstance(input_str, str):
+        return ""
+
+    input_str = input_str.lower()
+
+    input_str = input_str.replace("&", " and ")
+    input_str = input_str.replace("+", " and ")
+    input_str = input_str.replace("/", " and ")
+    input_str = input_str.replace("'", "")
+
+    input_str = re.sub(r'[^a-z0-9\s\-]', ' ', input_str)
+    input_str = re.sub(r'\s+', ' ', input_str).strip()
+
+    return input_str
+
+def normalize_ingredients_ref(input_str):
+    if not isinstance(input_str, str):
+        return ""
+
+    input_str = input_str.lower()
+
+    input_str = input_str.replace("&", " and ")
+    input_str = input_str.replace("+", " and ")
+
+    input_str = re.sub(r'\d+', ' ', input_str)
+    input_str = re.sub(r'[^a-z\s\-]', ' ', input_str)
+    input_str = re.sub(r'\s+', ' ', input_str).strip()
+
+    tokens = input_str.split()
+
+    tokens = [t for t in tokens if t not in MEASUREMENT_WORDS]
+
+    return " ".join(tokens)
+
+# After the rewrites, both normalizers keep a small set of ASCII characters
+# and turn everything else (punctuation, whitespace, anything non-ASCII) into
+# a token separator, so the regex passes come down to one bytes.translate and
+# a split / join. Lowercasing comes first, as before: it is what maps "K"
+# (Kelvin) to "k". Every byte of a multi-byte UTF-8 sequence is >= 0x80 and
+# becomes a space, which the split then collapses.
+LIGHT_KEEP = "abcdefghijklmnopqrstuvwxyz0123456789-"
+INGREDIENT_KEEP = "abcdefghijklmnopqrstuvwxyz-"
+SEP = "\x00" # joins a batch into one string; normalization never keeps it otherwise
+
+def _bytes_table(keep):
+    return bytes(c if chr(c) in keep else 32 for c in range(256))
+
+_LIGHT_TABLE = _bytes_table(LIGHT_KEEP)
+_LIGHT_TABLE_SEP = _bytes_table(LIGHT_KEEP + SEP)
+_INGREDIENT_TABLE = _bytes_table(INGREDIENT_KEEP)
+_INGREDIENT_TABLE_SEP = _bytes_table(INGREDIENT_KEEP + SEP)
+
+def _light_translate(text, table):
+    text = text.lower()
+    if "&" in text or "+" in text or "/" in text:
+        text = text.replace("&", " and ").replace("+", " and ").replace("/", " and ")
+
+    # surrogatepass: lone surrogates still encode, to bytes >= 0x80
+    return text.encode("utf-8", "surrogatepass").translate(table, b"'").decode("ascii")
+
+def _ingredient_translate(text, table):
+    text = text.lower()
+    if "&" in text or "+" in text:
+        text = text.replace("&", " and ").replace("+", " and ")
+
+    return text.encode("utf-8", "surrogatepass").translate(table).decode("ascii")
+
+def light_normalize(input_str):
+    if not isinstance(input_str, str):
+        return ""
+
+    return " ".join(_light_translate(input_str, _LIGHT_TABLE).split())
+
+def normalize_ingredients(input_str):
+    if not isinstance(input_str, str):
+        return ""
+
+    tokens = _ingredient_translate(input_str, _INGREDIENT_TABLE).split()
+
+    return " ".join(t for t in tokens if t not in MEASUREMENT_WORDS)
+
+def _translate_many(values, translate, table):
+    # One lower / replace / translate over the whole batch joined by SEP, then
+    # one split; callers collapse the whitespace of each part. Lowercasing is per character except for final
+    # sigma, which maps to a separator either way. Returns None when a value
+    # contains SEP itself; the callers then go value by value.
+    texts = [v if isinstance(v, str) else "" for v in values]
+    if not texts:
+        return []
+
+    joined = SEP.join(texts)
+    if joined.count(SEP) != len(texts) - 1:
+        return None
+
+    return translate(joined, table).split(SEP)
+
+def light_normalize_many(values):
+    # batch form of light_normalize for whole columns (lists, pandas Series, ...)
+    values = list(values)
+    out = _translate_many(values, _light_translate, _LIGHT_TABLE_SEP)
+    if out is None:
+        return [light_normalize(v) for v in values]
+
+    return [" ".join(text.split()) for text in out]
+
+def normalize_ingredients_many(values):
+    values = list(values)
+    out = _translate_many(values, _ingredient_translate, _INGREDIENT_TABLE_SEP)
+    if out is None:
+        return [normalize_ingredients(v) for v in values]
+
+    return [" ".join(t for t in text.split() if t not in MEASUREMENT_WORDS) for text in out]
@@ -0,0 +1,253 @@
+import sys
+import json
+import time
+import threading
+import contextlib
+import io
+import cProfile
+import pstats
+from collections import Counter
+
+# Opt-in per-stage timing for the query path. Engines wrap their stages in
+# `with tracing.stage("faiss.embed"):`; while tracing is off and no traced()
+# call is open on the thread, stage() returns a shared no-op context manager.
+ENABLED = False
+BUCKETS_MS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+METRIC_NAME = "recipe_search_stage_seconds"
+SAMPLE_INTERVAL_S = 0.001
+
+class _TraceLocal(threading.local):
+    timings = None # stage -> ms of the traced() call open on this thread
+
+_NOOP = contextlib.nullcontext()
+_LOCAL = _TraceLocal()
+_HISTOGRAMS = {}
+_LOCK = threading.Lock()
+
+class Histogram:
+    def __init__(self, bounds_ms=BUCKETS_MS):
+        self.bounds_ms = bounds_ms
+        self.counts = [0] * (len(bounds_ms) + 1) # last bucket is +Inf
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, ms):
+        i = 0
+        while i < len(self.bounds_ms) and ms > self.bounds_ms[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation
+        if self.count == 0:
+            return None
+
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds_ms + [float("inf")], self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum_ms": self.sum_ms,
+            "mean_ms": self.sum_ms / self.count if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p90_ms": self.quantile(0.9),
+            "p99_ms": self.quantile(0.99),
+            "buckets": {str(b): n for b, n in zip(self.bounds_ms + ["+Inf"], self.counts)},
+        }
+
+class _Stage:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, 1000.0 * (time.perf_counter() - self.t0))
+        return False
+
+# A list of results that also carries the stage timings (ms) of its query.
+class TracedResults(list):
+    def __init__(self, results, timings):
+        super().__init__(results)
+        self.timings = timings
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+def stage(name):
+    if not ENABLED and _LOCAL.timings is None:
+        return _NOOP
+
+    return _Stage(name)
+
+def record(name, ms):
+    timings = _LOCAL.timings
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + ms
+
+    if ENABLED:
+        with _LOCK:
+            hist = _HISTOGRAMS.get(name)
+            if hist is None:
+                hist = _HISTOGRAMS[name] = Histogram()
+            hist.observe(ms)
+
+def traced(fn, *args, **kwargs):
+    # runs one query and returns its results with the timings of every stage
+    # it went through on this thread (work handed to other threads, like the
+    # hybrid searcher's engines, only shows up in the histograms)
+    outer = _LOCAL.timings
+    _LOCAL.timings = {}
+    t0 = time.perf_counter()
+    try:
+        results = fn(*args, **kwargs)
+        _LOCAL.timings["total"] = 1000.0 * (time.perf_counter() - t0)
+        return TracedResults(results, _LOCAL.timings)
+    finally:
+        _LOCAL.timings = outer
+
+def snapshot():
+    with _LOCK:
+        return {name: hist.to_dict() for name, hist in sorted(_HISTOGRAMS.items())}
+
+def reset():
+    with _LOCK:
+        _HISTOGRAMS.clear()
+
+def dump_json(path=None):
+    text = json.dumps(snapshot(), indent=2)
+    if path is not None:
+        with open(path, "w") as f:
+            f.write(text)
+
+    return text
+
+def prometheus_text(metric=METRIC_NAME):
+    # Prometheus text exposition format: cumulative buckets, in seconds
+    lines = [f"# HELP {metric} Time spent per search stage.", f"# TYPE {metric} histogram"]
+    with _LOCK:
+        for name, hist in sorted(_HISTOGRAMS.items()):
+            cumulative = 0
+            for bound, n in zip(hist.bounds_ms + [None], hist.counts):
+                cumulative += n
+                le = "+Inf" if bound is None else repr(bound / 1000.0)
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {hist.sum_ms / 1000.0!r}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {hist.count}')
+
+    return "\n".join(lines) + "\n"
+
+# Profiling hooks: wrap one or more queries, e.g.
+#   with tracing.cprofile() as prof:
+#       search_faiss.search("banana bread")
+#   print(prof.text)
+class cprofile:
+    def __init__(self, sort="cumulative", limit=30):
+        self.sort = sort
+        self.limit = limit
+        self.profiler = cProfile.Profile()
+        self.text = ""
+
+    def __enter__(self):
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats(self.sort).print_stats(self.limit)
+        self.text = out.getvalue()
+        return False
+
+# Samples the calling thread's stack every interval_s from a background
+# thread. Cheaper than cProfile on hot loops and sees time spent in C calls
+# (FAISS, torch, the JVM) as the Python frame that made them. collapsed()
+# returns "frame;frame;frame count" lines for flamegraph.pl / speedscope.
+class sampling:
+    def __init__(self, interval_s=SAMPLE_INTERVAL_S):
+        self.interval_s = interval_s
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._target = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="tracing-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {n}" for stack, n in self.stacks.most_common())
+
+    def top(self, n=15):
+        # leaf frames by share of samples
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+
+        return [(frame, count / total) for frame, count in leaves.most_common(n)]
+
+if __name__ == "__main__":
+    import argparse
+    import search_faiss
+    from bench_queries import load_bench_queries
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engine", default="faiss", choices=["faiss", "bm25"])
+    parser.add_argument("--profile", choices=["cprofile", "sampling"], help="also profile the query loop")
+    parser.add_argument("--prometheus", action="store_true", help="print Prometheus text instead of JSON")
+    args = parser.parse_args()
+
+    if args.engine == "bm25":
+        import search_bm25
+        search_fn = search_bm25.search
+    else:
+        search_fn = search_faiss.search
+
+    queries = load_bench_queries()
+    search_fn(queries[0]) # warm up
+
+    enable()
+    print("stage timings (ms) of one query:", json.dumps(traced(search_fn, queries[0]).timings))
+
+    profiler = {"cprofile": cprofile, "sampling": sampling}.get(args.profile)
+    with profiler() if profiler else _NOOP as prof:
+        for q in queries:
+            search_fn(q)
+
+    print(prometheus_text() if args.prometheus else dump_json())
+    if args.profile == "cprofile":
+        print(prof.text)
+    elif args.profile == "sampling":
+        for frame, share in prof.top():
+            print(f"{share:6.1%} {frame}")
@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import faiss
+import torch
+import embed_recipes
+import metadata_store
+import search_faiss
+from recipe_filters import FILTER_DIR, ingredient_text, append_delta
+from data_process import clean_record
+from build_dsp_metadata import display_record
+
+DELTA_PATH = "../data/processed/delta.jsonl"
+METADATA_PATH = "../data/processed/recipes_display.jsonl"
+RAW_FIELDS = ["name", "tags", "description", "ingredients", "steps"]
+
+# Delta file, one JSON object per line:
+#   {"op": "add" | "change", "id": 123, "name": ..., "tags": ..., "description": ...,
+#    "ingredients": ..., "steps": ...}   fields as in RAW_recipes.csv
+#   {"op": "remove", "id": 123}
+# Later lines win when an id appears more than once.
+def load_delta(delta_path):
+    upserts = {}
+    removes = set()
+
+    with open(delta_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+
+            entry = json.loads(line)
+            op = entry.get("op")
+            rid = str(entry["id"])
+
+            if op == "remove":
+                upserts.pop(rid, None)
+                removes.add(rid)
+            elif op in ("add", "change"):
+                removes.discard(rid)
+                upserts[rid] = entry
+            else:
+                raise ValueError(f"Unknown delta op '{op}' for id {rid}, expected add, change or remove")
+
+    return upserts, removes
+
+def raw_field(entry, name):
+    value = entry.get(name)
+    # lists may be given as JSON arrays or in the CSV's "['a', 'b']" form
+    return str(value) if isinstance(value, list) else value
+
+def to_records(upserts):
+    clean = {}
+    display = {}
+
+    for rid, entry in upserts.items():
+        name, tags, description, ingredients, steps = (raw_field(entry, f) for f in RAW_FIELDS)
+        clean[rid] = clean_record(name, rid, tags, description, ingredients)
+        display[rid] = display_record(name, rid, tags, description, ingredients, steps)
+
+    return clean, display
+
+def check_store():
+    # with no manifest and no rows to adopt, EmbeddingStore would start empty
+    # and the delta's rows would be all the store holds afterwards
+    row_bytes = 4 * embed_recipes.EMB_DIM
+    if not os.path.exists(embed_recipes.MANIFEST_PATH) and \
+            not embed_recipes.legacy_rows(embed_recipes.EMBD_PATH, embed_recipes.ID_PATH, row_bytes):
+        raise ValueError(f"No embedding store at {embed_recipes.EMBD_PATH}, run embed_recipes.py before applying deltas")
+
+def update_embeddings(store, clean, removes):
+    # only recipes that are new or whose embedding input changed are encoded
+    plan = store.plan(list(clean.values()))
+    if plan:
+        device = "mps" if torch.backends.mps.is_available() else "cpu"
+        model = embed_recipes.SentenceTransformer(embed_recipes.MODEL_NAME, device=device)
+        model.eval()
+
+        store.write(plan, embed_recipes.encode_scheduled(model, [p[3] for p in plan], device))
+
+    removed = sorted(removes)
+    stored = {rid for rid, row in zip(removed, store.rows(removed)) if row >= 0}
+    tombstones = sorted((set(store.manifest["tombstones"]) - set(clean)) | stored)
+    store.manifest["tombstones"] = [tombstones[i] for i in np.argsort(store.rows(tombstones), kind="stable")]
+    store.commit()
+
+    return len(plan)
+
+def read_vectors(store, rids):
+    rows = store.rows(rids)
+    emb = np.memmap(store.embd_path, dtype="float32", mode="r", shape=(store.n_rows, store.dim))
+
+    return np.ascontiguousarray(emb[rows])
+
+def update_faiss_index(index, store, upserts, removes):
+    base = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    if isinstance(base, faiss.IndexHNSW):
+        raise ValueError("HNSW indexes cannot remove ids; rebuild with build_faiss_from_memmap.py instead")
+
+    # a changed recipe is removed and re-added with its new vector
+    stale = np.array([int(rid) for rid in list(upserts) + list(removes)], dtype=np.int64)
+    removed = index.remove_ids(stale) if len(stale) else 0
+
+    rids = list(upserts)
+    if rids:
+        index.add_with_ids(read_vectors(store, rids), np.array([int(rid) for rid in rids], dtype=np.int64))
+
+    return removed
+
+def write_index_atomic(index, index_path):
+    faiss.write_index(index, index_path + ".tmp")
+    with open(index_path + ".tmp", "rb") as f:
+        os.fsync(f.fileno())
+
+    # searchers pick the new file up on their next get_searcher() version check
+    os.replace(index_path + ".tmp", index_path)
+
+def update_filters(store, clean, removes, filter_dir=FILTER_DIR):
+    # the delta is appended to the filter log, which searchers apply on load;
+    # the next recipe_filters.py build folds it into the bitmaps
+    if not os.path.exists(os.path.join(filter_dir, "ids.npy")):
+        return None
+
+    rids = list(clean)
+    records = [(int(rid), clean[rid]["tags"], ingredient_text(clean[rid]["ingredients"]), row)
+               for rid, row in zip(rids, store.rows(rids))]
+    append_delta(records, removes, filter_dir)
+
+    return len(records) + len(removes)
+
+def apply_delta(delta_path, index_path, metadata_path=METADATA_PATH):
+    upserts, removes = load_delta(delta_path)
+    clean, display = to_records(upserts)
+    print(f"Delta: {len(upserts)} added/changed, {len(removes)} removed")
+
+    check_store()
+    t0 = time.perf_counter()
+    store = embed_recipes.EmbeddingStore()
+    embedded = update_embeddings(store, clean, removes)
+    t1 = time.perf_counter()
+
+    index = faiss.read_index(index_path)
+    before = index.ntotal
+    removed = update_faiss_index(index, store, upserts, removes)
+    write_index_atomic(index, index_path)
+    t2 = time.perf_counter()
+
+    if not metadata_store.is_fresh(metadata_path):
+        metadata_store.build_store(metadata_path)
+    n_meta = metadata_store.update_store(display, removes, metadata_path)
+    t3 = time.perf_counter()
+
+    n_filters = update_filters(store, clean, removes)
+    t4 = time.perf_counter()
+
+    print(f"Embeddings: {embedded} encoded, {store.n_rows} rows, "
+          f"{len(store.manifest['tombstones'])} tombstones ({t1 - t0:.2f}s)")
+    print(f"Index: {before} -> {index.ntotal} vectors, {removed} removed, {len(upserts)} added ({t2 - t1:.2f}s)")
+    print(f"Metadata store: {n_meta} records ({t3 - t2:.2f}s)")
+    if n_filters is None:
+        print("Filters: none built under", FILTER_DIR)
+    else:
+        print(f"Filters: {n_filters} changes logged ({t4 - t3:.2f}s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delta", default=DELTA_PATH)
+    parser.add_argument("--index", default=None, help="defaults to the index search_faiss serves")
+    args = parser.parse_args()
+
+    apply_delta(args.delta, args.index or search_faiss.served_index_path(), METADATA_PATH)
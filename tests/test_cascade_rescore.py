@@ -0,0 +1,25 @@
+import numpy as np
+from search_faiss import rescore
+
+def qwen_store(ids, vectors):
+    ids = np.asarray(ids, dtype=np.int64)
+    order = np.argsort(ids)
+
+    return {"ids_sorted": ids[order], "row_of_sorted": order, "embeddings": np.asarray(vectors, dtype=np.float32)}
+
+def test_full_coverage_ranks_by_qwen():
+    qwen = qwen_store([10, 20, 30], [[1, 0], [0, 1], [0.6, 0.8]])
+    scores, rids = rescore(qwen, np.array([0, 1], dtype=np.float32),
+                           np.array([0.9, 0.8, 0.7], dtype=np.float32), np.array([10, 20, 30]), 2)
+
+    assert rids.tolist() == [20, 30]
+    assert np.allclose(scores, [1.0, 0.8])
+
+def test_partial_coverage_keeps_minilm_ranking():
+    # 40 has no Qwen3 vector, so no candidate may jump ahead of it on a Qwen3 score
+    qwen = qwen_store([10, 20, 30], [[1, 0], [0, 1], [0.6, 0.8]])
+    minilm = np.array([0.9, 0.8, 0.7, 0.6, 0.0], dtype=np.float32)
+    scores, rids = rescore(qwen, np.array([0, 1], dtype=np.float32), minilm, np.array([10, 40, 20, 30, -1]), 3)
+
+    assert rids.tolist() == [10, 40, 20]
+    assert scores.tolist() == minilm[:3].tolist()
@@ -0,0 +1,51 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+import embed_recipes
+
+DIM = 4
+
+def open_store(tmp_path):
+    return embed_recipes.EmbeddingStore(str(tmp_path / "e.data"), str(tmp_path / "e.txt"), str(tmp_path / "e.hash"),
+                                        str(tmp_path / "e.manifest.json"), dim=DIM)
+
+def recipes(ids, version=""):
+    return [{"id": str(rid), "name": f"recipe {rid}{version}", "description": "", "ingredients": ["salt"], "tags": []}
+            for rid in ids]
+
+def write(store, objects, commit=True):
+    plan = store.plan(objects)
+    if plan:
+        store.write(plan, np.zeros((len(plan), DIM), dtype=np.float32))
+    if commit:
+        store.commit()
+
+    return [(row, rid) for row, rid, _, _ in plan]
+
+def test_delta_embeds_only_new_and_changed(tmp_path):
+    assert write(open_store(tmp_path), recipes([50, 10, 30, 10])) == [(0, "50"), (1, "10"), (2, "30")]
+
+    store = open_store(tmp_path)
+    assert store.rows(["10", "30", "50", "99"]).tolist() == [1, 2, 0, -1]
+    assert write(store, recipes([30, 70]) + recipes([50], " v2")) == [(0, "50"), (3, "70")]
+    assert open_store(tmp_path).rows(["70", "50"]).tolist() == [3, 0]
+
+def test_uncommitted_rows_are_rolled_back(tmp_path):
+    write(open_store(tmp_path), recipes([1, 2]))
+    write(open_store(tmp_path), recipes([3]), commit=False)
+
+    store = open_store(tmp_path)
+    assert store.n_rows == 2
+    assert store.row("3") is None
+    assert open(tmp_path / "e.txt").read().split() == ["1", "2"]
+
+def test_missing_row_table_is_rebuilt(tmp_path):
+    write(open_store(tmp_path), recipes([20, 10]))
+    os.remove(tmp_path / "e.rows.npy")
+
+    store = open_store(tmp_path)
+    assert store.rows(["10", "20"]).tolist() == [1, 0]
+    assert write(store, recipes([10, 20])) == []
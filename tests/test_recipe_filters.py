@@ -0,0 +1,45 @@
+import os
+import numpy as np
+from recipe_filters import RecipeFilters, DELTA_FILE, append_delta, ingredient_text
+
+RECORDS = [
+    (1, ["vegetarian", "dessert"], ingredient_text(["blueberries", "cream cheese"])),
+    (2, ["dinner"], ingredient_text(["chicken", "salt"])),
+    (3, ["vegetarian", "dinner"], ingredient_text(["light cream cheese", "pasta"])),
+]
+SPECS = [{"must_tags": ["vegetarian"]}, {"any_tags": ["dinner", "new-tag"]}, {"must_not_tags": ["dessert"]},
+         {"must_ingredients": ["cream cheese"]}, {"must_not_ingredients": ["blueber"]},
+         {"must_ingredients": ["cheese pasta"]}]
+
+def matches(filters, spec):
+    rows = filters.matching_rows(filters.compile(spec))
+
+    return sorted(zip(filters.ids[rows].tolist(), filters.emb_rows[rows].tolist()))
+
+def test_logged_delta_matches_a_full_build(tmp_path):
+    RecipeFilters.from_records(RECORDS, np.array([3, 1, 2], dtype=np.int64)).save(str(tmp_path))
+
+    changed = (3, ["dinner", "new-tag"], ingredient_text(["pasta", "blueberries"]))
+    added = (4, ["vegetarian"], ingredient_text(["cream cheese"]))
+    append_delta([changed + (0,), added + (3,)], {"2"}, str(tmp_path))
+
+    loaded = RecipeFilters.load(str(tmp_path))
+    full = RecipeFilters.from_records([RECORDS[0], changed, added], np.array([3, 1, 2, 4], dtype=np.int64))
+    for spec in SPECS:
+        assert matches(loaded, spec) == matches(full, spec)
+
+def test_half_written_line_is_ignored_and_dropped(tmp_path):
+    RecipeFilters.from_records(RECORDS, np.array([1, 2, 3], dtype=np.int64)).save(str(tmp_path))
+    with open(os.path.join(str(tmp_path), DELTA_FILE), "w") as f:
+        f.write('{"id": 2, "remo')
+
+    assert matches(RecipeFilters.load(str(tmp_path)), {"any_tags": ["dinner"]}) == [(2, 1), (3, 2)]
+    append_delta([], {"3"}, str(tmp_path))
+    assert matches(RecipeFilters.load(str(tmp_path)), {"any_tags": ["dinner"]}) == [(2, 1)]
+
+def test_full_build_clears_the_log(tmp_path):
+    RecipeFilters.from_records(RECORDS, np.array([1, 2, 3], dtype=np.int64)).save(str(tmp_path))
+    append_delta([], {"1"}, str(tmp_path))
+    RecipeFilters.from_records(RECORDS, np.array([1, 2, 3], dtype=np.int64)).save(str(tmp_path))
+
+    assert not os.path.exists(os.path.join(str(tmp_path), DELTA_FILE))
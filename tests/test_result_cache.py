@@ -0,0 +1,20 @@
+import os
+import sys
+import json
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+def modules_after(code):
+    # a fresh interpreter, since other tests in this run import the searchers
+    script = code + "\nimport sys, json\nprint(json.dumps(sorted(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", script], cwd=SRC_DIR, capture_output=True, text=True, check=True)
+
+    return set(json.loads(out.stdout.splitlines()[-1]))
+
+def test_bm25_version_does_not_import_faiss_engine():
+    modules = modules_after("import result_cache\nresult_cache.ResultCache().version('bm25')")
+
+    assert "search_bm25" in modules
+    assert "search_faiss" not in modules
+    assert "faiss" not in modules
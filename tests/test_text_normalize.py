@@ -0,0 +1,36 @@
+import pytest
+import text_normalize as tn
+from bench_normalize import EDGE_CASES
+
+# the translate-table normalizers must agree with the regex ones they replaced
+CASES = EDGE_CASES + [
+    "salt & pepper", "1+1", "and/or", "cook's tip", "rock'n'roll", "&+/'", "  &  +  /  '  ",
+    "Jalapeño piñata", "naïve café", "Ærøskøbing", "日本の料理", "🍕 pizza",
+    "\u00bd cup", "\u00b23", "\u0661\u0662\u0663 eggs", "\u0663", "\U0001d7d9\U0001d7da cups", "\u216b",
+    "a\u00a0b", "a\u2009b", "a\u3000b", "a\tb\nc\rd", "a\u2028b\u0085c", "a\x0bb\x0cc", "\u200bzero width",
+    "a\x00b", "\x00", "a\x00\x00b", "\x00 tsp sugar",
+    "2 cups flour, 1/2 tsp salt", "3 large eggs, beaten", "1 (8 ounce) package cream cheese",
+    None, 3, 3.5, ["a"],
+]
+
+@pytest.mark.parametrize("value", CASES)
+def test_light_normalize_matches_ref(value):
+    assert tn.light_normalize(value) == tn.light_normalize_ref(value)
+
+@pytest.mark.parametrize("value", CASES)
+def test_normalize_ingredients_matches_ref(value):
+    assert tn.normalize_ingredients(value) == tn.normalize_ingredients_ref(value)
+
+def test_light_normalize_many_matches_ref():
+    assert tn.light_normalize_many(CASES) == [tn.light_normalize_ref(v) for v in CASES]
+
+def test_normalize_ingredients_many_matches_ref():
+    assert tn.normalize_ingredients_many(CASES) == [tn.normalize_ingredients_ref(v) for v in CASES]
+
+def test_many_keeps_one_result_per_value():
+    # the batch path joins on NUL, so values containing it must not split
+    values = ["a\x00b", "", "\x00", "c"]
+
+    assert len(tn.light_normalize_many(values)) == len(values)
+    assert len(tn.normalize_ingredients_many(values)) == len(values)
+    assert tn.light_normalize_many([]) == []